@@ -0,0 +1,283 @@
+# analyze.py
+"""
+Run analysis for navigation logs, without any rover hardware libraries.
+Opens binary logs by memory mapping (segmented logs by decompressing only
+the blocks in range, CSV by parsing) and reports, over the whole run or
+a time range:
+  - dead-reckoning error at each GPS resync
+  - heading-error histogram
+  - time spent per motor command
+  - distance travelled (dead reckoning and GPS)
+  - control-loop period statistics
+Resync errors and dead-reckoning distance need undecimated rows around
+each fix (LOG_FREQUENCY = 0). A log whose rows are further apart than
+DECIMATED_TICKS control-loop ticks is taken as decimated: those metrics
+are skipped and the row spacing is reported as the log period.
+Usage:
+    python3 analyze.py rover_navigation_log.bin
+    python3 analyze.py logs/ --run rover_navigation_log_20260101-120000 --from 600 --to 900
+    python3 analyze.py rover_navigation_log.csv --json
+"""
+import os
+import csv
+import sys
+import json
+import math
+import time
+import argparse
+
+import numpy as np
+
+import binlog
+import config
+import logsegments
+
+INDEX_STRIDE = 1024  # records between time index entries
+HEADING_BINS = np.arange(-180, 181, 15)
+PERCENTILES = (50, 95, 99)
+DECIMATED_TICKS = 1.5  # median row spacing, in 1/IMU_FREQUENCY ticks, of a decimated log
+
+
+class TimeIndex:
+    """
+    Sparse index over the (non-decreasing) timestamp column: every
+    INDEX_STRIDE-th timestamp, so a range query only touches the index and
+    two stride-sized pieces of the mapped file.
+    """
+
+    def __init__(self, timestamps, stride=INDEX_STRIDE):
+        self.timestamps = timestamps
+        self.stride = stride
+        self.keys = np.array(timestamps[::stride])
+
+    def _position(self, t, side):
+        block = int(np.searchsorted(self.keys, t, side=side))
+        lo = max(0, (block - 1) * self.stride)
+        hi = min(len(self.timestamps), block * self.stride + 1)
+        return lo + int(np.searchsorted(self.timestamps[lo:hi], t, side=side))
+
+    def slice(self, t0=None, t1=None):
+        """Record slice with t0 <= timestamp <= t1."""
+        start = 0 if t0 is None else self._position(t0, 'left')
+        stop = len(self.timestamps) if t1 is None else self._position(t1, 'right')
+        return slice(start, stop)
+
+
+# ------------------------------ Loading ------------------------------ #
+def load_csv(filename):
+    """Parse a datalogger CSV into a binlog-layout structured array."""
+    dtype = binlog.dtype_of({'fields': binlog.FIELDS})
+    codes = {name: code for code, name in enumerate(binlog.MOTOR_COMMANDS)}
+    names = [name for name, _ in binlog.FIELDS]
+    rows = []
+    with open(filename, newline='') as f:
+        for row in csv.DictReader(f):
+            rows.append(tuple(
+                codes.get(row[name], 0) if name == 'motor_command'
+                else (float(row[name]) if row[name] else math.nan)
+                for name in names))
+    return np.array(rows, dtype=dtype)
+
+
+def load(path, run=None, t0=None, t1=None):
+    """
+    (records, description) for a .bin, .csv, .seg file(s) or log directory.
+    Segmented logs are read only in [t0, t1]; other formats are returned
+    whole, for the caller to slice with a TimeIndex.
+    """
+    if os.path.isdir(path):
+        runs = logsegments.list_runs(path)
+        if not runs:
+            raise SystemExit(f"No segmented logs in {path}")
+        name = run or sorted(runs)[-1]
+        if name not in runs:
+            raise SystemExit(f"No run {name} in {path}; runs: {', '.join(sorted(runs))}")
+        _, records = logsegments.read_range(runs[name], t0, t1)
+        return records, f"{name} ({len(runs[name])} segments)"
+    if path.endswith('.seg'):
+        _, records = logsegments.read_range([path], t0, t1)
+        return records, path
+    if path.endswith('.csv'):
+        return load_csv(path), path
+    _, records = binlog.read_log(path)
+    return records, path
+
+
+# ------------------------------ Metrics ------------------------------ #
+def resync_errors(records):
+    """
+    Dead-reckoning error (m) at each GPS resync: distance between the
+    estimate logged on the fix row (before the reset) and the fix.
+    The fix is converted to the navigator frame with the frame offset
+    seen on the rows right after each reset (median over all resyncs).
+    """
+    fix = np.flatnonzero(~np.isnan(records['lat']))
+    fix = fix[fix + 1 < len(records)]
+    if len(fix) < 2:
+        return np.zeros(0), fix
+
+    lat, lon = records['lat'][fix], records['lon'][fix]
+    fix_x = (lon - lon[0]) * 111320 * np.cos(np.radians(lat[0]))
+    fix_y = (lat - lat[0]) * 110540
+
+    after = fix + 1  # navigator has been reset to the fix here
+    offset_x = np.nanmedian(records['x_calc'][after] - fix_x)
+    offset_y = np.nanmedian(records['y_calc'][after] - fix_y)
+
+    ex = records['x_calc'][fix] - (fix_x + offset_x)
+    ey = records['y_calc'][fix] - (fix_y + offset_y)
+    errors = np.hypot(ex, ey)
+    return errors[1:], fix[1:]  # the first fix row is where tracking starts
+
+
+def command_times(records, periods):
+    """Seconds spent per motor command (each period goes to the row starting it)."""
+    codes = records['motor_command'][:-1]
+    totals = np.bincount(codes, weights=periods, minlength=len(binlog.MOTOR_COMMANDS))
+    return {(binlog.MOTOR_COMMANDS[code] or 'none'): float(seconds)
+            for code, seconds in enumerate(totals) if seconds > 0}
+
+
+def distances(records, resync_rows):
+    """(dead-reckoning distance, GPS distance) in meters."""
+    dx = np.diff(records['x_calc'].astype(np.float64))
+    dy = np.diff(records['y_calc'].astype(np.float64))
+    steps = np.hypot(dx, dy)
+    steps[np.isnan(steps)] = 0.0
+    steps[resync_rows[resync_rows < len(steps)]] = 0.0  # jumps onto the fix
+    dr = float(steps.sum())
+
+    has_fix = ~np.isnan(records['lat'])
+    lat, lon = records['lat'][has_fix], records['lon'][has_fix]
+    if len(lat) < 2:
+        return dr, 0.0
+    gx = np.diff(lon) * 111320 * np.cos(np.radians(lat[0]))
+    gy = np.diff(lat) * 110540
+    return dr, float(np.hypot(gx, gy).sum())
+
+
+def is_decimated(periods):
+    """True if rows are further apart than control-loop ticks (LOG_FREQUENCY > 0)."""
+    return len(periods) > 0 and np.median(periods) > DECIMATED_TICKS / config.IMU_FREQUENCY
+
+
+def summarize(records):
+    """
+    All metrics for a record array, as a dict. For a decimated log the
+    resync error and dead-reckoning distance are None (a decimated fix row
+    may already hold the reset estimate) and loop_period is None, with
+    the row spacing in log_period instead.
+    """
+    timestamps = records['timestamp']
+    periods = np.diff(timestamps)
+    decimated = is_decimated(periods)
+    errors, _ = resync_errors(records)
+    fix_rows = np.flatnonzero(~np.isnan(records['lat']))
+    dr_distance, gps_distance = distances(records, fix_rows)
+    if decimated:
+        errors, dr_distance = np.zeros(0), None
+
+    heading_error = records['heading_error']
+    heading_error = heading_error[~np.isnan(heading_error)]
+    hist, _ = np.histogram(heading_error, bins=HEADING_BINS)
+
+    summary = {
+        'records': int(len(records)),
+        'start': float(timestamps[0]) if len(records) else 0.0,
+        'duration': float(timestamps[-1] - timestamps[0]) if len(records) else 0.0,
+        'decimated': bool(decimated),
+        'resyncs': int(len(fix_rows)) - 1 if decimated else int(len(errors)),
+        'resync_error': _stats(errors),
+        'heading_error_hist': {f"{lo:+d}..{lo + 15:+d}": int(n)
+                               for lo, n in zip(HEADING_BINS[:-1], hist)},
+        'abs_heading_error': _stats(np.abs(heading_error)),
+        'command_seconds': command_times(records, periods) if len(records) > 1 else {},
+        'distance_dr': dr_distance,
+        'distance_gps': gps_distance,
+        'loop_period': None if decimated else _stats(periods),
+        'log_period': _stats(periods) if decimated else None,
+    }
+    return summary
+
+
+def _stats(values):
+    if len(values) == 0:
+        return None
+    stats = {'mean': float(np.mean(values)), 'max': float(np.max(values))}
+    for p, v in zip(PERCENTILES, np.percentile(values, PERCENTILES)):
+        stats[f"p{p}"] = float(v)
+    return stats
+
+
+# ------------------------------ Report ------------------------------ #
+def _line(label, stats, unit, scale=1.0):
+    if stats is None:
+        return f"  {label:<20} n/a"
+    return (f"  {label:<20} mean {stats['mean'] * scale:7.2f}{unit}  "
+            + "  ".join(f"p{p} {stats[f'p{p}'] * scale:7.2f}{unit}" for p in PERCENTILES)
+            + f"  max {stats['max'] * scale:7.2f}{unit}")
+
+
+def print_report(description, s):
+    print(f"{description}: {s['records']} records, {s['duration']:.1f}s "
+          f"from t={s['start']:.1f}s")
+
+    if s['decimated']:
+        print("Decimated log (LOG_FREQUENCY > 0): resync error, dead-reckoning "
+              "distance and loop rate need every row")
+
+    print("\nDead reckoning")
+    print(f"  resyncs              {s['resyncs']}")
+    print(_line("error at resync", s['resync_error'], "m"))
+    if s['distance_dr'] is None:
+        print(f"  distance             {s['distance_gps']:.1f}m between GPS fixes")
+    else:
+        print(f"  distance             {s['distance_dr']:.1f}m dead reckoning, "
+              f"{s['distance_gps']:.1f}m between GPS fixes")
+
+    if s['decimated']:
+        print("\nLog")
+        period, label = s['log_period'], "log period"
+    else:
+        print("\nControl loop")
+        period, label = s['loop_period'], "period"
+    if period is not None:
+        print(_line(label, period, "ms", 1000))
+        print(f"  rate                 {1 / period['mean']:.1f} Hz")
+
+    print("\nMotor commands")
+    total = sum(s['command_seconds'].values()) or 1.0
+    for command, seconds in sorted(s['command_seconds'].items(), key=lambda c: -c[1]):
+        print(f"  {command:<20} {seconds:8.1f}s  {seconds / total * 100:5.1f}%")
+
+    print("\nHeading error")
+    print(_line("|error|", s['abs_heading_error'], "°"))
+    hist = list(s['heading_error_hist'].items())
+    used = [i for i, (_, count) in enumerate(hist) if count]
+    peak = max((count for _, count in hist), default=0) or 1
+    for label, count in hist[used[0]:used[-1] + 1] if used else []:
+        print(f"  {label:>10}° {count:8d} {'#' * round(count / peak * 40)}")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Summarize a navigation log")
+    parser.add_argument('log', help=".bin, .csv or .seg file, or a segmented log directory")
+    parser.add_argument('--run', help="run name within a log directory (default: latest)")
+    parser.add_argument('--from', dest='t0', type=float, help="seconds since start")
+    parser.add_argument('--to', dest='t1', type=float, help="seconds since start")
+    parser.add_argument('--json', action='store_true', help="print the summary as JSON")
+    args = parser.parse_args()
+
+    start = time.perf_counter()
+    records, description = load(args.log, args.run, args.t0, args.t1)
+    if args.t0 is not None or args.t1 is not None:
+        records = records[TimeIndex(records['timestamp']).slice(args.t0, args.t1)]
+    summary = summarize(records)
+    elapsed = time.perf_counter() - start
+
+    if args.json:
+        json.dump(summary, sys.stdout, indent=2)
+        print()
+    else:
+        print_report(description, summary)
+        print(f"\nAnalyzed in {elapsed:.2f}s")
@@ -0,0 +1,291 @@
+# async_controller.py
+"""
+Asyncio variant of the main control loop.
+Each sensor runs as its own task and publishes its latest sample; the
+navigation task acts on whatever is freshest, so the slowest device no
+longer sets the pace for everything else.
+Under a VirtualClock the event loop runs on virtual time (the clock jumps
+to the next timer instead of waiting) and the sensors are read on the
+loop thread, so simulated missions stay deterministic.
+"""
+import asyncio
+import selectors
+from concurrent.futures import ThreadPoolExecutor
+import clock
+import config
+from imu import get_accel_sample
+from magnetometer import get_heading_sample
+from coordinate_transform import latlon_to_xy
+from datalogger import log_data
+from main import RoverController
+
+
+class _VirtualSelector(selectors.DefaultSelector):
+    """Polls instead of waiting, and advances the clock by the wait instead."""
+
+    def select(self, timeout=None):
+        if timeout is None:
+            return super().select(None)
+        events = super().select(0)
+        if not events:
+            clock.sleep(timeout)
+        return events
+
+
+class _VirtualTimeLoop(asyncio.SelectorEventLoop):
+    """Event loop whose timers run on the injected clock."""
+
+    def __init__(self):
+        super().__init__(_VirtualSelector())
+
+    def time(self):
+        return clock.monotonic()
+
+
+class AsyncRoverController(RoverController):
+    def __init__(self):
+        # The sensor tasks poll the drivers themselves; no acquisition process
+        super().__init__(use_sensor_process=False)
+
+        # Latest sample from each sensor task: (value, acquisition time) or None
+        self.latest = {'accel': None, 'heading': None, 'gps': None}
+        self.last_gps_used = None
+
+        # Created in _main() so they belong to the running event loop
+        # (None under a VirtualClock: sensors are read on the loop thread)
+        self._sensor_pool = None
+
+    # ------------------------- Sensor tasks ------------------------- #
+    async def _poll_sensor(self, key, read, rate_hz):
+        """
+        Read one sensor at rate_hz in the executor and publish it.
+        read: blocking driver call returning (acquisition time, value).
+        """
+        loop = asyncio.get_running_loop()
+        period = 1.0 / rate_hz
+
+        while True:
+            start = clock.monotonic()
+            try:
+                if self._sensor_pool is None:
+                    t, value = read()
+                else:
+                    t, value = await loop.run_in_executor(self._sensor_pool, read)
+                if value is not None:
+                    self.latest[key] = (value, t)
+            except Exception as e:
+                print(f"{key} read error: {e}")
+
+            elapsed = clock.monotonic() - start
+            await asyncio.sleep(max(0.0, period - elapsed))
+
+    def _read_gps(self):
+        t, (lat, lon, accuracy) = self.read_fix_sample()
+        if lat is None or lon is None:
+            return t, None
+        return t, (lat, lon, accuracy)
+
+    # ------------------------- Navigation ------------------------- #
+    def _fresh_gps_fix(self):
+        """
+        Latest GPS fix and its measurement time, (t, (lat, lon, accuracy)),
+        if it has not been used for a resync yet.
+        """
+        if self.latest['gps'] is None:
+            return None, (None, None, None)
+        fix, t = self.latest['gps']
+        if self.last_gps_used is not None and t <= self.last_gps_used:
+            return None, (None, None, None)
+        self.last_gps_used = t
+        return t, fix
+
+    async def control_step(self):
+        """One navigation tick using the freshest sensor samples."""
+        timing = self.timing
+        self.ticks += 1
+        if self.commands is not None:
+            self.apply_commands()
+            timing.mark('commands')
+        self.maneuvers.update()  # steps the maneuver when there is no timer thread
+        timing.mark('motors')
+        self.update_state_cache()
+        timing.mark('state')
+        if self.paused:
+            return
+        accel, t = self.latest['accel']
+        heading, _ = self.latest['heading']
+
+        command, speed = self.nav.get_navigation_command(heading)
+
+        # Only update position when moving forward (not during turns)
+        if command == 'forward':
+            state = self.nav.update_position(accel, heading, t)
+            timing.mark('navigation')
+            if state is None:
+                return  # First iteration, skip
+        else:
+            state = {
+                'x': self.nav.x,
+                'y': self.nav.y,
+                'vx': self.nav.vx,
+                'vy': self.nav.vy,
+                'heading': heading,
+                'ax_body': 0, 'ay_body': 0, 'az_body': 0,
+                'ax_earth': 0, 'ay_earth': 0
+            }
+            timing.mark('navigation')
+
+        self.last_heading = heading
+
+        # Resync from the GPS task's latest fix
+        lat, lon = None, None
+        if self.nav.should_resync_gps():
+            t, (lat, lon, accuracy) = self._fresh_gps_fix()
+            if lat is not None:
+                self.last_fix = [lat, lon, accuracy]
+                x, y = latlon_to_xy(lat, lon)
+                self.nav.apply_fix(x, y, t)
+                self.last_gps_update = clock.time()
+                if config.DEBUG_PRINT_NAVIGATION:
+                    print(f"GPS resync: ({x:.2f}, {y:.2f})")
+                timing.mark('gps')
+
+        # Execute motor command on the maneuver thread; this tick doesn't wait
+        if command == 'forward':
+            self.maneuvers.hold('forward', speed, config.FORWARD_HOLD)
+        elif command in ('turn_left', 'turn_right'):
+            if not self.maneuvers.busy(command):
+                self.maneuvers.submit(command, [(command, speed, config.TURN_PULSE),
+                                                ('stop', 0, config.TURN_SETTLE)])
+        elif command == 'stop':
+            self.maneuvers.stop()
+            self.running = False
+        timing.mark('motors')
+
+        heading_err = self.nav.get_heading_error(heading)
+        dist = self.nav.get_distance_to_destination()
+
+        # Debug print
+        if config.DEBUG_PRINT_NAVIGATION:
+            print(f"Pos:({state['x']:.1f},{state['y']:.1f}) "
+                  f"Heading:{state['heading']:.1f}° "
+                  f"Dist:{dist:.1f}m HErr:{heading_err:.1f}° Cmd:{command}")
+            timing.mark('debug')
+
+        # Queue log row; the log writer thread writes it off the control path
+        if config.LOG_ENABLED:
+            log_data(
+                lat=lat,
+                lon=lon,
+                x_calc=state['x'],
+                y_calc=state['y'],
+                vx=state['vx'],
+                vy=state['vy'],
+                ax_body=state['ax_body'],
+                ay_body=state['ay_body'],
+                az_body=state['az_body'],
+                ax_earth=state['ax_earth'],
+                ay_earth=state['ay_earth'],
+                heading=state['heading'],
+                target_bearing=self.nav.get_bearing_to_destination(),
+                heading_error=heading_err,
+                distance_to_dest=dist,
+                motor_command=command
+            )
+            timing.mark('log')
+
+    async def _navigate(self, timeout=None):
+        loop_time = 1.0 / config.IMU_FREQUENCY
+        deadline = None if timeout is None else clock.monotonic() + timeout
+
+        # Wait for the first IMU and magnetometer samples
+        while self.latest['accel'] is None or self.latest['heading'] is None:
+            await asyncio.sleep(loop_time)
+
+        while self.running:
+            if self.nav.has_reached_destination() and not self.next_waypoint():
+                break
+            if deadline is not None and clock.monotonic() >= deadline:
+                print("Mission timed out")
+                break
+            start = clock.monotonic()
+
+            if self.watchdog is not None:
+                self.watchdog.pet()
+            self.timing.start()
+            try:
+                await self.control_step()
+            finally:
+                self.timing.end()
+
+            # Maintain loop timing
+            elapsed = clock.monotonic() - start
+            if elapsed < loop_time:
+                await asyncio.sleep(loop_time - elapsed)
+
+    async def _main(self, timeout=None):
+        if clock.get_clock() is None:
+            self._sensor_pool = ThreadPoolExecutor(
+                max_workers=config.ASYNC_EXECUTOR_WORKERS,
+                thread_name_prefix='sensor')
+
+        tasks = [
+            asyncio.create_task(self._poll_sensor(
+                'accel', get_accel_sample, config.IMU_FREQUENCY)),
+            asyncio.create_task(self._poll_sensor(
+                'heading', get_heading_sample, config.MAG_HEADING_UPDATE)),
+            asyncio.create_task(self._poll_sensor(
+                'gps', self._read_gps, config.GPS_POLL_FREQUENCY)),
+        ]
+
+        try:
+            await self._navigate(timeout)
+        finally:
+            # Runs on normal exit and on cancellation (Ctrl+C)
+            self.maneuvers.stop()
+            for task in tasks:
+                task.cancel()
+            await asyncio.gather(*tasks, return_exceptions=True)
+
+            # A hung sensor read must not block shutdown
+            if self._sensor_pool is not None:
+                self._sensor_pool.shutdown(wait=False, cancel_futures=True)
+
+    def run(self, timeout=None):
+        """
+        Run the async control loop until destination reached.
+        timeout: optional limit in (clock) seconds, e.g. for simulated missions.
+        """
+        self.running = True
+
+        print("Starting navigation (async)...")
+
+        try:
+            if clock.get_clock() is None:
+                asyncio.run(self._main(timeout))
+            else:
+                loop = _VirtualTimeLoop()
+                try:
+                    loop.run_until_complete(self._main(timeout))
+                finally:
+                    loop.close()
+            print("Navigation complete!")
+
+        except KeyboardInterrupt:
+            print("\nStopping...")
+
+        finally:
+            if self.watchdog is not None:
+                self.watchdog.disarm()
+            self.maneuvers.stop()
+            self.shutdown()
+
+
+# Standalone test/demo
+if __name__ == "__main__":
+    rover = AsyncRoverController()
+
+    # Set a test destination (+- east / west, +- North/South from start)
+    rover.set_destination_xy(-3, 0)
+
+    rover.run()
@@ -0,0 +1,111 @@
+# backends.py
+"""
+Hardware backend registry.
+Device modules ask here for their driver objects instead of importing
+hardware libraries at import time, so nothing touches I2C, GPIO or gpsd
+until a device is first used. config.HARDWARE_BACKEND picks 'real',
+'sim' (simulated drivers from sim_devices) or 'replay' (recorded raw
+readings, see replay.py).
+"""
+import importlib
+import config
+
+# (backend, kind) -> factory
+_registry = {}
+
+# Backends whose factories live in another module, imported on first use
+_backend_modules = {'sim': 'sim_devices', 'replay': 'replay'}
+
+_active = None  # overrides config.HARDWARE_BACKEND when set
+
+# Functions (kind, device) -> device applied to every new driver, e.g. by
+# recorder to capture raw readings
+_wrappers = []
+
+
+def register(backend, kind, factory):
+    """Register factory as the driver for a device kind on a backend."""
+    _registry[(backend, kind)] = factory
+
+
+def set_backend(name):
+    """Select the backend for devices created from now on."""
+    global _active
+    _active = name
+
+
+def get_backend():
+    return _active if _active is not None else config.HARDWARE_BACKEND
+
+
+def add_wrapper(wrapper):
+    """Pass every driver created from now on through wrapper(kind, device)."""
+    _wrappers.append(wrapper)
+
+
+def remove_wrapper(wrapper):
+    if wrapper in _wrappers:
+        _wrappers.remove(wrapper)
+
+
+def create(kind, *args, **kwargs):
+    """
+    Create the driver for a device kind on the active backend.
+    Kinds (constructor args) and the interface their drivers provide:
+        'imu' (address)         get_accel_data(), get_gyro_data() -> {'x', 'y', 'z'}
+        'mag'                   read_mag_data() -> (mx, my, mz)
+        'gps'                   connect(); get_current() -> packet with
+                                mode, lat, lon, position_precision()
+        'pwm_output' (pin)      value (0.0-1.0)
+        'digital_output' (pin)  on(), off(), value
+    """
+    backend = get_backend()
+    if (backend, kind) not in _registry and backend in _backend_modules:
+        importlib.import_module(_backend_modules[backend])
+
+    factory = _registry.get((backend, kind))
+    if factory is None:
+        raise ValueError(f"No '{kind}' driver for backend '{backend}'")
+    device = factory(*args, **kwargs)
+    for wrapper in _wrappers:
+        device = wrapper(kind, device)
+    return device
+
+
+# ------------------------- Real hardware ------------------------- #
+# Hardware libraries are imported inside the factories, not at module level
+
+def _real_imu(address):
+    from mpu6050 import mpu6050
+    from i2cbus import get_bus
+    return mpu6050(address, bus=get_bus())
+
+
+def _real_mag():
+    from bmm150 import BMM150
+    from i2cbus import get_bus, SharedDevice
+    # The library opens its own handle to the bus; its reads still take
+    # the shared bus so they never interleave with the IMU's
+    return SharedDevice(BMM150(), get_bus(), ['read_mag_data'])
+
+
+def _real_gps():
+    import gpsd  # gpsd-py3; the module itself has connect()/get_current()
+    return gpsd
+
+
+def _real_pwm_output(pin):
+    from gpiozero import PWMOutputDevice
+    return PWMOutputDevice(pin)
+
+
+def _real_digital_output(pin):
+    from gpiozero import DigitalOutputDevice
+    return DigitalOutputDevice(pin)
+
+
+register('real', 'imu', _real_imu)
+register('real', 'mag', _real_mag)
+register('real', 'gps', _real_gps)
+register('real', 'pwm_output', _real_pwm_output)
+register('real', 'digital_output', _real_digital_output)
@@ -0,0 +1,71 @@
+# bench_control_latency.py
+"""
+Sense-to-actuate latency: RoverController vs AsyncRoverController.
+Runs both loops against simulated devices (no hardware needed) and
+reports the age of the freshest IMU/mag sample at every motor command.
+Usage: python3 bench_control_latency.py [seconds]
+"""
+import io
+import sys
+import threading
+import statistics
+from contextlib import redirect_stdout
+
+import sim_devices
+sim_devices.install()
+
+import config
+config.LOG_ENABLED = False
+config.DEBUG_PRINT_NAVIGATION = False
+# Simulated runs must not leave a warm-start state or timing dump behind
+config.WARM_START_ENABLED = False
+config.TIMING_ENABLED = False
+
+import motor_helper
+from main import RoverController
+from async_controller import AsyncRoverController
+
+latencies = []
+
+
+def _record(func):
+    def wrapper(*args, **kwargs):
+        age = sim_devices.sample_age()
+        if age is not None:
+            latencies.append(age)
+        return func(*args, **kwargs)
+    return wrapper
+
+
+for _name in ('forward', 'backward', 'turn_left', 'turn_right', 'stop'):
+    setattr(motor_helper, _name, _record(getattr(motor_helper, _name)))
+
+
+def measure(controller_cls, seconds):
+    """Run a controller for a fixed time, return (latencies, commands/s)."""
+    latencies.clear()
+    with redirect_stdout(io.StringIO()):
+        rover = controller_cls()
+        rover.set_destination_xy(0, 1000)  # straight ahead, never reached
+
+        timer = threading.Timer(seconds, lambda: setattr(rover, 'running', False))
+        timer.start()
+        rover.run()
+        timer.cancel()
+    return list(latencies), len(latencies) / seconds
+
+
+def report(name, values, rate):
+    values = sorted(values)
+    p95 = values[int(0.95 * (len(values) - 1))]
+    print(f"{name:<22} n={len(values):5d}  rate={rate:6.1f}/s  "
+          f"p50={statistics.median(values) * 1000:7.2f}ms  "
+          f"p95={p95 * 1000:7.2f}ms  max={values[-1] * 1000:7.2f}ms")
+
+
+if __name__ == "__main__":
+    seconds = float(sys.argv[1]) if len(sys.argv) > 1 else 5.0
+
+    print(f"Measuring sense-to-actuate latency ({seconds:.0f}s per loop)...")
+    report("RoverController", *measure(RoverController, seconds))
+    report("AsyncRoverController", *measure(AsyncRoverController, seconds))
@@ -0,0 +1,107 @@
+# bench_log_format.py
+"""
+CSV vs binary datalogger: cost per logged row, file size, and how fast
+the file can be read back into arrays for analysis.
+Usage: python3 bench_log_format.py [rows]
+"""
+import os
+import csv
+import sys
+import time
+import random
+import tempfile
+
+import numpy as np
+
+import config
+import datalogger
+import binlog
+
+COMMANDS = ['forward', 'turn_left', 'turn_right']
+
+
+def fake_rows(count, seed=0):
+    """Rows like the control loop logs: a GPS fix on one row in ten."""
+    rng = random.Random(seed)
+    rows = []
+    for i in range(count):
+        fix = i % 10 == 0
+        rows.append(dict(
+            lat=33.6189 + rng.random() * 1e-4 if fix else None,
+            lon=-117.6142 + rng.random() * 1e-4 if fix else None,
+            x_calc=rng.uniform(-20, 20), y_calc=rng.uniform(-20, 20),
+            vx=rng.random(), vy=rng.random(),
+            ax_body=rng.gauss(0, 0.1), ay_body=rng.gauss(0, 0.1), az_body=9.81,
+            ax_earth=rng.gauss(0, 0.1), ay_earth=rng.gauss(0, 0.1),
+            heading=rng.uniform(0, 360), target_bearing=rng.uniform(0, 360),
+            heading_error=rng.uniform(-180, 180), distance_to_dest=rng.uniform(0, 30),
+            motor_command=rng.choice(COMMANDS)))
+    return rows
+
+
+def write_log(log_format, filename, rows):
+    """Seconds per row through datalogger.log_data."""
+    config.LOG_ENABLED = True
+    config.LOG_FORMAT = log_format
+    config.LOG_ASYNC = False  # measure the sink itself, every row
+    datalogger.init_logger(filename)
+    start = time.perf_counter()
+    for row in rows:
+        datalogger.log_data(**row)
+    datalogger.flush()
+    elapsed = time.perf_counter() - start
+    datalogger.close_logger()
+    return elapsed / len(rows)
+
+
+def read_csv(filename):
+    """Parse the CSV log into float arrays, as an analysis script would."""
+    columns = {}
+    with open(filename, newline='') as f:
+        for row in csv.DictReader(f):
+            for name, value in row.items():
+                if name not in ('datetime', 'motor_command'):
+                    columns.setdefault(name, []).append(float(value) if value else np.nan)
+    return {name: np.array(values) for name, values in columns.items()}
+
+
+def read_binary(filename):
+    _, records = binlog.read_log(filename)
+    return {name: np.asarray(records[name]) for name in records.dtype.names}
+
+
+if __name__ == "__main__":
+    count = int(sys.argv[1]) if len(sys.argv) > 1 else 100000
+    rows = fake_rows(count)
+    tmp = tempfile.mkdtemp()
+    files = {'csv': os.path.join(tmp, 'log.csv'), 'binary': os.path.join(tmp, 'log.bin')}
+
+    results = {}
+    for log_format, filename in files.items():
+        per_row = write_log(log_format, filename, rows)
+        start = time.perf_counter()
+        data = (read_binary if log_format == 'binary' else read_csv)(filename)
+        read_time = time.perf_counter() - start
+        assert np.nansum(data['heading']) > 0
+        results[log_format] = (per_row, os.path.getsize(filename), read_time)
+
+    print(f"\n{count} rows")
+    print(f"{'format':<8} {'write/row (us)':>15} {'size (MB)':>10} "
+          f"{'bytes/row':>10} {'read (s)':>9} {'read rows/s':>12}")
+    for log_format, (per_row, size, read_time) in results.items():
+        print(f"{log_format:<8} {per_row * 1e6:15.1f} {size / 1e6:10.2f} "
+              f"{size / count:10.1f} {read_time:9.3f} {count / read_time:12.0f}")
+    csv_row, csv_size, csv_read = results['csv']
+    bin_row, bin_size, bin_read = results['binary']
+    print(f"\nbinary vs csv: {csv_row / bin_row:.1f}x cheaper per row, "
+          f"{csv_size / bin_size:.1f}x smaller, {csv_read / bin_read:.0f}x faster to load")
+
+    # The converter reproduces the CSV columns
+    converted = os.path.join(tmp, 'converted.csv')
+    binlog.to_csv(files['binary'], converted)
+    with open(files['csv']) as a, open(converted) as b:
+        assert next(a) == next(b), "CSV header mismatch"
+
+    for filename in list(files.values()) + [converted]:
+        os.remove(filename)
+    os.rmdir(tmp)
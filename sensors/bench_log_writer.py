@@ -0,0 +1,95 @@
+# bench_log_writer.py
+"""
+Control-thread cost of log_data() with synchronous vs queued logging.
+Logs rows at the control rate through datalogger, optionally with the
+file stalling now and then like an SD card, and reports how long each
+log_data() call held up the caller plus the writer's counters.
+Usage: python3 bench_log_writer.py [rows] [--stall MS] [--every N]
+"""
+import os
+import csv
+import time
+import argparse
+import tempfile
+import statistics
+
+import config
+import datalogger
+from bench_log_format import fake_rows
+
+
+class StallingFile:
+    """File wrapper whose every Nth write blocks for stall seconds."""
+
+    def __init__(self, f, stall, every):
+        self.f = f
+        self.stall = stall
+        self.every = every
+        self.writes = 0
+
+    def write(self, data):
+        self.writes += 1
+        if self.stall and self.writes % self.every == 0:
+            time.sleep(self.stall)
+        return self.f.write(data)
+
+
+def run(rows, log_async, filename, stall, every, rate_hz):
+    config.LOG_ENABLED = True
+    config.LOG_FORMAT = 'csv'
+    config.LOG_ASYNC = log_async
+    datalogger.init_logger(filename)
+    datalogger._csv_writer = csv.writer(StallingFile(datalogger._log_file, stall, every))
+
+    period = 1.0 / rate_hz
+    costs = []
+    for row in rows:
+        start = time.perf_counter()
+        datalogger.log_data(**row)
+        cost = time.perf_counter() - start
+        costs.append(cost)
+        time.sleep(max(0.0, period - cost))
+
+    writer = datalogger._writer
+    datalogger.close_logger()
+    stats = writer.stats() if writer else None
+    with open(filename) as f:
+        lines = sum(1 for _ in f) - 1
+    return costs, stats, lines
+
+
+def report(label, costs, lines):
+    costs = sorted(costs)
+    us = [c * 1e6 for c in costs]
+    print(f"{label:<8} mean {statistics.mean(us):8.1f}us  "
+          f"p50 {us[len(us) // 2]:8.1f}us  p99 {us[int(len(us) * 0.99)]:9.1f}us  "
+          f"max {us[-1]:9.1f}us  rows in file {lines}")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Measure log_data cost on the control thread")
+    parser.add_argument('rows', nargs='?', type=int, default=2000)
+    parser.add_argument('--rate', type=float, default=200.0, help="log_data calls per second")
+    parser.add_argument('--stall', type=float, default=50.0, help="file stall in ms (0 = none)")
+    parser.add_argument('--every', type=int, default=100, help="stall every N file writes")
+    args = parser.parse_args()
+
+    rows = fake_rows(args.rows)
+    filename = os.path.join(tempfile.mkdtemp(), 'log.csv')
+    print(f"{args.rows} rows at {args.rate:.0f} Hz, {args.stall:.0f}ms stall every "
+          f"{args.every} writes, LOG_FREQUENCY={config.LOG_FREQUENCY} "
+          f"({config.LOG_DECIMATION}), queue {config.LOG_QUEUE_SIZE} ({config.LOG_OVERFLOW})\n")
+
+    results = {}
+    for label, log_async in (('sync', False), ('async', True)):
+        results[label] = run(rows, log_async, filename, args.stall / 1000, args.every, args.rate)
+
+    print()
+    for label, (costs, stats, lines) in results.items():
+        report(label, costs, lines)
+    stats = results['async'][1]
+    print(f"\nWriter: {stats['enqueued']} queued, {stats['written']} written in "
+          f"{stats['batches']} batches, {stats['dropped']} dropped, "
+          f"{stats['blocked']} blocked, max queue depth {stats['max_depth']}")
+    os.remove(filename)
+    os.rmdir(os.path.dirname(filename))
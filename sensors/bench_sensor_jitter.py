@@ -0,0 +1,79 @@
+# bench_sensor_jitter.py
+"""
+IMU sample-timing jitter with and without the acquisition process.
+The main process runs CPU-heavy Python work (standing in for Navigator,
+logging and debug printing) while IMU samples are taken either by a
+thread in the same process or by the SensorProcess child.
+Uses simulated devices; no hardware needed.
+Usage: python3 bench_sensor_jitter.py [seconds]
+"""
+import sys
+import math
+import time
+import threading
+import statistics
+
+import sim_devices
+sim_devices.install()
+
+import config
+from sensor_process import CHANNELS, RingBuffer, SensorProcess, acquire
+
+
+def busy_work(seconds):
+    """Pure-Python load that holds the GIL most of the time."""
+    end = time.monotonic() + seconds
+    text = []
+    while time.monotonic() < end:
+        for i in range(200):
+            x = math.sin(i) * math.cos(i) + math.sqrt(i)
+            text.append(f"Pos:({x:.1f},{x * 2:.1f}) Heading:{i % 360:.1f}")
+        text.clear()
+
+
+def run_in_thread(seconds):
+    rings = {name: RingBuffer(bytearray(RingBuffer.size(len(fields), 4096)),
+                              len(fields), 4096)
+             for name, fields in CHANNELS.items()}
+    stop, ready = threading.Event(), threading.Event()
+    sampler = threading.Thread(target=acquire, args=(rings, stop, ready))
+    sampler.start()
+    ready.wait()
+    start_seq = rings['imu'].count
+
+    busy_work(seconds)
+
+    stop.set()
+    sampler.join()
+    return [t for t, _ in rings['imu'].since(start_seq)]
+
+
+def run_in_process(seconds):
+    sensors = SensorProcess(capacity=4096)
+    sensors.start()
+    start_seq = sensors.rings['imu'].count
+
+    busy_work(seconds)
+
+    times = [t for t, _ in sensors.rings['imu'].since(start_seq)]
+    sensors.stop()
+    return times
+
+
+def report(name, times):
+    period = 1.0 / config.IMU_FREQUENCY
+    intervals = [b - a for a, b in zip(times, times[1:])]
+    errors = sorted(abs(i - period) for i in intervals)
+    p99 = errors[int(0.99 * (len(errors) - 1))]
+    print(f"{name:<18} n={len(times):5d}  "
+          f"mean={statistics.mean(intervals) * 1000:6.2f}ms  "
+          f"std={statistics.stdev(intervals) * 1000:6.3f}ms  "
+          f"p99 jitter={p99 * 1000:6.3f}ms  max jitter={errors[-1] * 1000:6.3f}ms")
+
+
+if __name__ == "__main__":
+    seconds = float(sys.argv[1]) if len(sys.argv) > 1 else 10.0
+
+    print(f"IMU sampling at {config.IMU_FREQUENCY}Hz under load ({seconds:.0f}s each)")
+    report("thread (no split)", run_in_thread(seconds))
+    report("sensor process", run_in_process(seconds))
@@ -0,0 +1,248 @@
+# binlog.py
+"""
+Binary telemetry log: the datalogger columns as packed fixed-width records.
+
+File layout:
+    MAGIC (8 bytes) | header length (uint32 LE) | header JSON | records...
+The JSON header carries the format version, the start time, the record
+layout and the motor command codes. Each record is one struct.pack_into()
+into a preallocated block, written out when the block fills or on flush().
+Missing values are NaN (motor_command: code 0). A record cut short by a
+crash is ignored by the reader.
+
+The reader memory-maps the records as a NumPy structured array; numpy is
+only needed for reading, not on the rover.
+Usage:
+    python3 binlog.py rover_navigation_log.bin             # summary
+    python3 binlog.py rover_navigation_log.bin --csv out.csv
+"""
+import csv
+import json
+import math
+import struct
+from datetime import datetime
+
+MAGIC = b'RVRLOG\x00\x01'
+VERSION = 1
+
+# (column, struct code) - same columns as the CSV log minus 'datetime',
+# which is start_time + timestamp
+FIELDS = [
+    ('timestamp', 'd'),          # seconds since start
+    ('lat', 'd'),
+    ('lon', 'd'),
+    ('x_calc', 'f'),
+    ('y_calc', 'f'),
+    ('vx', 'f'),
+    ('vy', 'f'),
+    ('ax_body', 'f'),
+    ('ay_body', 'f'),
+    ('az_body', 'f'),
+    ('ax_earth', 'f'),
+    ('ay_earth', 'f'),
+    ('heading', 'f'),
+    ('target_bearing', 'f'),
+    ('heading_error', 'f'),
+    ('distance_to_dest', 'f'),
+    ('motor_command', 'B'),      # code into MOTOR_COMMANDS
+]
+
+# Code 0 = not logged; new commands go at the end so existing logs keep their codes
+MOTOR_COMMANDS = ['', 'forward', 'turn_left', 'turn_right', 'stop', 'backward']
+
+# CSV formatting per column, matching datalogger's CSV output
+CSV_FORMATS = {
+    'timestamp': '{:.3f}', 'lat': '{}', 'lon': '{}',
+    'heading': '{:.1f}', 'target_bearing': '{:.1f}', 'heading_error': '{:.1f}',
+}
+
+RECORD = struct.Struct('<' + ''.join(code for _, code in FIELDS))
+BLOCK_RECORDS = 256  # records buffered per write
+
+NAN = math.nan
+_command_codes = {name: code for code, name in enumerate(MOTOR_COMMANDS)}
+
+
+def header_json(start_time):
+    """Header describing the record layout, as JSON bytes."""
+    return json.dumps({
+        'version': VERSION,
+        'start_time': start_time,
+        'fields': FIELDS,
+        'record_size': RECORD.size,
+        'motor_commands': MOTOR_COMMANDS,
+    }).encode()
+
+
+def pack_into(buffer, offset, timestamp, lat, lon, x_calc, y_calc, vx, vy,
+              ax_body, ay_body, az_body, ax_earth, ay_earth, heading,
+              target_bearing, heading_error, distance_to_dest, motor_command):
+    """Pack one record at offset; None values are stored as NaN."""
+    RECORD.pack_into(
+        buffer, offset,
+        timestamp,
+        NAN if lat is None else lat,
+        NAN if lon is None else lon,
+        NAN if x_calc is None else x_calc,
+        NAN if y_calc is None else y_calc,
+        NAN if vx is None else vx,
+        NAN if vy is None else vy,
+        NAN if ax_body is None else ax_body,
+        NAN if ay_body is None else ay_body,
+        NAN if az_body is None else az_body,
+        NAN if ax_earth is None else ax_earth,
+        NAN if ay_earth is None else ay_earth,
+        NAN if heading is None else heading,
+        NAN if target_bearing is None else target_bearing,
+        NAN if heading_error is None else heading_error,
+        NAN if distance_to_dest is None else distance_to_dest,
+        _command_codes.get(motor_command, 0))
+
+
+class BinaryLogWriter:
+    """Appends records to a new binary log file."""
+
+    def __init__(self, filename, start_time):
+        self.filename = filename
+        self.start_time = start_time
+        self.records = 0
+        self._block = bytearray(RECORD.size * BLOCK_RECORDS)
+        self._used = 0  # records in the current block
+
+        header = header_json(start_time)
+        self._file = open(filename, 'wb')
+        self._file.write(MAGIC + struct.pack('<I', len(header)) + header)
+
+    def write(self, *record):
+        """Append one record (timestamp, then the log_data values)."""
+        pack_into(self._block, self._used * RECORD.size, *record)
+        self._used += 1
+        self.records += 1
+        if self._used == BLOCK_RECORDS:
+            self._file.write(self._block)
+            self._used = 0
+
+    def flush(self):
+        """Write out the partial block and flush the file."""
+        if self._used:
+            self._file.write(memoryview(self._block)[:self._used * RECORD.size])
+            self._used = 0
+        self._file.flush()
+
+    def close(self):
+        self.flush()
+        self._file.close()
+
+
+def read_header(filename):
+    """Return (header dict, offset of the first record)."""
+    with open(filename, 'rb') as f:
+        if f.read(len(MAGIC)) != MAGIC:
+            raise ValueError(f"{filename}: not a binary rover log")
+        (length,) = struct.unpack('<I', f.read(4))
+        header = json.loads(f.read(length))
+    if header['version'] != VERSION:
+        raise ValueError(f"{filename}: log version {header['version']}, "
+                         f"reader supports {VERSION}")
+    return header, len(MAGIC) + 4 + length
+
+
+def dtype_of(header):
+    """NumPy structured dtype for the record layout in header."""
+    import numpy as np
+    return np.dtype([(name, '<' + code) for name, code in header['fields']])
+
+
+def read_log(filename):
+    """
+    Memory-map a binary log.
+    Returns (header, structured array); a trailing partial record is ignored.
+    """
+    import os
+    import numpy as np
+
+    header, offset = read_header(filename)
+    dtype = dtype_of(header)
+    count = (os.path.getsize(filename) - offset) // dtype.itemsize
+    if count == 0:
+        return header, np.zeros(0, dtype=dtype)
+    return header, np.memmap(filename, dtype=dtype, mode='r',
+                             offset=offset, shape=(count,))
+
+
+def unpack_records(header, data):
+    """Yield the packed records in data as dicts (None for missing values)."""
+    names = [name for name, _ in header['fields']]
+    layout = struct.Struct('<' + ''.join(code for _, code in header['fields']))
+    commands = header['motor_commands']
+    whole = len(data) - len(data) % layout.size
+    for values in layout.iter_unpack(memoryview(data)[:whole]):
+        row = dict(zip(names, values))
+        for name, value in row.items():
+            if isinstance(value, float) and math.isnan(value):
+                row[name] = None
+        row['motor_command'] = commands[row['motor_command']] or None
+        yield row
+
+
+def iter_records(filename):
+    """Yield records as dicts (None for missing values), without numpy."""
+    header, offset = read_header(filename)
+    chunk = header['record_size'] * 4096
+    with open(filename, 'rb') as f:
+        f.seek(offset)
+        while True:
+            data = f.read(chunk)
+            yield from unpack_records(header, data)
+            if len(data) < chunk:
+                return
+
+
+def write_csv(start_time, records, csv_filename):
+    """Write record dicts in the datalogger's CSV columns. Returns row count."""
+    columns = [name for name, _ in FIELDS]
+    rows = 0
+    with open(csv_filename, 'w', newline='') as f:
+        writer = csv.writer(f)
+        writer.writerow(columns[:1] + ['datetime'] + columns[1:])
+        for record in records:
+            cells = []
+            for name in columns:
+                value = record[name]
+                if value is None:
+                    cells.append('')
+                elif name == 'motor_command':
+                    cells.append(value)
+                else:
+                    cells.append(CSV_FORMATS.get(name, '{:.3f}').format(value))
+            dt = datetime.fromtimestamp(start_time + record['timestamp'])
+            cells.insert(1, dt.strftime('%Y-%m-%d %H:%M:%S.%f')[:-3])
+            writer.writerow(cells)
+            rows += 1
+    return rows
+
+
+def to_csv(filename, csv_filename):
+    """Convert a binary log to the datalogger's CSV columns. Returns row count."""
+    header, _ = read_header(filename)
+    return write_csv(header['start_time'], iter_records(filename), csv_filename)
+
+
+if __name__ == "__main__":
+    import argparse
+
+    parser = argparse.ArgumentParser(description="Inspect or convert a binary rover log")
+    parser.add_argument('log')
+    parser.add_argument('--csv', metavar='FILE', help="convert to CSV")
+    args = parser.parse_args()
+
+    if args.csv:
+        rows = to_csv(args.log, args.csv)
+        print(f"Wrote {rows} rows to {args.csv}")
+    else:
+        header, records = read_log(args.log)
+        start = datetime.fromtimestamp(header['start_time'])
+        print(f"{args.log}: version {header['version']}, {len(records)} records "
+              f"of {header['record_size']} bytes, started {start:%Y-%m-%d %H:%M:%S}")
+        if len(records):
+            print(f"Duration: {records['timestamp'][-1]:.1f}s")
@@ -0,0 +1,308 @@
+# characterize.py
+"""
+IMU and magnetometer characterization: achieved sample rate, per-read
+latency and overlapping Allan deviation per axis, for choosing
+IMU_FREQUENCY and filter gains.
+Sources:
+  - live hardware: reads each sensor back to back (or at --rate) for
+    --seconds; keep the rover completely still
+  - simulated devices (--sim) on a virtual clock, so an hour of samples
+    takes seconds; --set NAME=VALUE changes sim_devices noise parameters
+  - a raw recording (recorder.py; RECORD_RAW or --save); recordings have
+    no per-read latency
+The Allan deviation is computed from the cumulative sum with one NumPy
+pass over the data per averaging time, so hours of samples take seconds.
+From each curve:
+  - white noise density N (slope -1/2: adev = N / sqrt(tau))
+  - bias instability B (flat minimum: adev_min / 0.664) and its tau;
+    averaging longer than that adds drift instead of removing noise
+  - random walk K (slope +1/2: adev = K * sqrt(tau / 3)) if the curve
+    reaches it
+Usage:
+    python3 characterize.py imu mag --seconds 600
+    python3 characterize.py imu gyro mag --sim --seconds 3600 --set ACCEL_BIAS_WALK=0.002
+    python3 characterize.py --file rover_raw.rec --csv adev
+"""
+import sys
+import json
+import time
+import array
+import argparse
+
+import numpy as np
+
+import clock
+import recorder
+
+# Sensor -> (axis names, unit); names as in recorder.KINDS
+SENSORS = {
+    'imu': (('ax', 'ay', 'az'), 'm/s^2'),
+    'gyro': (('gx', 'gy', 'gz'), 'deg/s'),
+    'mag': (('mx', 'my', 'mz'), 'uT'),
+}
+PERCENTILES = (50, 90, 99)
+TAUS_PER_DECADE = 10
+MIN_AVERAGES = 10  # longest tau leaves at least this many independent averages
+BIAS_INSTABILITY_FACTOR = 0.664  # adev minimum / B for flicker noise
+SLOPE_TOLERANCE = 0.15  # local log-log slope within this of -1/2 or +1/2
+GRAVITIY_MS2 = 9.80665
+
+
+# ------------------------------ Sources ------------------------------ #
+def _reader(sensor):
+    """Blocking read of one sensor through the active backend -> (x, y, z)."""
+    if sensor == 'mag':
+        from magnetometer import read_mag_raw
+        return lambda: read_mag_raw()[:3]
+    from imu import get_accel, get_gyro
+    return get_accel if sensor == 'imu' else get_gyro
+
+
+def capture(sensor, seconds, rate=None):
+    """
+    Read sensor for seconds of clock time, back to back or at rate Hz.
+    Returns (t, latency, values): acquisition times (middle of each read),
+    read durations and an (n, 3) array.
+    """
+    read = _reader(sensor)
+    read()  # driver setup isn't part of the first read
+    times, latencies, values = array.array('d'), array.array('d'), array.array('d')
+    period = 1.0 / rate if rate else 0.0
+    now = clock.monotonic()
+    end = now + seconds
+    next_due = now
+    while now < end:
+        value = read()
+        after = clock.monotonic()
+        times.append((now + after) / 2)
+        latencies.append(after - now)
+        values.extend(value)
+        if period:
+            next_due += period
+            clock.sleep(max(0.0, next_due - after))
+        now = clock.monotonic()
+    return (np.frombuffer(times), np.frombuffer(latencies),
+            np.frombuffer(values).reshape(-1, 3))
+
+
+def load_recording(filename):
+    """
+    Raw recording -> {sensor: (t, None, (n, 3) values)}, read as one
+    NumPy array instead of record by record.
+    """
+    dtype = np.dtype([('code', 'u1'), ('t', '<f8'), ('v', '<f8', 4)])  # recorder.RECORD
+    with open(filename, 'rb') as f:
+        _, offset = recorder.read_header(f)
+        f.seek(offset)
+        data = f.read()
+    whole = len(data) - len(data) % dtype.itemsize  # a record cut short by a crash
+    records = np.frombuffer(data[:whole], dtype=dtype)
+    streams = {}
+    for sensor in SENSORS:
+        rows = records[records['code'] == recorder.CODES[sensor]]
+        if len(rows) < 2:
+            continue
+        rows = rows[np.argsort(rows['t'], kind='stable')]  # threads may interleave writes
+        values = rows['v'][:, :3].copy()
+        if sensor == 'imu':
+            values[rows['v'][:, 3] == 1.0] *= GRAVITIY_MS2  # read in g
+        streams[sensor] = (rows['t'].copy(), None, values)
+    return streams
+
+
+# ------------------------------ Analysis ------------------------------ #
+def allan_deviation(values, tau0, taus_per_decade=TAUS_PER_DECADE):
+    """
+    Overlapping Allan deviation of evenly spaced samples (n,) or (n, axes)
+    taken every tau0 seconds. Returns (taus, adev) with adev shaped
+    (len(taus), axes); taus are log-spaced multiples of tau0.
+    """
+    y = np.asarray(values, dtype=np.float64)
+    if y.ndim == 1:
+        y = y[:, None]
+    n = len(y)
+    longest = max(1, n // (2 * MIN_AVERAGES))
+    count = int(np.log10(longest) * taus_per_decade) + 1
+    m = np.unique(np.round(np.logspace(0, np.log10(longest), count)).astype(np.int64))
+
+    # theta[k] = integral of y up to sample k; removing the mean first keeps
+    # the running sum small, so hours of data lose no precision
+    theta = np.empty((n + 1, y.shape[1]))
+    theta[0] = 0.0
+    np.cumsum(y - y.mean(axis=0), axis=0, out=theta[1:])
+    theta *= tau0
+
+    adev = np.empty((len(m), y.shape[1]))
+    for i, k in enumerate(m):
+        d = theta[2 * k:] - 2 * theta[k:-k] + theta[:-2 * k]
+        adev[i] = np.sqrt(np.einsum('ij,ij->j', d, d) / (2 * (k * tau0) ** 2 * len(d)))
+    return m * tau0, adev
+
+
+def noise_parameters(taus, adev):
+    """
+    Noise terms of one axis from its Allan deviation curve:
+    {'white', 'bias_instability', 'tau_min', 'random_walk'}; white or
+    random_walk is None when the curve has no stretch with that slope.
+    """
+    log_tau, log_adev = np.log10(taus), np.log10(adev)
+    slopes = np.diff(log_adev) / np.diff(log_tau)
+    centers = (log_tau[1:] + log_tau[:-1]) / 2
+    params = {'white': None, 'random_walk': None}
+    for name, slope, scale in (('white', -0.5, lambda tau: np.sqrt(tau)),
+                               ('random_walk', 0.5, lambda tau: np.sqrt(3 / tau))):
+        if len(slopes) == 0:
+            break
+        i = int(np.argmin(np.abs(slopes - slope)))
+        if abs(slopes[i] - slope) <= SLOPE_TOLERANCE:
+            tau = 10 ** centers[i]
+            params[name] = float(10 ** ((log_adev[i] + log_adev[i + 1]) / 2) * scale(tau))
+    j = int(np.argmin(adev))
+    params['bias_instability'] = float(adev[j] / BIAS_INSTABILITY_FACTOR)
+    params['tau_min'] = float(taus[j])
+    # Still falling at the longest tau: B is only an upper bound, record longer
+    params['minimum_found'] = j < len(adev) - 1
+    return params
+
+
+def _stats(values):
+    if values is None or len(values) == 0:
+        return None
+    stats = {'mean': float(np.mean(values)), 'max': float(np.max(values))}
+    for p, v in zip(PERCENTILES, np.percentile(values, PERCENTILES)):
+        stats[f"p{p}"] = float(v)
+    return stats
+
+
+def characterize(sensor, t, latency, values):
+    """Rate, latency and per-axis noise summary of one sensor's samples."""
+    intervals = np.diff(t)
+    duration = float(t[-1] - t[0])
+    tau0 = duration / (len(t) - 1)  # samples are treated as evenly spaced
+    taus, adev = allan_deviation(values, tau0)
+    axes, unit = SENSORS[sensor]
+    summary = {
+        'sensor': sensor,
+        'unit': unit,
+        'samples': int(len(t)),
+        'duration': duration,
+        'rate': 1.0 / tau0,
+        'interval': _stats(intervals),
+        'gaps': int(np.count_nonzero(intervals > 2 * np.median(intervals))),
+        'latency': _stats(latency),
+        'axes': {},
+        'adev': {'tau': taus.tolist()},
+    }
+    for i, axis in enumerate(axes):
+        summary['axes'][axis] = {'mean': float(values[:, i].mean()),
+                                 'std': float(values[:, i].std()),
+                                 **noise_parameters(taus, adev[:, i])}
+        summary['adev'][axis] = adev[:, i].tolist()
+    return summary
+
+
+# ------------------------------ Report ------------------------------ #
+def _ms(stats):
+    return (f"mean {stats['mean'] * 1000:.3f}  "
+            + "  ".join(f"p{p} {stats[f'p{p}'] * 1000:.3f}" for p in PERCENTILES)
+            + f"  max {stats['max'] * 1000:.3f} ms")
+
+
+def _number(value, bound=False):
+    if value is None:
+        return f"{'-':>11}"
+    return f"{'<' if bound else ''}{value:.4g}".rjust(11)
+
+
+def print_report(s):
+    print(f"\n{s['sensor']} ({s['unit']}): {s['samples']} samples in {s['duration']:.1f}s, "
+          f"{s['rate']:.2f} Hz achieved, {s['gaps']} gaps")
+    print(f"  interval       {_ms(s['interval'])}")
+    if s['latency'] is not None:
+        print(f"  read latency   {_ms(s['latency'])}")
+    print(f"  {'axis':<6}{'mean':>11}{'std':>11}{'white /rtHz':>12}{'bias inst':>11}"
+          f"{'at tau s':>11}{'rand walk':>11}")
+    for axis, a in s['axes'].items():
+        print(f"  {axis:<6}{_number(a['mean'])}{_number(a['std'])} {_number(a['white'])}"
+              f"{_number(a['bias_instability'], not a['minimum_found'])}{_number(a['tau_min'])}"
+              f"{_number(a['random_walk'])}")
+
+    # Curve at roughly one point per decade
+    taus = np.array(s['adev']['tau'])
+    rows = sorted({int(np.argmin(np.abs(np.log10(taus) - d)))
+                   for d in range(int(np.floor(np.log10(taus[0]))),
+                                  int(np.ceil(np.log10(taus[-1]))) + 1)})
+    print(f"  {'tau s':>9}" + "".join(f"{axis:>11}" for axis in s['axes']))
+    for i in rows:
+        print(f"  {taus[i]:9.3g}" + "".join(_number(s['adev'][axis][i]) for axis in s['axes']))
+
+
+def write_csv(prefix, s):
+    """Allan deviation curve to PREFIX_<sensor>.csv (tau, one column per axis)."""
+    filename = f"{prefix}_{s['sensor']}.csv"
+    axes = list(s['axes'])
+    columns = np.column_stack([s['adev']['tau']] + [s['adev'][axis] for axis in axes])
+    np.savetxt(filename, columns, delimiter=',', header=','.join(['tau'] + axes),
+               comments='', fmt='%.6g')
+    return filename
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Sensor sample rate, latency and Allan deviation")
+    parser.add_argument('sensors', nargs='*', metavar='SENSOR',
+                        help=f"any of {', '.join(SENSORS)} (default: imu mag)")
+    parser.add_argument('--file', help="analyze a raw recording instead of reading sensors")
+    parser.add_argument('--sim', action='store_true', help="simulated devices on a virtual clock")
+    parser.add_argument('--seed', type=int, default=None, help="simulated noise seed")
+    parser.add_argument('--set', action='append', default=[], metavar='NAME=VALUE',
+                        help="sim_devices parameter for --sim, e.g. ACCEL_BIAS_WALK=0.002")
+    parser.add_argument('--seconds', type=float, default=60.0, help="capture length per sensor")
+    parser.add_argument('--rate', type=float, help="read at this rate (default: back to back)")
+    parser.add_argument('--save', metavar='FILE', help="record the capture for --file runs")
+    parser.add_argument('--csv', metavar='PREFIX', help="write Allan deviation curves as CSV")
+    parser.add_argument('--json', action='store_true', help="print the summaries as JSON")
+    args = parser.parse_args()
+    sensors = args.sensors or ['imu', 'mag']
+    for sensor in sensors:
+        if sensor not in SENSORS:
+            parser.error(f"unknown sensor {sensor!r}; choose from {', '.join(SENSORS)}")
+
+    if args.file:
+        streams = load_recording(args.file)
+        streams = {sensor: streams[sensor] for sensor in sensors if sensor in streams}
+    else:
+        if args.sim:
+            import sim_devices
+            from simulate import _parse_override
+            for name, value in map(_parse_override, args.set):
+                setattr(sim_devices, name, value)
+            sim_devices.install()
+            clock.set_clock(clock.VirtualClock(epoch=sim_devices.SIM_EPOCH))
+            sim_devices.reset(seed=args.seed)
+        else:
+            print("Keep the sensors completely still...")
+        if args.save:
+            recorder.start(args.save)  # before the drivers are created
+        streams = {}
+        try:
+            for sensor in sensors:
+                start = time.perf_counter()
+                streams[sensor] = capture(sensor, args.seconds, args.rate)
+                print(f"{sensor}: {len(streams[sensor][0])} samples "
+                      f"in {time.perf_counter() - start:.1f}s", file=sys.stderr)
+        finally:
+            recorder.stop()
+
+    start = time.perf_counter()
+    summaries = [characterize(sensor, *streams[sensor]) for sensor in streams]
+    elapsed = time.perf_counter() - start
+    if args.csv:
+        for s in summaries:
+            print(f"Wrote {write_csv(args.csv, s)}", file=sys.stderr)
+    if args.json:
+        json.dump(summaries, sys.stdout, indent=2)
+        print()
+    else:
+        for s in summaries:
+            print_report(s)
+        print(f"\nAnalyzed {sum(s['samples'] for s in summaries)} samples in {elapsed:.2f}s")
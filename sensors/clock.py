@@ -0,0 +1,62 @@
+# clock.py
+"""
+Injectable clock for the control path.
+Navigator, RoverController and the simulated devices read the time and
+sleep through here, so a simulation can swap in a VirtualClock and run
+missions as fast as the CPU allows.
+"""
+import time as _time
+import threading
+
+_clock = None  # None = real time
+
+
+class VirtualClock:
+    """Simulated time: starts at 0 and only advances when something sleeps."""
+
+    def __init__(self, start=0.0, epoch=None):
+        self.t = start
+        self.epoch = _time.time() if epoch is None else epoch
+        self.lock = threading.Lock()
+
+    def monotonic(self):
+        return self.t
+
+    def time(self):
+        return self.epoch + self.t
+
+    def sleep(self, seconds):
+        if seconds > 0:
+            with self.lock:
+                self.t += seconds
+
+
+def set_clock(clock):
+    """Use clock (e.g. a VirtualClock) from now on; None restores real time."""
+    global _clock
+    _clock = clock
+
+
+def get_clock():
+    return _clock
+
+
+def time():
+    """Wall-clock seconds (like time.time())."""
+    if _clock is None:
+        return _time.time()
+    return _clock.time()
+
+
+def monotonic():
+    """Monotonic seconds (like time.monotonic())."""
+    if _clock is None:
+        return _time.monotonic()
+    return _clock.monotonic()
+
+
+def sleep(seconds):
+    if _clock is None:
+        _time.sleep(seconds)
+    else:
+        _clock.sleep(seconds)
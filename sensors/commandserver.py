@@ -0,0 +1,253 @@
+# commandserver.py
+"""
+Remote command channel for retasking a running mission.
+Commands are JSON objects, one per UDP datagram or one per line on a TCP
+connection:
+    {"seq": 1, "cmd": "goto", "x": 5, "y": 10}          (or "lat", "lon")
+    {"seq": 2, "cmd": "mission", "waypoints": [[0, 5], {"lat": 33.61, "lon": -117.61}]}
+    {"seq": 3, "cmd": "pause"}
+    {"seq": 4, "cmd": "resume"}
+    {"seq": 5, "cmd": "stop"}                            (emergency stop)
+The server runs an asyncio loop on its own thread. Commands are queued
+and the controller applies them at its next tick boundary, then each is
+acknowledged to the sender with its sequence number:
+    {"seq": 1, "status": "ok", "tick": 1234}
+    {"seq": 6, "status": "error", "error": "unknown command 'fly'"}
+Stop doesn't wait for a tick: the server calls the stop handler as soon
+as the datagram or line arrives and acknowledges once the motors are off.
+There is no authentication; COMMAND_HOST defaults to loopback.
+Usage:
+    python3 commandserver.py --send '{"cmd": "goto", "x": 5, "y": 10}'
+    python3 commandserver.py --send '{"cmd": "stop"}' --tcp
+"""
+import json
+import time
+import socket
+import asyncio
+import argparse
+import threading
+import collections
+import config
+
+COMMANDS = ('goto', 'mission', 'pause', 'resume', 'stop')
+
+
+def parse_waypoint(point):
+    """[x, y], {"x", "y"} or {"lat", "lon"} -> ('xy', x, y) or ('latlon', lat, lon)."""
+    if isinstance(point, dict):
+        if 'lat' in point and 'lon' in point:
+            return 'latlon', float(point['lat']), float(point['lon'])
+        return 'xy', float(point['x']), float(point['y'])
+    x, y = point
+    return 'xy', float(x), float(y)
+
+
+def parse_command(data):
+    """
+    Bytes of one command -> dict with 'seq', 'cmd' and, for goto and
+    mission, 'waypoints' [(kind, a, b), ...]. Raises ValueError.
+    """
+    try:
+        message = json.loads(data)
+    except (UnicodeDecodeError, json.JSONDecodeError) as e:
+        raise ValueError(f"bad JSON: {e}")
+    if not isinstance(message, dict):
+        raise ValueError("command must be a JSON object")
+    name = message.get('cmd')
+    if name not in COMMANDS:
+        raise ValueError(f"unknown command {name!r}")
+    command = {'seq': message.get('seq'), 'cmd': name}
+    try:
+        if name == 'goto':
+            command['waypoints'] = [parse_waypoint(message)]
+        elif name == 'mission':
+            command['waypoints'] = [parse_waypoint(p) for p in message['waypoints']]
+            if not command['waypoints']:
+                raise ValueError("mission has no waypoints")
+    except (KeyError, TypeError) as e:
+        raise ValueError(f"bad waypoint: {e!r}")
+    return command
+
+
+class _Datagrams(asyncio.DatagramProtocol):
+    def __init__(self, server):
+        self.server = server
+
+    def connection_made(self, transport):
+        self.transport = transport
+
+    def datagram_received(self, data, addr):
+        self.server._received(data, lambda reply: self.transport.sendto(reply, addr))
+
+
+class CommandServer:
+    """
+    Receives commands for RoverController over UDP and TCP.
+    on_stop is called on the server thread the moment a stop arrives;
+    everything else waits in the queue for poll().
+    """
+
+    def __init__(self, on_stop, host=None, udp_port=None, tcp_port=None):
+        self.on_stop = on_stop
+        self.host = config.COMMAND_HOST if host is None else host
+        self.udp_port = config.COMMAND_UDP_PORT if udp_port is None else udp_port
+        self.tcp_port = config.COMMAND_TCP_PORT if tcp_port is None else tcp_port
+        self.pending = collections.deque()  # (command, reply, received at)
+
+        self._loop = None
+        self._thread = None
+        self._ready = threading.Event()
+        self._error = None
+
+        # Counters
+        self.received = 0
+        self.applied = 0
+        self.rejected = 0
+        self.stops = 0
+        self.last_stop_latency = None  # seconds from receipt to motors stopped
+        self.last_queue_latency = None  # seconds from receipt to the tick that took it
+
+    # ------------------------------ Lifecycle ------------------------------ #
+    def start(self):
+        """Bind the sockets and serve on a background thread."""
+        self._thread = threading.Thread(target=self._run, daemon=True, name='commands')
+        self._thread.start()
+        self._ready.wait()
+        if self._error is not None:
+            raise self._error
+        print(f"Command server: udp {self.udp_port}, tcp {self.tcp_port}")
+        return self
+
+    def close(self):
+        if self._loop is not None and self._thread is not None:
+            self._loop.call_soon_threadsafe(self._loop.stop)
+            self._thread.join(timeout=1.0)
+            self._thread = None
+
+    def _run(self):
+        self._loop = asyncio.new_event_loop()
+        try:
+            udp, tcp = self._loop.run_until_complete(self._bind())
+        except OSError as e:
+            self._error = e
+            self._ready.set()
+            self._loop.close()
+            return
+        self._ready.set()
+        try:
+            self._loop.run_forever()
+        finally:
+            if udp is not None:
+                udp.close()
+            if tcp is not None:
+                tcp.close()
+            self._loop.run_until_complete(asyncio.sleep(0))  # let transports close
+            self._loop.close()
+
+    async def _bind(self):
+        udp = tcp = None
+        if self.udp_port is not None:
+            udp, _ = await self._loop.create_datagram_endpoint(
+                lambda: _Datagrams(self), local_addr=(self.host, self.udp_port))
+            self.udp_port = udp.get_extra_info('sockname')[1]
+        if self.tcp_port is not None:
+            tcp = await asyncio.start_server(self._stream, self.host, self.tcp_port)
+            self.tcp_port = tcp.sockets[0].getsockname()[1]
+        return udp, tcp
+
+    async def _stream(self, reader, writer):
+        try:
+            while True:
+                line = await reader.readline()
+                if not line:
+                    break
+                if line.strip():
+                    self._received(line, writer.write)
+        except ConnectionError:
+            pass
+        finally:
+            writer.close()
+
+    # ------------------------------ Commands ------------------------------ #
+    def _received(self, data, reply):
+        """Server thread: stop right away, queue anything else for the next tick."""
+        received = time.monotonic()
+        self.received += 1
+        try:
+            command = parse_command(data)
+        except ValueError as e:
+            self.rejected += 1
+            reply(_encode(None, 'error', error=str(e)))
+            return
+        if command['cmd'] == 'stop':
+            self.on_stop()
+            self.stops += 1
+            self.last_stop_latency = time.monotonic() - received
+            reply(_encode(command['seq'], 'ok'))
+            return
+        self.pending.append((command, reply, received))
+
+    def poll(self):
+        """Commands received since the last call: [(command, reply), ...], oldest first."""
+        commands = []
+        while self.pending:
+            command, reply, received = self.pending.popleft()
+            self.last_queue_latency = time.monotonic() - received
+            commands.append((command, reply))
+        return commands
+
+    def ack(self, reply, command, status='ok', **fields):
+        """Acknowledge command to its sender (from any thread)."""
+        if status == 'ok':
+            self.applied += 1
+        else:
+            self.rejected += 1
+        if self._thread is None:
+            return  # closed; the sender sees no ack
+        self._loop.call_soon_threadsafe(reply, _encode(command['seq'], status, **fields))
+
+    def metrics(self):
+        return [
+            ('rover_commands_total{result}', 'counter', "Remote commands by outcome",
+             {'received': self.received, 'applied': self.applied,
+              'rejected': self.rejected, 'stop': self.stops}),
+            ('rover_command_stop_latency_seconds', 'gauge',
+             "Last stop: receipt to motors stopped", self.last_stop_latency),
+            ('rover_command_queue_latency_seconds', 'gauge',
+             "Last command: receipt to the tick that applied it", self.last_queue_latency),
+        ]
+
+
+def _encode(seq, status, **fields):
+    return (json.dumps({'seq': seq, 'status': status, **fields}) + "\n").encode()
+
+
+# ------------------------------ Client ------------------------------ #
+def send(command, host='127.0.0.1', port=None, tcp=False, timeout=2.0):
+    """Send one command (dict) and return the decoded acknowledgement."""
+    data = json.dumps(command).encode()
+    if tcp:
+        port = port or config.COMMAND_TCP_PORT
+        with socket.create_connection((host, port), timeout=timeout) as sock:
+            sock.sendall(data + b"\n")
+            return json.loads(sock.makefile('rb').readline())
+    port = port or config.COMMAND_UDP_PORT
+    with socket.socket(socket.AF_INET, socket.SOCK_DGRAM) as sock:
+        sock.settimeout(timeout)
+        sock.sendto(data, (host, port))
+        return json.loads(sock.recv(4096))
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Send a command to a running rover")
+    parser.add_argument('--send', required=True, metavar='JSON', help="command object")
+    parser.add_argument('--host', default='127.0.0.1')
+    parser.add_argument('--port', type=int)
+    parser.add_argument('--tcp', action='store_true', help="use TCP instead of UDP")
+    args = parser.parse_args()
+
+    command = json.loads(args.send)
+    command.setdefault('seq', int(time.time() * 1000) & 0x7FFFFFFF)
+    start = time.monotonic()
+    ack = send(command, args.host, args.port, args.tcp)
+    print(f"{ack} in {(time.monotonic() - start) * 1000:.1f} ms")
@@ -5,7 +5,7 @@ Tune these values through testing and trial/error.
 """
 
 # ========================== SENSOR FREQUENCIES ========================== #
-IMU_FREQUENCY = 50  # Hz - How often to read IMU (find through trial/error)
+IMU_FREQUENCY = 50  # Hz - How often to read IMU (achievable rate and noise: characterize.py)
 GPS_UPDATE_INTERVAL = 30  # seconds - How often to resync position with GPS
 MAG_HEADING_UPDATE = 10  # Hz - How often to update heading from magnetometer
 
@@ -19,17 +19,36 @@ MIN_MOVE_DISTANCE = 0.5  # meters - Minimum distance before we start moving
 HEADING_CORRECTION_GAIN = 0.1  # 0.0-1.0, higher = more aggressive correction
 VELOCITY_DECAY_FACTOR = 0.98  # Simulate friction/drag to prevent runaway velocity
 GPS_RESET_THRESHOLD = 5.0  # meters - If IMU drift exceeds this, force GPS resync
+NAV_HISTORY = 3.0  # seconds - Dead-reckoned states kept to carry delayed GPS fixes forward
 
 # ========================== MOTOR CONTROL ========================== #
 BASE_SPEED = 0.6  # Default motor speed (0.0-1.0)
 TURN_SPEED = 1.0  # Speed when turning
 MIN_SPEED = 0.2  # Minimum speed to overcome static friction
 
+# Differential-drive kinematics (see kinematics.py)
+TRACK_WIDTH = 0.25  # meters between left and right wheels
+WHEEL_MAX_SPEED = 0.5  # m/s - Nominal wheel speed at full PWM, until calibrated
+WHEEL_CALIBRATION_FILE = "wheel_calibration.json"  # Written by kinematics.py --calibrate
+
 # Proportional control for heading correction
 HEADING_KP = 0.02  # Proportional gain for heading error -> turn rate
 
+# Timed maneuvers, run by the maneuver executor while the loop keeps sensing
+TURN_PULSE = 0.4  # seconds - Duration of one corrective turn
+TURN_SETTLE = 0.1  # seconds - Stopped after each turn before the next command
+FORWARD_HOLD = 0.5  # seconds - Motors stop unless the loop renews forward within this
+MOTOR_RAMP = 0.1  # seconds - Speed ramp from standstill to the commanded speed
+MANEUVER_RATE = 50  # Hz - Speed updates while ramping
+
 # ========================== SENSOR ADDRESSES ========================== #
 IMU_I2C_ADDRESS = 0x68  # MPU6050 default address
+I2C_BUS = 1  # /dev/i2c-N shared by the MPU6050 and BMM150
+I2C_RETRIES = 2  # Retries of a failed I2C transaction before the read fails
+I2C_RETRY_DELAY = 0.001  # seconds - Back-off between retries (bus released)
+
+# Device drivers: 'real' hardware or 'sim' (simulated, see sim_devices.py)
+HARDWARE_BACKEND = 'real'
 
 # GPS Configuration
 USE_IP_GEOLOCATION = False  # Set to True to use IP geolocation instead of real GPS
@@ -41,10 +60,54 @@ IP_GEO_API_URL = "http://ip-api.com/json/"
 # Real GPS Module via gpsd
 # Make sure gpsd is configured in /etc/default/gpsd with your GPS serial port
 
+# Startup reference fix
+GPS_FIX_TIMEOUT = 5.0  # seconds - How long startup waits for the first fix
+GPS_FIX_POLL_INTERVAL = 0.2  # seconds - Background fix search poll period
+NO_FIX_POLICY = 'abort'  # 'abort' | 'wait' (keep waiting) | 'ip' (IP geolocation)
+
+# Fix measurement time, from the fix's UTC time in the gpsd report
+GPS_MAX_FIX_AGE = 2.0  # seconds - Older (or future) fix times mean the system clock is off
+GPS_FIX_LATENCY = 0.0  # seconds - Assumed fix age when the report has no usable time
+
 # ========================== DATA LOGGING ========================== #
 LOG_ENABLED = True
 LOG_FILE = "rover_navigation_log.csv"
-LOG_FREQUENCY = 10  # Hz - How often to write to log file
+LOG_FREQUENCY = 0  # Hz - How often to write to log file (0 = every row, which tune.py and analyze.py need; LOG_ASYNC only)
+LOG_ASYNC = True  # Queue rows and write them on a background thread
+LOG_DECIMATION = 'latest'  # 'latest' | 'mean' | 'minmax' - How rows are reduced to LOG_FREQUENCY
+LOG_QUEUE_SIZE = 256  # Max pending log rows
+LOG_OVERFLOW = 'drop_oldest'  # 'drop_oldest' | 'block' - What log_data does when the queue is full
+LOG_BATCH_INTERVAL = 0.5  # seconds - How often the writer thread writes out the queue
+LOG_FORMAT = 'csv'  # 'csv' | 'binary' (packed records, see binlog.py) | 'segments' (see logsegments.py)
+LOG_BINARY_FILE = "rover_navigation_log.bin"  # Used when LOG_FORMAT = 'binary'
+
+# Segmented logs (LOG_FORMAT = 'segments'): compressed, rotated, one set per run
+LOG_DIR = "logs"
+LOG_SEGMENT_MAX_BYTES = 4_000_000  # Start a new segment file past this size
+LOG_SEGMENT_MAX_SECONDS = 600  # ... or after this many seconds of records
+LOG_SYNC_RECORDS = 500  # Compress, write and fsync a block every N records
+LOG_SYNC_INTERVAL = 2.0  # seconds - ... or this often, whichever comes first
+
+# Raw sensor recording (see recorder.py / replay.py)
+RECORD_RAW = False  # Record every raw IMU, magnetometer and GPS reading
+RECORD_FILE = "rover_raw.rec"
+
+# ========================== WARM START ========================== #
+WARM_START_ENABLED = True  # Resume from saved state on restart
+STATE_FILE = "rover_state.json"
+STATE_SAVE_INTERVAL = 5.0  # seconds - How often state is saved while running
+STATE_MAX_AGE = 600  # seconds - Older saved state is ignored (cold start)
+STATE_MAX_DISTANCE = 10.0  # meters - Reject saved position this far from first live fix
+
+# ========================== ASYNC CONTROLLER ========================== #
+ASYNC_EXECUTOR_WORKERS = 3  # Threads for blocking sensor reads (IMU, mag, GPS)
+GPS_POLL_FREQUENCY = 1  # Hz - How often the GPS task polls gpsd
+
+# ========================== SENSOR PROCESS ========================== #
+SENSOR_PROCESS_ENABLED = False  # Sample IMU/mag/GPS in a separate process
+SENSOR_RING_CAPACITY = 512  # Samples kept per sensor in shared memory
+SENSOR_PROCESS_START_TIMEOUT = 10.0  # seconds - Wait for first samples
+SENSOR_PROCESS_TIMEOUT = 0.5  # seconds - No heartbeat this long = crashed
 
 # ========================== CALIBRATION VALUES ========================== #
 # Magnetometer calibration (hard iron offset)
@@ -72,7 +135,31 @@ MAGNETIC_DECLINATION = 12.5  # Rancho Santa Margarita, CA approx
 REF_LAT = None  # Will be set at runtime
 REF_LON = None
 
+# ========================== LOOP TIMING ========================== #
+TIMING_ENABLED = True  # Per-stage control-loop latency histograms (see looptiming.py)
+TIMING_FILE = "loop_timing.json"
+TIMING_DUMP_INTERVAL = 30.0  # seconds - How often the summary is written (also at shutdown)
+
+# ========================== TELEMETRY ========================== #
+TELEMETRY_ENABLED = False  # Stream state frames to a ground station (see telemetry.py)
+TELEMETRY_ADDRESS = "127.0.0.1:5600"  # 'host:port' (UDP) or 'unix:/path' (local socket)
+TELEMETRY_RATE = 10  # Hz - Frames per second, independent of the loop rate
+TELEMETRY_METRICS_PORT = 9108  # Prometheus text endpoint at /metrics (0 = any free port, None = off)
+
+# ========================== WATCHDOG ========================== #
+WATCHDOG_ENABLED = True  # Stop the motors if the control loop stalls (see watchdog.py)
+WATCHDOG_DEADLINE = 0.25  # seconds - Longest allowed gap between ticks
+
+# ========================== REMOTE COMMANDS ========================== #
+COMMAND_ENABLED = False  # Accept destinations, missions, pause/resume and stop while running (see commandserver.py)
+# Commands are unauthenticated and can move the rover: listen on loopback only.
+# Set "0.0.0.0" to accept them from the network, on a trusted link only
+COMMAND_HOST = "127.0.0.1"
+COMMAND_UDP_PORT = 5700  # One JSON command per datagram (0 = any free port, None = off)
+COMMAND_TCP_PORT = 5701  # One JSON command per line (0 = any free port, None = off)
+
 # ========================== DEBUG FLAGS ========================== #
+# Console output on the control path; opt-in, use telemetry for live monitoring
 DEBUG_PRINT_SENSORS = False  # Print raw sensor values
-DEBUG_PRINT_NAVIGATION = True  # Print navigation calculations
+DEBUG_PRINT_NAVIGATION = False  # Print navigation calculations
 DEBUG_PRINT_MOTORS = False  # Print motor commands
\ No newline at end of file
@@ -1,31 +1,71 @@
 # data_logger.py
 """
 Log sensor data and navigation state to CSV for analysis.
+With LOG_FORMAT = 'binary' rows go to a binlog file instead, which is
+much cheaper per row; binlog.py converts it back to CSV. 'segments'
+writes compressed, rotated, fsynced binlog segments (logsegments.py).
+With LOG_ASYNC, log_data() only queues the row; a logwriter thread
+decimates to LOG_FREQUENCY and writes in batches.
 """
+import os
 import csv
 import time
 from datetime import datetime
+import clock
 import config
+from binlog import BinaryLogWriter
+from logsegments import SegmentedLogWriter
+from logwriter import LogWriter, Decimator
 
 _log_file = None
 _csv_writer = None
 _start_time = None
+_binary = None  # BinaryLogWriter or SegmentedLogWriter for the binary formats
+_writer = None  # LogWriter thread when LOG_ASYNC
 
 def init_logger(filename=None):
     """
     Initialize CSV logger.
     Creates file with headers.
     """
-    global _log_file, _csv_writer, _start_time
+    global _log_file, _csv_writer, _start_time, _binary, _writer
     
     if not config.LOG_ENABLED:
         print("Logging disabled in config")
         return
     
+    _start_time = clock.time()
+    
+    if config.LOG_ASYNC:
+        _writer = LogWriter(_write_rows, _flush_sink,
+                            maxsize=config.LOG_QUEUE_SIZE,
+                            policy=config.LOG_OVERFLOW,
+                            decimator=Decimator(config.LOG_FREQUENCY,
+                                                config.LOG_DECIMATION),
+                            interval=config.LOG_BATCH_INTERVAL)
+    
+    if config.LOG_FORMAT == 'binary':
+        if filename is None:
+            filename = config.LOG_BINARY_FILE
+        _binary = BinaryLogWriter(filename, _start_time)
+        print(f"Data logger initialized (binary): {filename}")
+        return
+    
+    if config.LOG_FORMAT == 'segments':
+        directory = filename or config.LOG_DIR
+        prefix = os.path.splitext(os.path.basename(config.LOG_FILE))[0]
+        _binary = SegmentedLogWriter(directory, prefix, _start_time,
+                                     max_bytes=config.LOG_SEGMENT_MAX_BYTES,
+                                     max_seconds=config.LOG_SEGMENT_MAX_SECONDS,
+                                     sync_records=config.LOG_SYNC_RECORDS,
+                                     sync_interval=config.LOG_SYNC_INTERVAL)
+        print(f"Data logger initialized (segments): "
+              f"{os.path.join(directory, _binary.run_name)}_*.seg")
+        return
+    
     if filename is None:
         filename = config.LOG_FILE
     
-    _start_time = time.time()
     _log_file = open(filename, 'w', newline='')
     _csv_writer = csv.writer(_log_file)
     
@@ -61,13 +101,38 @@ def log_data(lat=None, lon=None, x_calc=None, y_calc=None,
     """
     Log a data point. Pass None for unavailable values.
     """
-    global _csv_writer, _start_time
+    if _writer is not None:
+        _writer.put((clock.time(), lat, lon, x_calc, y_calc, vx, vy,
+                     ax_body, ay_body, az_body, ax_earth, ay_earth, heading,
+                     target_bearing, heading_error, distance_to_dest,
+                     motor_command))
+        return
+    
+    _write_row(clock.time(), lat, lon, x_calc, y_calc, vx, vy,
+               ax_body, ay_body, az_body, ax_earth, ay_earth, heading,
+               target_bearing, heading_error, distance_to_dest, motor_command)
+
+def _write_rows(rows):
+    """Sink for the log writer thread."""
+    for row in rows:
+        _write_row(*row)
+
+def _write_row(now, lat, lon, x_calc, y_calc, vx, vy, ax_body, ay_body,
+               az_body, ax_earth, ay_earth, heading, target_bearing,
+               heading_error, distance_to_dest, motor_command):
+    """Write one row logged at clock time now to the CSV or binary file."""
+    if _binary is not None:
+        _binary.write(now - _start_time, lat, lon, x_calc, y_calc,
+                      vx, vy, ax_body, ay_body, az_body, ax_earth, ay_earth,
+                      heading, target_bearing, heading_error,
+                      distance_to_dest, motor_command)
+        return
     
     if not config.LOG_ENABLED or _csv_writer is None:
         return
     
-    timestamp = time.time() - _start_time
-    dt = datetime.now().strftime('%Y-%m-%d %H:%M:%S.%f')[:-3]
+    timestamp = now - _start_time
+    dt = datetime.fromtimestamp(now).strftime('%Y-%m-%d %H:%M:%S.%f')[:-3]
     
     _csv_writer.writerow([
         f'{timestamp:.3f}',
@@ -92,13 +157,36 @@ def log_data(lat=None, lon=None, x_calc=None, y_calc=None,
 
 def flush():
     """Force write to disk (call periodically or after important events)."""
+    if _writer:
+        _writer.wake()  # the writer thread owns the file
+        return
+    _flush_sink()
+
+def stats():
+    """Log writer counters (see LogWriter.stats), or None when not async."""
+    return _writer.stats() if _writer else None
+
+def _flush_sink():
+    if _binary:
+        _binary.flush()
     if _log_file:
         _log_file.flush()
 
 def close_logger():
     """Close log file cleanly."""
-    global _log_file, _csv_writer
+    global _log_file, _csv_writer, _binary, _writer
     
+    if _writer:
+        _writer.close()  # writes everything still queued
+        stats = _writer.stats()
+        print(f"Log writer: {stats['enqueued']} rows queued, "
+              f"{stats['written']} written, {stats['dropped']} dropped, "
+              f"{stats['blocked']} blocked")
+        _writer = None
+    if _binary:
+        _binary.close()
+        print("Data logger closed")
+        _binary = None
     if _log_file:
         _log_file.close()
         print("Data logger closed")
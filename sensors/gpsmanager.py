@@ -4,20 +4,18 @@ GPS management - handles IP geolocation, gpsd, or raw serial GPS.
 Provides consistent interface regardless of source.
 """
 import math
+from datetime import datetime
+import clock
 import config
-from iplocation import get_location
+import backends
 
-# For gpsd
+# For gpsd (driver created by init_gps)
+_gpsd = None
 _gpsd_connected = False
-if not config.USE_IP_GEOLOCATION:
-    try:
-        import gpsd
-    except ImportError:
-        print("Warning: gpsd-py3 not installed. Run: pip3 install gpsd-py3")
 
 def init_gps():
     """Initialize GPS - either IP geo or gpsd based on config."""
-    global _gpsd_connected
+    global _gpsd, _gpsd_connected
     
     # if config.USE_IP_GEOLOCATION:
     #     print("Using IP Geolocation for position")
@@ -25,10 +23,14 @@ def init_gps():
     
     if config.USE_GPSD:
         try:
-            gpsd.connect()
+            _gpsd = backends.create('gps')
+            _gpsd.connect()
             _gpsd_connected = True
             print("GPS (gpsd) initialized")
             return True
+        except ImportError:
+            print("Warning: gpsd-py3 not installed. Run: pip3 install gpsd-py3")
+            return False
         except Exception as e:
             print(f"GPS init failed: {e}")
             print("Make sure gpsd is running: sudo systemctl status gpsd")
@@ -41,13 +43,53 @@ def get_position():
     Returns current position as (lat, lon) tuple.
     Uses IP geo or gpsd based on config.
     """
+    lat, lon, _ = get_fix()
+    return lat, lon
+
+def get_fix():
+    """
+    Returns current fix as (lat, lon, accuracy) tuple.
+    accuracy is gpsd's horizontal error estimate in meters (None if unknown).
+    """
+    lat, lon, accuracy, _ = _current_fix()
+    return lat, lon, accuracy
+
+def get_fix_sample():
+    """
+    Returns current fix with its measurement time: (t, (lat, lon, accuracy)).
+    t is on clock.monotonic(), from the fix's own UTC time when gpsd
+    reports a plausible one, else the read time minus GPS_FIX_LATENCY.
+    gpsd hands out its last fix, which can be up to a GPS period old.
+    """
+    read_at = clock.monotonic()
+    lat, lon, accuracy, fix_time = _current_fix()
+    if lat is None:
+        return None, (None, None, None)
+    age = None if fix_time is None else clock.time() - fix_time
+    if age is None or not -0.5 < age < config.GPS_MAX_FIX_AGE:
+        age = config.GPS_FIX_LATENCY  # no time, or the system clock isn't synced
+    return read_at - max(0.0, age), (lat, lon, accuracy)
+
+def _fix_time(packet):
+    """UTC time of the fix in a gpsd packet (epoch seconds), or None."""
+    text = getattr(packet, 'time', None)
+    if not text:
+        return None
+    try:
+        return datetime.fromisoformat(text.replace('Z', '+00:00')).timestamp()
+    except ValueError:
+        return None
+
+def _current_fix():
+    """(lat, lon, accuracy, fix UTC time or None) from the configured source."""
     if config.USE_IP_GEOLOCATION:
+        from iplocation import get_location  # pulls in requests
         lat, lon = get_location()
-        return lat, lon
+        return lat, lon, None, None
     
     if config.USE_GPSD and _gpsd_connected:
         try:
-            packet = gpsd.get_current()
+            packet = _gpsd.get_current()
             
             # Check for valid fix (mode 2 = 2D fix, mode 3 = 3D fix)
             has_fix = (
@@ -57,17 +99,21 @@ def get_position():
             )
             
             if has_fix:
-                return packet.lat, packet.lon
+                try:
+                    accuracy = packet.position_precision()[0]
+                except Exception:
+                    accuracy = None  # no error estimate in this packet
+                return packet.lat, packet.lon, accuracy, _fix_time(packet)
             else:
                 if config.DEBUG_PRINT_SENSORS:
                     print("Waiting for GPS fix...")
-                return None, None
+                return None, None, None, None
                 
         except Exception as e:
             print(f"GPS read error: {e}")
-            return None, None
+            return None, None, None, None
     
-    return None, None
+    return None, None, None, None
 
 def haversine_distance(lat1, lon1, lat2, lon2):
     """
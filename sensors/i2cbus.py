@@ -0,0 +1,231 @@
+# i2cbus.py
+"""
+Shared I2C bus manager.
+The MPU6050 and the BMM150 sit on the same bus (/dev/i2c-1). One I2CBus
+owns the SMBus handle and every device goes through it:
+- each SMBus call (one bus transaction) holds the lock only while it is
+  on the wire, so threads interleave between transactions, never inside
+  one; retries back off with the lock released
+- transaction() holds the bus across several calls, for a multi-step
+  device read or to read several devices back-to-back
+- busy time, lock wait, errors and retries are counted for stats()
+SharedDevice wraps drivers that keep their own handle to the same bus
+(the bmm150 library) so their reads take the bus like a transaction().
+FakeBus stands in for smbus.SMBus in tests: register maps per address
+and a per-transaction latency.
+"""
+import time
+import random
+import threading
+import clock
+import config
+
+_bus = None  # shared instance, see get_bus()
+
+
+class I2CBus:
+    def __init__(self, handle=None, number=None, retries=None, retry_delay=None):
+        self.number = config.I2C_BUS if number is None else number
+        self.retries = config.I2C_RETRIES if retries is None else retries
+        self.retry_delay = config.I2C_RETRY_DELAY if retry_delay is None else retry_delay
+        self._handle = handle  # opened on first transfer when None
+        self._lock = threading.RLock()
+        self._depth = 0  # nested holds by the owning thread
+        self._held_since = None
+
+        # Counters
+        self.started = clock.monotonic()
+        self.transactions = 0  # SMBus calls that completed
+        self.holds = 0  # outermost lock holds (a transaction() counts once)
+        self.errors = 0  # failed attempts
+        self.retries_used = 0
+        self.failures = 0  # calls that failed after every retry
+        self.busy = 0.0  # seconds the bus was held
+        self.wait = 0.0  # seconds spent waiting for another thread's hold
+        self.max_wait = 0.0
+
+    # ------------------------------ Locking ------------------------------ #
+    def _acquire(self):
+        start = clock.monotonic()
+        self._lock.acquire()
+        self._depth += 1
+        if self._depth == 1:
+            now = clock.monotonic()
+            waited = now - start
+            self.wait += waited
+            self.max_wait = max(self.max_wait, waited)
+            self.holds += 1
+            self._held_since = now
+
+    def _release(self):
+        self._depth -= 1
+        if self._depth == 0:
+            self.busy += clock.monotonic() - self._held_since
+        self._lock.release()
+
+    def transaction(self):
+        """
+        Hold the bus across several calls:
+            with bus.transaction():
+                accel = imu.get_accel_data()
+                mag = mag.read_mag_data()
+        """
+        return _Hold(self)
+
+    # ------------------------------ Transfers ------------------------------ #
+    def _open(self):
+        if self._handle is None:
+            import smbus  # imported here so importing this module needs no I2C
+            self._handle = smbus.SMBus(self.number)
+        return self._handle
+
+    def _transfer(self, method, *args):
+        """One SMBus call under the lock; OSError (NACK, arbitration) is retried."""
+        for attempt in range(self.retries + 1):
+            self._acquire()
+            try:
+                result = getattr(self._open(), method)(*args)
+                self.transactions += 1
+                return result
+            except OSError:
+                self.errors += 1
+                if attempt == self.retries:
+                    self.failures += 1
+                    raise
+            finally:
+                self._release()
+            self.retries_used += 1
+            time.sleep(self.retry_delay)  # with the bus free for other threads
+
+    def read_byte_data(self, address, register):
+        return self._transfer('read_byte_data', address, register)
+
+    def write_byte_data(self, address, register, value):
+        return self._transfer('write_byte_data', address, register, value)
+
+    def read_i2c_block_data(self, address, register, length):
+        return self._transfer('read_i2c_block_data', address, register, length)
+
+    def write_i2c_block_data(self, address, register, data):
+        return self._transfer('write_i2c_block_data', address, register, data)
+
+    def stats(self):
+        elapsed = clock.monotonic() - self.started
+        return {
+            'transactions': self.transactions,
+            'holds': self.holds,
+            'errors': self.errors,
+            'retries': self.retries_used,
+            'failures': self.failures,
+            'busy': self.busy,
+            'utilization': self.busy / elapsed if elapsed > 0 else 0.0,
+            'wait': self.wait,
+            'max_wait': self.max_wait,
+        }
+
+
+class _Hold:
+    def __init__(self, bus):
+        self.bus = bus
+
+    def __enter__(self):
+        self.bus._acquire()
+        return self.bus
+
+    def __exit__(self, *exc):
+        self.bus._release()
+        return False
+
+
+class SharedDevice:
+    """
+    Driver with its own handle to the shared bus; each call to one of
+    methods holds the bus for the whole call.
+    """
+
+    def __init__(self, device, bus, methods):
+        self.device = device
+        self.bus = bus
+        for name in methods:
+            setattr(self, name, self._held(getattr(device, name)))
+
+    def _held(self, method):
+        def call(*args, **kwargs):
+            with self.bus.transaction():
+                return method(*args, **kwargs)
+        return call
+
+    def __getattr__(self, name):
+        return getattr(self.device, name)
+
+
+def get_bus():
+    """The shared bus, created on first use."""
+    global _bus
+    if _bus is None:
+        _bus = I2CBus()
+    return _bus
+
+
+def stats():
+    """Counters of the shared bus, or None if nothing has used it."""
+    return _bus.stats() if _bus is not None else None
+
+
+# ------------------------------ Fake bus ------------------------------ #
+class FakeBus:
+    """
+    smbus.SMBus stand-in. Each address has 256 registers; a transaction
+    takes overhead + per_byte * bytes of wall-clock time (defaults: 100 kHz,
+    start + address + register + repeated start ~ 4 bytes on the wire).
+    error_rate makes attempts fail with OSError like a NACK. Transactions
+    that overlap another one are counted in collisions - on a real bus
+    they would corrupt each other.
+    """
+
+    def __init__(self, per_byte=90e-6, overhead=360e-6, error_rate=0.0, seed=None):
+        self.per_byte = per_byte
+        self.overhead = overhead
+        self.error_rate = error_rate
+        self.registers = {}
+        self.rng = random.Random(seed)
+        self.log = []  # (address, start, end) per transaction
+        self.collisions = 0
+        self._active = 0
+        self._count_lock = threading.Lock()
+
+    def regs(self, address):
+        return self.registers.setdefault(address, bytearray(256))
+
+    def _wire(self, address, nbytes):
+        with self._count_lock:
+            self._active += 1
+            if self._active > 1:
+                self.collisions += 1
+        start = time.perf_counter()
+        try:
+            end = start + self.overhead + self.per_byte * nbytes
+            while time.perf_counter() < end:
+                time.sleep(0)  # sleep() alone overshoots 100 us transfers
+            if self.error_rate and self.rng.random() < self.error_rate:
+                raise OSError(121, "Remote I/O error")
+        finally:
+            with self._count_lock:
+                self._active -= 1
+            self.log.append((address, start, time.perf_counter()))
+
+    def read_byte_data(self, address, register):
+        self._wire(address, 1)
+        return self.regs(address)[register]
+
+    def write_byte_data(self, address, register, value):
+        self._wire(address, 1)
+        self.regs(address)[register] = value & 0xFF
+
+    def read_i2c_block_data(self, address, register, length):
+        self._wire(address, length)
+        return list(self.regs(address)[register:register + length])
+
+    def write_i2c_block_data(self, address, register, data):
+        self._wire(address, len(data))
+        self.regs(address)[register:register + len(data)] = bytes(data)
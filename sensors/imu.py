@@ -1,18 +1,19 @@
 # sensors/imu.py
 import time
-from mpu6050 import mpu6050  # your class file
+import clock
+import backends
 
 _imu = None  # global instance
 
 
 def init_imu(address=0x68):
     """
-    Initialize the MPU6050 IMU.
+    Initialize the MPU6050 IMU (or its simulated backend).
     Creates the sensor once—safe to call multiple times.
     """
     global _imu
     if _imu is None:
-        _imu = mpu6050(address)
+        _imu = backends.create('imu', address)
     return _imu
 
 
@@ -26,6 +27,16 @@ def get_accel():
     return data['x'], data['y'], data['z']
 
 
+def get_accel_sample():
+    """
+    Accelerometer reading with its acquisition time:
+    (t, (ax, ay, az)), t = clock.monotonic() midway through the read
+    """
+    start = clock.monotonic()
+    accel = get_accel()
+    return (start + clock.monotonic()) / 2, accel
+
+
 def get_gyro():
     """
     Returns gyro data in deg/sec
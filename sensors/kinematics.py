@@ -0,0 +1,248 @@
+# kinematics.py
+"""
+Differential-drive kinematics over motor_helper.
+DiffDrive turns (linear velocity m/s, yaw rate deg/s clockwise) into
+left/right wheel speeds and then into a direction and PWM per wheel,
+through a per-wheel calibration: polarity (does 'forward' really turn
+this wheel forward), deadband (PWM below which it doesn't move) and the
+measured PWM -> speed curve. The curves are inverted once into uniform
+lookup tables, so a conversion is a few multiplies per wheel.
+
+calibrate() builds the calibration by spinning one wheel at a time and
+measuring the yaw rate with the IMU gyro.
+Usage:
+    python3 kinematics.py --calibrate          # on the rover, with room to spin in place
+    python3 kinematics.py --calibrate --sim    # against the simulated plant
+    python3 kinematics.py --show
+"""
+import os
+import json
+import math
+import argparse
+import clock
+import config
+import motor_helper
+
+TABLE_SIZE = 64  # lookup entries per wheel between 0 and the top common speed
+
+# Calibration run
+CAL_LEVELS = [round(0.1 * i, 1) for i in range(1, 11)]  # PWM levels per wheel
+CAL_SETTLE = 0.6  # seconds at each level before measuring
+CAL_MEASURE = 1.0  # seconds of gyro samples averaged per level
+CAL_REST = 0.5  # seconds stopped between levels
+CAL_SAMPLE_RATE = 50  # Hz
+STILL_FRACTION = 0.05  # speed below this fraction of the top speed counts as not moving
+
+LEFT = ('lf', 'lb')
+RIGHT = ('rf', 'rb')
+
+
+def nominal_calibration():
+    """Uncalibrated wheels: MIN_SPEED deadband, linear up to WHEEL_MAX_SPEED."""
+    deadband = config.MIN_SPEED
+    gain = config.WHEEL_MAX_SPEED / (1.0 - deadband)
+    return {
+        'track_width': config.TRACK_WIDTH,
+        'wheels': {wheel: {'polarity': 1, 'deadband': deadband, 'gain': gain,
+                           'points': [[deadband, 0.0], [1.0, config.WHEEL_MAX_SPEED]]}
+                   for wheel in motor_helper.WHEELS},
+    }
+
+
+def load_calibration(filename=None):
+    """Saved calibration, or the nominal one when there is none."""
+    filename = filename or config.WHEEL_CALIBRATION_FILE
+    if not os.path.exists(filename):
+        return nominal_calibration()
+    with open(filename) as f:
+        return json.load(f)
+
+
+def save_calibration(calibration, filename=None):
+    filename = filename or config.WHEEL_CALIBRATION_FILE
+    tmp = filename + '.tmp'
+    with open(tmp, 'w') as f:
+        json.dump(calibration, f, indent=2)
+    os.replace(tmp, filename)
+    return filename
+
+
+def _inverse_table(points, top_speed, size):
+    """PWM for speeds 0, top/size, ... top, by inverting the PWM -> speed points."""
+    points = sorted(points)
+    pwms = [p for p, _ in points]
+    speeds = []
+    for _, speed in points:  # force non-decreasing so the inverse exists
+        speeds.append(max(speed, speeds[-1]) if speeds else speed)
+
+    table = []
+    j = 0
+    for k in range(size + 1):
+        target = top_speed * k / size
+        while j < len(speeds) - 2 and speeds[j + 1] < target:
+            j += 1
+        s0, s1 = speeds[j], speeds[j + 1]
+        if s1 <= s0:
+            table.append(pwms[j + 1] if target > s0 else pwms[j])
+            continue
+        fraction = min(max((target - s0) / (s1 - s0), 0.0), 1.0)
+        table.append(pwms[j] + (pwms[j + 1] - pwms[j]) * fraction)
+    return table
+
+
+class DiffDrive:
+    def __init__(self, calibration=None, driver=None, size=TABLE_SIZE):
+        calibration = calibration or load_calibration()
+        self.driver = driver or motor_helper.driver
+        self.track_width = calibration.get('track_width', config.TRACK_WIDTH)
+        wheels = calibration['wheels']
+
+        # Fastest speed every wheel can reach, so all wheels can match it
+        self.max_speed = min(max(s for _, s in wheels[w]['points']) for w in wheels)
+        self.size = size
+        self.scale = size / self.max_speed
+        self.polarity = {w: wheels[w]['polarity'] for w in wheels}
+        self.tables = {w: _inverse_table(wheels[w]['points'], self.max_speed, size)
+                       for w in wheels}
+
+    def wheel_speeds(self, v, omega):
+        """
+        (left, right) side speeds in m/s for v m/s and omega deg/s
+        (positive = turning right). Scaled down together when one side
+        would exceed max_speed, so the path curvature is kept.
+        """
+        half = math.radians(omega) * self.track_width / 2
+        left, right = v + half, v - half
+        peak = max(abs(left), abs(right))
+        if peak > self.max_speed:
+            left *= self.max_speed / peak
+            right *= self.max_speed / peak
+        return left, right
+
+    def wheel_pwm(self, wheel, speed):
+        """(direction, PWM) that drives one wheel at a signed speed in m/s."""
+        if speed == 0:
+            return 'stop', 0
+        x = abs(speed) * self.scale
+        table = self.tables[wheel]
+        i = int(x)
+        if i >= self.size:
+            pwm = table[-1]
+        else:
+            pwm = table[i] + (table[i + 1] - table[i]) * (x - i)
+        forward = (speed > 0) == (self.polarity[wheel] > 0)
+        return ('forward' if forward else 'backward'), pwm
+
+    def pwms(self, v, omega):
+        """{wheel: (direction, PWM)} for v m/s and omega deg/s."""
+        left, right = self.wheel_speeds(v, omega)
+        return {'lf': self.wheel_pwm('lf', left), 'lb': self.wheel_pwm('lb', left),
+                'rf': self.wheel_pwm('rf', right), 'rb': self.wheel_pwm('rb', right)}
+
+    def drive(self, v, omega):
+        """Command v m/s and omega deg/s (clockwise)."""
+        self.driver.command(self.pwms(v, omega))
+
+    def stop(self):
+        self.driver.command({wheel: ('stop', 0) for wheel in self.tables})
+
+
+# ------------------------------ Calibration ------------------------------ #
+def _mean_yaw_rate(seconds, bias=0.0):
+    """Average yaw rate (deg/s, clockwise) from the gyro over seconds."""
+    from imu import get_gyro
+    samples = []
+    end = clock.monotonic() + seconds
+    while clock.monotonic() < end:
+        samples.append(-get_gyro()[2] - bias)  # gyro z is up; clockwise is -z
+        clock.sleep(1.0 / CAL_SAMPLE_RATE)
+    return sum(samples) / len(samples)
+
+
+def _fit_wheel(levels, speeds):
+    """Polarity, deadband, gain and curve points from (PWM, signed speed) pairs."""
+    top = max(speeds, key=abs)
+    polarity = 1 if top >= 0 else -1
+    speeds = [s * polarity for s in speeds]
+    still = STILL_FRACTION * abs(top)
+    moving = [(p, s) for p, s in zip(levels, speeds) if s > still]
+    if len(moving) < 2:
+        raise RuntimeError("wheel barely moved; check wiring and battery")
+    stopped = [p for p, s in zip(levels, speeds) if s <= still and p < moving[0][0]]
+
+    # Least squares line through the moving points; its zero is the deadband
+    n = len(moving)
+    mp = sum(p for p, _ in moving) / n
+    ms = sum(s for _, s in moving) / n
+    gain = (sum((p - mp) * (s - ms) for p, s in moving)
+            / sum((p - mp) ** 2 for p, _ in moving))
+    deadband = mp - ms / gain
+    deadband = min(max(deadband, stopped[-1] if stopped else 0.0), moving[0][0])
+    return {'polarity': polarity, 'deadband': round(deadband, 4), 'gain': round(gain, 4),
+            'points': [[round(deadband, 4), 0.0]] + [[p, round(s, 4)] for p, s in moving]}
+
+
+def calibrate(levels=CAL_LEVELS, track_width=None):
+    """
+    Spin each wheel alone through the PWM levels, measure the yaw rate,
+    and fit its calibration. A lone wheel drives its side at half its
+    speed, so its speed is 2 * yaw rate * track width. Needs room to spin
+    in place (about 10 s per wheel at the default levels).
+    """
+    track_width = track_width or config.TRACK_WIDTH
+    driver = motor_helper.driver
+    motor_helper.stop()
+    clock.sleep(CAL_REST)
+    bias = _mean_yaw_rate(CAL_MEASURE)
+    print(f"Gyro yaw bias: {bias:+.2f} deg/s")
+
+    wheels = {}
+    for wheel in motor_helper.WHEELS:
+        side = 1 if wheel in LEFT else -1  # left wheel forward turns right
+        speeds = []
+        for level in levels:
+            driver.set(wheel, 'forward', level)
+            clock.sleep(CAL_SETTLE)
+            yaw = _mean_yaw_rate(CAL_MEASURE, bias)
+            motor_helper.stop()
+            clock.sleep(CAL_REST)
+            speeds.append(2 * math.radians(yaw) * track_width * side)
+        wheels[wheel] = _fit_wheel(levels, speeds)
+        fit = wheels[wheel]
+        print(f"  {wheel}: polarity {fit['polarity']:+d}  deadband {fit['deadband']:.2f}  "
+              f"gain {fit['gain']:.3f} m/s per PWM  top {fit['points'][-1][1]:.3f} m/s")
+    return {'track_width': track_width, 'bias': bias, 'wheels': wheels}
+
+
+def show(calibration):
+    print(f"Track width {calibration['track_width']:.3f} m")
+    for wheel, fit in calibration['wheels'].items():
+        curve = "  ".join(f"{p:.2f}:{s:.3f}" for p, s in fit['points'])
+        print(f"  {wheel}: polarity {fit['polarity']:+d}  deadband {fit['deadband']:.2f}  "
+              f"gain {fit['gain']:.3f}  PWM:m/s {curve}")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Wheel calibration for differential drive")
+    parser.add_argument('--calibrate', action='store_true', help="measure and save a calibration")
+    parser.add_argument('--sim', action='store_true',
+                        help="calibrate the simulated plant on a virtual clock")
+    parser.add_argument('--file', default=config.WHEEL_CALIBRATION_FILE)
+    parser.add_argument('--show', action='store_true', help="print the saved calibration")
+    args = parser.parse_args()
+
+    if args.calibrate:
+        if args.sim:
+            import sim_devices
+            sim_devices.install()
+            clock.set_clock(clock.VirtualClock())
+            sim_devices.reset()
+        try:
+            calibration = calibrate()
+        finally:
+            motor_helper.stop()
+        print(f"Saved {save_calibration(calibration, args.file)}")
+    elif args.show:
+        show(load_calibration(args.file))
+    else:
+        parser.print_help()
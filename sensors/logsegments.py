@@ -0,0 +1,323 @@
+# logsegments.py
+"""
+Rotated, compressed, crash-safe binary logs (LOG_FORMAT = 'segments').
+
+Each run writes its own numbered segment files in LOG_DIR; a segment is
+closed and the next one started past LOG_SEGMENT_MAX_BYTES or
+LOG_SEGMENT_MAX_SECONDS of records. Records are binlog records, grouped
+into blocks that are each compressed on their own. A block is finished,
+written, flushed and fsynced every LOG_SYNC_RECORDS records or
+LOG_SYNC_INTERVAL seconds, so a brownout loses at most one block.
+
+Segment layout:
+    MAGIC | header length (uint32) | binlog header JSON
+    block: BLOCK header (length, first/last timestamp, records, crc32) | zlib data
+    ...
+    index: one INDEX_ENTRY per block | FOOTER (index offset, blocks, FOOTER_MAGIC)
+The index lets a reader decompress only the blocks of a time range. A
+segment cut short by a crash has no footer; the reader then walks the
+block headers and keeps every complete block (repair() writes the
+missing footer).
+Usage:
+    python3 logsegments.py logs/                        # list runs and segments
+    python3 logsegments.py logs/rover_navigation_log_20260101-120000_*.seg \\
+        --from 60 --to 120 --csv out.csv
+    python3 logsegments.py logs/*.seg --repair
+"""
+import os
+import glob
+import json
+import time
+import zlib
+import struct
+from datetime import datetime
+import binlog
+
+MAGIC = b'RVRSEG\x00\x01'
+FOOTER_MAGIC = b'RVRIDX\x00\x01'
+BLOCK = struct.Struct('<IddII')  # compressed length, t_first, t_last, records, crc32
+INDEX_ENTRY = struct.Struct('<QddI')  # block offset, t_first, t_last, records
+FOOTER = struct.Struct('<QI8s')  # index offset, block count, FOOTER_MAGIC
+COMPRESSION_LEVEL = 6
+
+
+class SegmentedLogWriter:
+    """
+    Writes records (timestamp, then the log_data values) to rotated,
+    compressed segments. Same write/flush/close interface as
+    binlog.BinaryLogWriter.
+    """
+
+    def __init__(self, directory, prefix, start_time, max_bytes=4_000_000,
+                 max_seconds=600.0, sync_records=500, sync_interval=2.0):
+        self.directory = directory
+        self.start_time = start_time
+        self.max_bytes = max_bytes
+        self.max_seconds = max_seconds
+        self.sync_records = sync_records
+        self.sync_interval = sync_interval
+        self.records = 0
+        self.segments = []
+
+        os.makedirs(directory, exist_ok=True)
+        stamp = datetime.fromtimestamp(start_time).strftime('%Y%m%d-%H%M%S')
+        self.run_name = f"{prefix}_{stamp}"
+        suffix = 1
+        while glob.glob(os.path.join(directory, self.run_name + '_*.seg')):
+            suffix += 1
+            self.run_name = f"{prefix}_{stamp}-{suffix}"
+
+        self._block = bytearray(binlog.RECORD.size * sync_records)
+        self._used = 0
+        self._t_first = None
+        self._t_last = None
+        self._last_sync = time.monotonic()
+        self._file = None
+        self._index = []
+        self._segment_t0 = None
+
+    def _open_segment(self):
+        filename = os.path.join(self.directory,
+                                f"{self.run_name}_{len(self.segments):03d}.seg")
+        header = binlog.header_json(self.start_time)
+        self._file = open(filename, 'wb')
+        self._file.write(MAGIC + struct.pack('<I', len(header)) + header)
+        self._index = []
+        self._segment_t0 = None
+        self.segments.append(filename)
+
+    def _close_segment(self):
+        index_offset = self._file.tell()
+        for entry in self._index:
+            self._file.write(INDEX_ENTRY.pack(*entry))
+        self._file.write(FOOTER.pack(index_offset, len(self._index), FOOTER_MAGIC))
+        self._sync()
+        self._file.close()
+        self._file = None
+
+    def _sync(self):
+        self._file.flush()
+        os.fsync(self._file.fileno())
+        self._last_sync = time.monotonic()
+
+    def _write_block(self):
+        """Compress the buffered records as one block; a durability point."""
+        if not self._used:
+            self._last_sync = time.monotonic()
+            return
+        if self._file is None:
+            self._open_segment()
+        raw = memoryview(self._block)[:self._used * binlog.RECORD.size]
+        data = zlib.compress(raw, COMPRESSION_LEVEL)
+        offset = self._file.tell()
+        self._file.write(BLOCK.pack(len(data), self._t_first, self._t_last,
+                                    self._used, zlib.crc32(data)))
+        self._file.write(data)
+        self._index.append((offset, self._t_first, self._t_last, self._used))
+        self._sync()
+
+        if self._segment_t0 is None:
+            self._segment_t0 = self._t_first
+        if (self._file.tell() >= self.max_bytes
+                or self._t_last - self._segment_t0 >= self.max_seconds):
+            self._close_segment()
+        self._used = 0
+        self._t_first = None
+
+    def write(self, *record):
+        """Append one record (timestamp, then the log_data values)."""
+        binlog.pack_into(self._block, self._used * binlog.RECORD.size, *record)
+        if self._t_first is None:
+            self._t_first = record[0]
+        self._t_last = record[0]
+        self._used += 1
+        self.records += 1
+        if (self._used == self.sync_records
+                or time.monotonic() - self._last_sync >= self.sync_interval):
+            self._write_block()
+
+    def flush(self):
+        """Durability point if LOG_SYNC_INTERVAL has passed since the last one."""
+        if time.monotonic() - self._last_sync >= self.sync_interval:
+            self._write_block()
+
+    def close(self):
+        self._write_block()
+        if self._file is not None:
+            self._close_segment()
+
+
+# ------------------------------ Reading ------------------------------ #
+def read_segment_header(f):
+    """Return (header dict, offset of the first block) for an open segment."""
+    if f.read(len(MAGIC)) != MAGIC:
+        raise ValueError(f"{f.name}: not a rover log segment")
+    (length,) = struct.unpack('<I', f.read(4))
+    header = json.loads(f.read(length))
+    if header['version'] != binlog.VERSION:
+        raise ValueError(f"{f.name}: log version {header['version']}, "
+                         f"reader supports {binlog.VERSION}")
+    return header, len(MAGIC) + 4 + length
+
+
+def _read_footer(f):
+    """Block index from the footer, or None if the segment has no valid footer."""
+    size = os.fstat(f.fileno()).st_size
+    if size < FOOTER.size:
+        return None
+    f.seek(size - FOOTER.size)
+    index_offset, blocks, magic = FOOTER.unpack(f.read(FOOTER.size))
+    if magic != FOOTER_MAGIC or index_offset + blocks * INDEX_ENTRY.size + FOOTER.size != size:
+        return None
+    f.seek(index_offset)
+    data = f.read(blocks * INDEX_ENTRY.size)
+    return [INDEX_ENTRY.unpack_from(data, i * INDEX_ENTRY.size) for i in range(blocks)]
+
+
+def _scan_blocks(f, offset):
+    """
+    Walk block headers from offset. Stops at the first block that is cut
+    short or fails its CRC. Returns (index, end offset of the last good block).
+    """
+    index = []
+    f.seek(offset)
+    while True:
+        head = f.read(BLOCK.size)
+        if len(head) < BLOCK.size:
+            break
+        length, t_first, t_last, records, crc = BLOCK.unpack(head)
+        data = f.read(length)
+        if len(data) < length or zlib.crc32(data) != crc:
+            break
+        index.append((offset, t_first, t_last, records))
+        offset += BLOCK.size + length
+    return index, offset
+
+
+def segment_index(filename):
+    """(header, block index, complete) for one segment."""
+    with open(filename, 'rb') as f:
+        header, first_block = read_segment_header(f)
+        index = _read_footer(f)
+        if index is not None:
+            return header, index, True
+        index, _ = _scan_blocks(f, first_block)
+        return header, index, False
+
+
+def read_blocks(filename, t0=None, t1=None):
+    """
+    Yield (header, raw record bytes) for each block of a segment that
+    overlaps [t0, t1]; other blocks are never decompressed.
+    """
+    header, index, _ = segment_index(filename)
+    with open(filename, 'rb') as f:
+        for offset, t_first, t_last, records in index:
+            if (t0 is not None and t_last < t0) or (t1 is not None and t_first > t1):
+                continue
+            f.seek(offset)
+            length = BLOCK.unpack(f.read(BLOCK.size))[0]
+            yield header, zlib.decompress(f.read(length))
+
+
+def read_range(filenames, t0=None, t1=None):
+    """
+    Records with t0 <= timestamp <= t1 from a run's segments as a NumPy
+    structured array (binlog layout). Returns (header, records).
+    """
+    import numpy as np
+
+    header, chunks = None, []
+    for filename in sorted(filenames):
+        for header, raw in read_blocks(filename, t0, t1):
+            chunks.append(np.frombuffer(raw, dtype=binlog.dtype_of(header)))
+    if header is None:
+        return None, np.zeros(0, dtype=binlog.dtype_of({'fields': binlog.FIELDS}))
+    records = np.concatenate(chunks) if chunks else np.zeros(0, binlog.dtype_of(header))
+    keep = np.ones(len(records), dtype=bool)
+    if t0 is not None:
+        keep &= records['timestamp'] >= t0
+    if t1 is not None:
+        keep &= records['timestamp'] <= t1
+    return header, records[keep]
+
+
+def iter_range(filenames, t0=None, t1=None):
+    """Record dicts in [t0, t1] across segments, without numpy."""
+    for filename in sorted(filenames):
+        for header, raw in read_blocks(filename, t0, t1):
+            for record in binlog.unpack_records(header, raw):
+                if ((t0 is None or record['timestamp'] >= t0)
+                        and (t1 is None or record['timestamp'] <= t1)):
+                    yield record
+
+
+def repair(filename):
+    """
+    Make a crash-truncated segment complete again: drop the partial block
+    at the end and write the index footer. Returns blocks kept, or None
+    if the segment already had a valid footer.
+    """
+    with open(filename, 'r+b') as f:
+        _, first_block = read_segment_header(f)
+        if _read_footer(f) is not None:
+            return None
+        index, end = _scan_blocks(f, first_block)
+        f.seek(end)
+        f.truncate()
+        for entry in index:
+            f.write(INDEX_ENTRY.pack(*entry))
+        f.write(FOOTER.pack(end, len(index), FOOTER_MAGIC))
+        f.flush()
+        os.fsync(f.fileno())
+    return len(index)
+
+
+def list_runs(directory):
+    """{run name: [segment files in order]} for every run in directory."""
+    runs = {}
+    for filename in sorted(glob.glob(os.path.join(directory, '*.seg'))):
+        run = os.path.basename(filename).rsplit('_', 1)[0]
+        runs.setdefault(run, []).append(filename)
+    return runs
+
+
+if __name__ == "__main__":
+    import argparse
+
+    parser = argparse.ArgumentParser(description="Inspect, extract or repair segmented rover logs")
+    parser.add_argument('paths', nargs='+', help="a log directory, or segment files of one run")
+    parser.add_argument('--from', dest='t0', type=float, help="seconds since start")
+    parser.add_argument('--to', dest='t1', type=float, help="seconds since start")
+    parser.add_argument('--csv', metavar='FILE', help="write the selected records as CSV")
+    parser.add_argument('--repair', action='store_true', help="add footers to truncated segments")
+    args = parser.parse_args()
+
+    if len(args.paths) == 1 and os.path.isdir(args.paths[0]):
+        runs = list_runs(args.paths[0])
+    else:
+        runs = {'selected': args.paths}
+
+    if args.repair:
+        for files in runs.values():
+            for filename in files:
+                kept = repair(filename)
+                if kept is not None:
+                    print(f"{filename}: repaired, {kept} complete blocks kept")
+    elif args.csv:
+        files = [f for files in runs.values() for f in files]
+        header = segment_index(files[0])[0]
+        rows = binlog.write_csv(header['start_time'], iter_range(files, args.t0, args.t1),
+                                args.csv)
+        print(f"Wrote {rows} rows to {args.csv}")
+    else:
+        for run, files in runs.items():
+            print(run)
+            for filename in files:
+                header, index, complete = segment_index(filename)
+                records = sum(entry[3] for entry in index)
+                span = f"{index[0][1]:.1f}-{index[-1][2]:.1f}s" if index else "empty"
+                status = "" if complete else "  (truncated, no footer)"
+                print(f"  {os.path.basename(filename)}: {len(index)} blocks, "
+                      f"{records} records, {span}, "
+                      f"{os.path.getsize(filename) / 1e3:.0f} kB{status}")
@@ -0,0 +1,225 @@
+# logwriter.py
+"""
+Background log writer.
+With LOG_ASYNC enabled, datalogger.log_data() only appends the row to a
+bounded queue; a writer thread drains the queue in batches, decimates
+the rows to LOG_FREQUENCY and hands them to the CSV or binary sink, so
+an SD card stall never delays a motor command.
+"""
+import math
+import threading
+import collections
+
+# Row layout: (time, *values in log_data argument order)
+COLUMNS = ('lat', 'lon', 'x_calc', 'y_calc', 'vx', 'vy',
+           'ax_body', 'ay_body', 'az_body', 'ax_earth', 'ay_earth',
+           'heading', 'target_bearing', 'heading_error',
+           'distance_to_dest', 'motor_command')
+
+# Averaged on the circle, so 359° and 1° mean 0°, not 180°.
+# Column -> True for 0..360 angles, False for signed errors
+_ANGLE_COLUMNS = {COLUMNS.index('heading'): True,
+                  COLUMNS.index('target_bearing'): True,
+                  COLUMNS.index('heading_error'): False}
+_COMMAND_COLUMN = COLUMNS.index('motor_command')
+
+
+def _latest(values):
+    for value in reversed(values):
+        if value is not None:
+            return value
+    return None
+
+
+def _mean(values, angle=None):
+    """angle: None = plain mean, True = 0..360 circular, False = signed circular."""
+    values = [v for v in values if v is not None]
+    if not values:
+        return None
+    if angle is None:
+        return sum(values) / len(values)
+    s = sum(math.sin(math.radians(v)) for v in values)
+    c = sum(math.cos(math.radians(v)) for v in values)
+    mean = math.degrees(math.atan2(s, c))
+    return mean % 360 if angle else mean
+
+
+def _extreme(values, pick):
+    values = [v for v in values if v is not None]
+    return pick(values) if values else None
+
+
+class Decimator:
+    """
+    Reduces rows to one per 1/frequency window of row time.
+    Columns are aggregated over the values present in the window, so a
+    GPS fix logged on one row survives even if later rows have none.
+      'latest': last value of each column
+      'mean':   mean of each column (angles on the circle)
+      'minmax': two rows per window, column minimums then maximums
+    motor_command is always the latest. frequency <= 0 passes rows through.
+    """
+
+    MODES = ('latest', 'mean', 'minmax')
+
+    def __init__(self, frequency, mode='latest'):
+        if mode not in self.MODES:
+            raise ValueError(f"Unknown decimation mode {mode!r}; use one of {self.MODES}")
+        self.period = 1.0 / frequency if frequency > 0 else 0.0
+        self.mode = mode
+        self.window = None
+        self.rows = []
+
+    def add(self, row):
+        """Add one row; returns the rows completed by it (usually none)."""
+        if not self.period:
+            return [row]
+        window = math.floor(row[0] / self.period)
+        out = []
+        if window != self.window and self.rows:
+            out = self._aggregate(self.rows)
+            self.rows = []
+        self.window = window
+        self.rows.append(row)
+        return out
+
+    def finish(self):
+        """Rows for the partly filled last window."""
+        out = self._aggregate(self.rows) if self.rows else []
+        self.rows = []
+        return out
+
+    def _aggregate(self, rows):
+        if len(rows) == 1:
+            return rows
+        columns = list(zip(*rows))
+        times, columns = columns[0], columns[1:]
+        command = _latest(columns[_COMMAND_COLUMN])
+
+        if self.mode == 'latest':
+            return [(times[-1],) + tuple(_latest(c) for c in columns)]
+        if self.mode == 'mean':
+            values = [command if i == _COMMAND_COLUMN else _mean(c, _ANGLE_COLUMNS.get(i))
+                      for i, c in enumerate(columns)]
+            return [(times[-1],) + tuple(values)]
+
+        low = [command if i == _COMMAND_COLUMN else _extreme(c, min)
+               for i, c in enumerate(columns)]
+        high = [command if i == _COMMAND_COLUMN else _extreme(c, max)
+                for i, c in enumerate(columns)]
+        return [(times[0],) + tuple(low), (times[-1],) + tuple(high)]
+
+
+class LogWriter:
+    """
+    Bounded row queue plus the thread that drains it.
+    write_rows(rows) and flush() are the sink, called on the writer thread.
+    policy when the queue is full:
+      'drop_oldest': discard the oldest queued row (never blocks the caller)
+      'block':       wait for the writer to make room
+    """
+
+    POLICIES = ('drop_oldest', 'block')
+
+    def __init__(self, write_rows, flush, maxsize=256, policy='drop_oldest',
+                 decimator=None, interval=0.5):
+        if policy not in self.POLICIES:
+            raise ValueError(f"Unknown overflow policy {policy!r}; use one of {self.POLICIES}")
+        self.write_rows = write_rows
+        self.flush = flush
+        self.maxsize = maxsize
+        self.policy = policy
+        self.decimator = decimator or Decimator(0)
+        self.interval = interval
+
+        self.queue = collections.deque()
+        self.cond = threading.Condition()
+        self._stop = False
+
+        # Counters
+        self.enqueued = 0
+        self.dropped = 0
+        self.blocked = 0
+        self.written = 0
+        self.batches = 0
+        self.max_depth = 0
+        self.errors = 0
+
+        self.thread = threading.Thread(target=self._run, daemon=True, name='log-writer')
+        self.thread.start()
+
+    def put(self, row):
+        """Queue one row (control thread)."""
+        depth = len(self.queue)
+        if depth >= self.maxsize:
+            if self.policy == 'drop_oldest':
+                try:
+                    self.queue.popleft()
+                    self.dropped += 1
+                except IndexError:
+                    pass  # writer emptied it meanwhile
+            else:
+                self.blocked += 1
+                with self.cond:
+                    self.cond.notify_all()  # wake the writer now
+                    while len(self.queue) >= self.maxsize and not self._stop:
+                        self.cond.wait()
+        elif depth > self.max_depth:
+            self.max_depth = depth
+        self.queue.append(row)
+        self.enqueued += 1
+
+    def _drain(self):
+        batch = []
+        queue = self.queue
+        while queue:
+            batch.append(queue.popleft())
+        if self.policy == 'block':
+            with self.cond:
+                self.cond.notify_all()  # room for blocked callers
+
+        rows = []
+        for row in batch:
+            rows.extend(self.decimator.add(row))
+        return rows
+
+    def _write(self, rows):
+        try:
+            if rows:
+                self.write_rows(rows)
+                self.written += len(rows)
+                self.batches += 1
+            self.flush()
+        except Exception as e:
+            self.errors += 1
+            print(f"Log write error: {e}")
+
+    def _run(self):
+        while not self._stop:
+            with self.cond:
+                self.cond.wait(self.interval)
+            self._write(self._drain())
+
+    def wake(self):
+        """Write out the queue now instead of at the next interval."""
+        with self.cond:
+            self.cond.notify_all()
+
+    def close(self):
+        """Stop the thread and write everything still queued."""
+        with self.cond:
+            self._stop = True
+            self.cond.notify_all()
+        self.thread.join()
+        self._write(self._drain() + self.decimator.finish())
+
+    def stats(self):
+        return {
+            'enqueued': self.enqueued,
+            'written': self.written,
+            'dropped': self.dropped,
+            'blocked': self.blocked,
+            'batches': self.batches,
+            'max_depth': self.max_depth,
+            'errors': self.errors,
+        }
@@ -0,0 +1,250 @@
+# looptiming.py
+"""
+Per-stage control-loop latency.
+LoopTimer splits each tick at mark(stage) calls, stamped with
+perf_counter_ns, and adds each stage's time to a fixed-size log-linear
+(HDR-style) histogram: ~1.6% resolution from 1 ns to ~18 minutes, all
+buckets allocated up front, so recording a tick allocates nothing and
+costs a few hundred ns. Percentiles come from the bucket counts.
+The summary (count, p50, p99, max per stage, tick rate) is written to
+TIMING_FILE every TIMING_DUMP_INTERVAL seconds by a background thread,
+so the file I/O never lands in a tick, and at shutdown.
+Usage: python3 looptiming.py [loop_timing.json]   # print a dump
+"""
+import os
+import sys
+import json
+import time
+import threading
+
+SUB_BITS = 7  # 2^7 sub-buckets per power of two
+MAX_BITS = 40  # values up to 2^40 ns (~18 min); larger ones land in the last bucket
+
+_SUB = 1 << SUB_BITS
+_HALF = _SUB >> 1
+BUCKETS = _SUB + (MAX_BITS - SUB_BITS) * _HALF
+
+# Stages of a RoverController tick
+STAGES = ('commands', 'motors', 'state', 'sensors', 'mag', 'imu', 'navigation', 'gps',
+          'telemetry', 'debug', 'log')
+
+
+def bucket_index(value):
+    """Bucket of a non-negative integer value."""
+    if value < _SUB:
+        return value
+    shift = value.bit_length() - SUB_BITS
+    index = _SUB + (shift - 1) * _HALF + (value >> shift) - _HALF
+    return index if index < BUCKETS else BUCKETS - 1
+
+
+def bucket_high(index):
+    """Largest value that falls in bucket index."""
+    if index < _SUB:
+        return index
+    shift = (index - _SUB) // _HALF + 1
+    mantissa = (index - _SUB) % _HALF + _HALF
+    return ((mantissa + 1) << shift) - 1
+
+
+class Histogram:
+    """Fixed-size log-linear histogram of integer values (ns)."""
+
+    def __init__(self):
+        self.counts = [0] * BUCKETS
+        self.count = 0
+        self.total = 0
+        self.max = 0
+
+    def record(self, value):
+        # bucket_index(), inlined: this runs for every stage of every tick
+        if value < _SUB:
+            index = value if value > 0 else 0
+        else:
+            shift = value.bit_length() - SUB_BITS
+            index = _SUB + (shift - 1) * _HALF + (value >> shift) - _HALF
+            if index >= BUCKETS:
+                index = BUCKETS - 1
+        self.counts[index] += 1
+        self.count += 1
+        self.total += value
+        if value > self.max:
+            self.max = value
+
+    def percentile(self, p):
+        """Upper bound of the bucket holding the p-th percentile (0 if empty)."""
+        if self.count == 0:
+            return 0
+        rank = max(1, round(self.count * p / 100))
+        seen = 0
+        for index, n in enumerate(self.counts):
+            seen += n
+            if seen >= rank:
+                return min(bucket_high(index), self.max)
+        return self.max
+
+    def summary(self):
+        """{'count', 'mean', 'p50', 'p99', 'max'} in microseconds."""
+        return {
+            'count': self.count,
+            'mean': self.total / self.count / 1000 if self.count else 0.0,
+            'p50': self.percentile(50) / 1000,
+            'p99': self.percentile(99) / 1000,
+            'max': self.max / 1000,
+        }
+
+
+class LoopTimer:
+    """
+    Times the stages of each loop tick:
+        timer.start()
+        read_mag(); timer.mark('mag')
+        ...
+        timer.end()
+    A stage marked several times in one tick is recorded once, as its
+    total. Time after the last mark is recorded as 'other'.
+    enter(stage) before a call that can block names the stage running, for
+    the watchdog; it costs one attribute store and records nothing.
+    """
+
+    def __init__(self, stages=STAGES, filename=None, dump_interval=None):
+        self.stages = tuple(stages) + ('other',)
+        self.index = {stage: i for i, stage in enumerate(self.stages)}
+        self.histograms = [Histogram() for _ in self.stages]
+        self.tick = Histogram()  # start() to end()
+        self.period = Histogram()  # start() to the next start()
+        self.filename = filename
+        self.dump_interval = dump_interval
+
+        self._spent = [0] * len(self.stages)
+        self._ran = [False] * len(self.stages)
+        self._other = self.index['other']
+        self._tick_start = None
+        self._last = 0
+        self.stage = None  # stage entered and not yet marked (None: between stages)
+        self._created = time.perf_counter_ns()
+
+        self._stop = threading.Event()
+        self.thread = None
+        if filename and dump_interval:
+            self.thread = threading.Thread(target=self._run, daemon=True, name='loop-timing')
+            self.thread.start()
+
+    def start(self):
+        now = time.perf_counter_ns()
+        if self._tick_start is not None:
+            self.period.record(now - self._tick_start)
+        self._tick_start = self._last = now
+        self.stage = None
+
+    def enter(self, stage):
+        """Name the stage now running (until the next mark)."""
+        self.stage = stage
+
+    def mark(self, stage):
+        """Attribute the time since the previous mark (or start) to stage."""
+        now = time.perf_counter_ns()
+        i = self.index[stage]
+        self._spent[i] += now - self._last
+        self._ran[i] = True
+        self._last = now
+        self.stage = None
+
+    def skip(self):
+        """Drop the time since the previous mark (e.g. a sleep)."""
+        self._last = time.perf_counter_ns()
+
+    def end(self):
+        """Close the tick: record every stage that ran."""
+        now = time.perf_counter_ns()
+        if self._tick_start is None:
+            return
+        spent, ran, histograms = self._spent, self._ran, self.histograms
+        spent[self._other] += now - self._last
+        ran[self._other] = True
+        for i in range(len(spent)):
+            if ran[i]:
+                histograms[i].record(spent[i])
+                spent[i] = 0
+                ran[i] = False
+        self.tick.record(now - self._tick_start)
+
+    def summary(self):
+        elapsed = (time.perf_counter_ns() - self._created) / 1e9
+        period = self.period.summary()
+        return {
+            'elapsed': elapsed,
+            'ticks': self.tick.count,
+            'rate': 1e6 / period['mean'] if period['mean'] else 0.0,
+            'tick': self.tick.summary(),
+            'period': period,
+            'stages': {stage: hist.summary()
+                       for stage, hist in zip(self.stages, self.histograms) if hist.count},
+        }
+
+    def dump(self, filename=None):
+        """Write the summary as JSON (atomically). Returns the filename."""
+        filename = filename or self.filename
+        tmp = filename + '.tmp'
+        with open(tmp, 'w') as f:
+            json.dump(self.summary(), f, indent=2)
+        os.replace(tmp, filename)
+        return filename
+
+    def _run(self):
+        # Reads the histograms while the loop records into them; a dump
+        # may be a tick out of date, never blocks the loop
+        while not self._stop.wait(self.dump_interval):
+            if self.tick.count:
+                try:
+                    self.dump()
+                except OSError as e:
+                    print(f"Loop timing dump error: {e}")
+
+    def close(self):
+        """Stop the dump thread (call dump() after it for a final summary)."""
+        self._stop.set()
+        if self.thread is not None:
+            self.thread.join()
+            self.thread = None
+
+
+class NullTimer:
+    """LoopTimer stand-in when timing is disabled."""
+
+    stage = None
+
+    def start(self):
+        self.stage = None
+
+    def enter(self, stage):
+        self.stage = stage
+
+    def mark(self, stage):
+        self.stage = None
+
+    def skip(self):
+        pass
+
+    def end(self):
+        pass
+
+    def close(self):
+        pass
+
+
+def format_summary(summary):
+    lines = [f"{summary['ticks']} ticks, {summary['rate']:.1f} Hz over "
+             f"{summary['elapsed']:.1f}s",
+             f"  {'stage':<12} {'count':>8} {'p50 us':>10} {'p99 us':>10} {'max us':>10}"]
+    rows = list(summary['stages'].items()) + [('tick', summary['tick'])]
+    for stage, s in rows:
+        lines.append(f"  {stage:<12} {s['count']:8d} {s['p50']:10.1f} "
+                     f"{s['p99']:10.1f} {s['max']:10.1f}")
+    return "\n".join(lines)
+
+
+if __name__ == "__main__":
+    import config
+    with open(sys.argv[1] if len(sys.argv) > 1 else config.TIMING_FILE) as f:
+        print(format_summary(json.load(f)))
@@ -1,13 +1,14 @@
 # sensors/magnetometer.py
 import math
-from bmm150 import BMM150
+import clock
+import backends
 
 _mag = None
 
 def init_mag():
     global _mag
     if _mag is None:
-        _mag = BMM150()
+        _mag = backends.create('mag')  # BMM150 (or simulated backend)
     return _mag
 
 def ensure_initialized():
@@ -32,4 +33,14 @@ def get_heading_basic():
         heading += 360
     
 
-    return heading
\ No newline at end of file
+    return heading
+
+
+def get_heading_sample():
+    """
+    Heading with its acquisition time: (t, heading),
+    t = clock.monotonic() midway through the read
+    """
+    start = clock.monotonic()
+    heading = get_heading_basic()
+    return (start + clock.monotonic()) / 2, heading
\ No newline at end of file
@@ -3,69 +3,385 @@
 Main control loop - ties everything together.
 Coordinates sensors, navigation, motors, and logging.
 """
+import math
 import time
+import threading
+import functools
+import collections
+from concurrent.futures import ThreadPoolExecutor
 import config
-from imu import init_imu
-from magnetometer import init_mag
-from gpsmanager import init_gps, get_position
-from coordinate_transform import set_reference_point, latlon_to_xy
+import clock
+from imu import init_imu, get_accel_sample
+from magnetometer import init_mag, get_heading_sample
+from gpsmanager import init_gps, get_fix_sample
+from coordinate_transform import set_reference_point, latlon_to_xy, distance_2d
 from navigation import Navigator
 from datalogger import init_logger, log_data, close_logger, flush
+from sensor_process import SensorProcess, SensorProcessError
+import statecache
+import recorder
+from maneuver import ManeuverExecutor
+from looptiming import LoopTimer, NullTimer, format_summary
+from watchdog import Watchdog
+import datalogger
 import motor_helper
+import i2cbus
+
+
+class NoFixError(RuntimeError):
+    """No GPS reference fix arrived within GPS_FIX_TIMEOUT."""
 
 
 class RoverController:
-    def __init__(self):
+    def __init__(self, use_sensor_process=None):
         print("Initializing rover systems...")
+        t_start = time.monotonic()
+        
+        if use_sensor_process is None:
+            use_sensor_process = config.SENSOR_PROCESS_ENABLED
+        
+        # Reference fix is acquired in the background while everything
+        # else starts up
+        self.sensors = None
+        self.first_fix = None
+        self.fix_ready = threading.Event()
+        self._stop_fix_search = threading.Event()
+        self.startup_metrics = {}
+        self.ready = False
         
-        # Initialize sensors
-        init_imu()
-        init_mag()
-        init_gps()
+        # Last known state, persisted for warm start
+        self.last_fix = None  # [lat, lon, accuracy]
+        self.last_heading = None
+        self.last_state_save = time.monotonic()
+        self.warm_start = None  # resumed state awaiting live-fix validation
+        
+        # Initialize sensors concurrently (in the acquisition process if enabled)
+        if use_sensor_process:
+            setup = None
+            if config.RECORD_RAW:
+                # The drivers live in the child, so that is where to record
+                setup = functools.partial(recorder.start_in_child, config.RECORD_FILE)
+            self.sensors = SensorProcess(setup=setup)
+            self.sensors.start()
+            if config.RECORD_RAW:
+                recorder.forward_marks(self.sensors.mark)  # destinations, in the child's file
+            threading.Thread(target=self._acquire_fix, daemon=True,
+                             name='gps-fix').start()
+        else:
+            if config.RECORD_RAW:
+                recorder.start()
+            with ThreadPoolExecutor(max_workers=2) as pool:
+                pending = [pool.submit(init_imu), pool.submit(init_mag)]
+                threading.Thread(target=self._acquire_fix, args=(init_gps,),
+                                 daemon=True, name='gps-fix').start()
+                for future in pending:
+                    future.result()  # re-raise any init failure here
+        self.startup_metrics['sensors'] = time.monotonic() - t_start
         
         # Initialize navigator
         self.nav = Navigator()
         
+        # Motor commands run as timed maneuvers alongside the loop
+        self.maneuvers = ManeuverExecutor()
+        
+        # Per-stage tick latency
+        if config.TIMING_ENABLED:
+            self.timing = LoopTimer(filename=config.TIMING_FILE,
+                                    dump_interval=config.TIMING_DUMP_INTERVAL)
+        else:
+            self.timing = NullTimer()
+        
+        # Stops the motors from its own thread if a tick overruns the deadline;
+        # only in real time, a virtual clock doesn't advance while a tick runs
+        self.watchdog = None
+        if config.WATCHDOG_ENABLED and clock.get_clock() is None:
+            self.watchdog = Watchdog(on_expire=self.maneuvers.halt,
+                                     on_recover=self._watchdog_recover,
+                                     stage=lambda: self.timing.stage).start()
+        
+        # Remote commands, applied at tick boundaries (stop immediately)
+        self.paused = False
+        self.mission = collections.deque()  # waypoints after the current destination
+        self.ticks = 0
+        self.commands = None
+        if config.COMMAND_ENABLED:
+            from commandserver import CommandServer
+            self.commands = CommandServer(on_stop=self.emergency_stop).start()
+        
+        # Live telemetry and metrics endpoint
+        self.telemetry = None
+        self.metrics_server = None
+        if config.TELEMETRY_ENABLED:
+            from telemetry import TelemetryPublisher, MetricsServer
+            self.telemetry = TelemetryPublisher(loop_stats=self.loop_stats).start()
+            if config.TELEMETRY_METRICS_PORT is not None:
+                self.metrics_server = MetricsServer()
+                self.metrics_server.add_source(self.metrics)
+                self.metrics_server.add_source(self.telemetry.metrics)
+                if self.commands is not None:
+                    self.metrics_server.add_source(self.commands.metrics)
+                self.metrics_server.start()
+        
         # Initialize logger
         if config.LOG_ENABLED:
             init_logger()
         
-        # Get initial GPS position and set as reference
-        lat, lon = None, None
-        attempts = 0
-        maxattempts = 5
-        while (lat is None or lon is None) and attempts < maxattempts:
-            lat, lon = get_position()
-            if lat is None or lon is None:
-                time.sleep(1)
-                attempts += 1
-                
-        
-        set_reference_point(lat, lon)
-        self.nav.reset_position(0, 0)  # Start at origin
+        # Resume from recent saved state, else wait for a fix to use as reference
+        cached = statecache.load_state() if config.WARM_START_ENABLED else None
+        if cached is not None and statecache.is_fresh(cached):
+            self._resume(cached)
+        else:
+            lat, lon = self.wait_for_reference_fix()
+            set_reference_point(lat, lon)
+            self.nav.reset_position(0, 0)  # Start at origin
+            print(f"Rover initialized at: {lat:.6f}, {lon:.6f}")
+        self.startup_metrics['reference'] = time.monotonic() - t_start
         
-        print(f"Rover initialized at: {lat:.6f}, {lon:.6f}")
+        self.startup_metrics['total'] = time.monotonic() - t_start
+        print(f"Time to ready: {self.startup_metrics['total']:.2f}s "
+              f"(sensors {self.startup_metrics['sensors']:.2f}s, "
+              f"reference {self.startup_metrics['reference']:.2f}s)")
         
         # State tracking
-        self.last_gps_update = time.time()
+        self.last_gps_update = clock.time()
         self.running = False
+        self.ready = True
+    
+    def _acquire_fix(self, init=None):
+        """Background thread: poll until the first valid GPS fix."""
+        if init is not None:
+            init()
+        while not self._stop_fix_search.is_set():
+            lat, lon, accuracy = self.read_fix()
+            if lat is not None and lon is not None:
+                self.first_fix = (lat, lon, accuracy)
+                self.fix_ready.set()
+                return
+            self._stop_fix_search.wait(config.GPS_FIX_POLL_INTERVAL)
+    
+    def wait_for_reference_fix(self):
+        """
+        Wait up to GPS_FIX_TIMEOUT for the first fix, then apply
+        NO_FIX_POLICY: 'abort' raises NoFixError, 'wait' keeps waiting,
+        'ip' falls back to IP geolocation (coarse, ~km accuracy).
+        """
+        if self.fix_ready.wait(config.GPS_FIX_TIMEOUT):
+            self.last_fix = list(self.first_fix)
+            return self.first_fix[:2]
+        
+        policy = config.NO_FIX_POLICY
+        print(f"No GPS fix after {config.GPS_FIX_TIMEOUT:.0f}s (policy: {policy})")
+        
+        if policy == 'wait':
+            while not self.fix_ready.wait(10.0):
+                print("Still waiting for GPS fix...")
+            self.last_fix = list(self.first_fix)
+            return self.first_fix[:2]
+        
+        if policy == 'ip':
+            from iplocation import get_location  # pulls in requests
+            lat, lon = get_location()
+            if lat is not None and lon is not None:
+                return lat, lon
+        
+        self.shutdown()
+        raise NoFixError(f"No GPS fix within {config.GPS_FIX_TIMEOUT:.0f}s")
+    
+    def _resume(self, state):
+        """Warm start: restore reference frame, position and mission."""
+        ref_lat, ref_lon = state['reference']
+        set_reference_point(ref_lat, ref_lon)
+        self.nav.reset_position(*state['position'])
+        if state.get('destination') is not None:
+            self.nav.set_destination(*state['destination'])
+        
+        self.last_fix = state.get('last_fix')
+        self.last_heading = state.get('heading')
+        if state.get('calibration_id') != statecache.calibration_id():
+            print("Warning: calibration changed since state was saved")
+        
+        # Checked against the first live fix once it arrives
+        self.warm_start = state
+        age = time.time() - state['saved_at']
+        print(f"Warm start from saved state ({age:.0f}s old) "
+              f"at ({state['position'][0]:.1f}, {state['position'][1]:.1f})")
+    
+    def _validate_warm_start(self):
+        """Compare the resumed position with the first live fix."""
+        state, self.warm_start = self.warm_start, None
+        lat, lon, accuracy = self.first_fix
+        self.last_fix = [lat, lon, accuracy]
+        x, y = latlon_to_xy(lat, lon)
+        dist = distance_2d(x, y, *state['position'])
+        if dist > config.STATE_MAX_DISTANCE:
+            print(f"Saved state rejected: first fix is {dist:.1f}m away")
+            self.nav.reset_position(x, y)
+        elif config.DEBUG_PRINT_NAVIGATION:
+            print(f"Saved state validated: first fix is {dist:.1f}m away")
+    
+    def save_state(self):
+        """Persist last known state for warm start."""
+        if not config.WARM_START_ENABLED:
+            return
+        destination = None
+        if self.nav.dest_x is not None:
+            destination = [self.nav.dest_x, self.nav.dest_y]
+        statecache.save_state({
+            'reference': [config.REF_LAT, config.REF_LON],
+            'last_fix': self.last_fix,
+            'position': [self.nav.x, self.nav.y],
+            'heading': self.last_heading,
+            'calibration_id': statecache.calibration_id(),
+            'destination': destination,
+            'reached': self.nav.has_reached_destination(),
+        })
+        self.last_state_save = time.monotonic()
+    
+    def update_state_cache(self):
+        """Per-tick warm-start upkeep: live-fix validation and periodic save."""
+        if self.warm_start is not None and self.fix_ready.is_set():
+            self._validate_warm_start()
+        if time.monotonic() - self.last_state_save > config.STATE_SAVE_INTERVAL:
+            self.save_state()
+    
+    def shutdown(self):
+        """Release sensors and close the log. Safe to call more than once."""
+        self._stop_fix_search.set()
+        if self.commands is not None:
+            self.commands.close()
+            self.commands = None
+        if self.watchdog is not None:
+            self.watchdog.close()
+            misses = self.watchdog.stats()
+            if misses['misses']:
+                print(f"Watchdog: {misses['misses']} deadline misses, longest stall "
+                      f"{misses['worst_stall']:.2f}s, worst stop "
+                      f"{misses['worst_stop_latency'] * 1000:.1f} ms past the deadline")
+            self.watchdog = None
+        self.maneuvers.close()
+        if self.telemetry is not None:
+            self.telemetry.close()
+            self.telemetry = None
+        if self.metrics_server is not None:
+            self.metrics_server.close()
+            self.metrics_server = None
+        self.timing.close()
+        if isinstance(self.timing, LoopTimer) and self.timing.tick.count:
+            self.timing.dump()
+            print(format_summary(self.timing.summary()))
+        if self.ready:
+            self.save_state()
+        if self.sensors is not None:
+            recorder.forward_marks(None)
+            self.sensors.stop()
+        recorder.stop()
+        
+        # Flush and close logger
+        if config.LOG_ENABLED:
+            flush()
+            close_logger()
     
     def set_destination_latlon(self, dest_lat, dest_lon):
         """Set destination using GPS coordinates."""
         dest_x, dest_y = latlon_to_xy(dest_lat, dest_lon)
         self.nav.set_destination(dest_x, dest_y)
+        recorder.mark('dest', dest_x, dest_y)
         print(f"Destination: {dest_lat:.6f}, {dest_lon:.6f} -> ({dest_x:.1f}m, {dest_y:.1f}m)")
     
     def set_destination_xy(self, x, y):
         """Set destination using local XY coordinates."""
         self.nav.set_destination(x, y)
+        recorder.mark('dest', x, y)
+    
+    def emergency_stop(self):
+        """Stop the motors now and pause (from any thread); resume continues."""
+        self.paused = True
+        self.maneuvers.halt()
+    
+    def apply_commands(self):
+        """Apply remote commands received since the last tick and acknowledge them."""
+        for command, reply in self.commands.poll():
+            try:
+                self._apply_command(command)
+            except ValueError as e:
+                self.commands.ack(reply, command, 'error', error=str(e))
+            else:
+                self.commands.ack(reply, command, tick=self.ticks)
+    
+    def _apply_command(self, command):
+        name = command['cmd']
+        if name in ('goto', 'mission'):
+            if config.REF_LAT is None and any(w[0] == 'latlon' for w in command['waypoints']):
+                raise ValueError("no reference fix for lat/lon waypoints")
+            self.mission = collections.deque(command['waypoints'])
+            self.next_waypoint()
+        elif name == 'pause':
+            self.paused = True
+            self.maneuvers.halt()
+        elif name == 'resume':
+            self.paused = False
+            self.nav.last_update_time = None  # don't integrate across the pause
+            self.maneuvers.release()
+    
+    def _watchdog_recover(self):
+        """The loop ticks again after a deadline miss: drive again unless paused."""
+        self.nav.last_update_time = None  # don't integrate across the stall
+        if not self.paused:
+            self.maneuvers.release()
+    
+    def next_waypoint(self):
+        """Make the next queued waypoint the destination. False if there is none."""
+        if not self.mission:
+            return False
+        kind, a, b = self.mission.popleft()
+        if kind == 'latlon':
+            self.set_destination_latlon(a, b)
+        else:
+            self.set_destination_xy(a, b)
+        return True
+    
+    def read_fix_sample(self):
+        """
+        Latest GPS fix with its measurement time (clock.monotonic()):
+        (t, (lat, lon, accuracy)), or (None, (None, None, None)).
+        """
+        if self.sensors is None:
+            return get_fix_sample()
+        sample = self.sensors.latest('gps')
+        if sample is None:
+            return None, (None, None, None)
+        t, (lat, lon, accuracy) = sample
+        return t, (lat, lon, None if math.isnan(accuracy) else accuracy)
+    
+    def read_fix(self):
+        """Latest GPS fix as (lat, lon, accuracy), or (None, None, None)."""
+        return self.read_fix_sample()[1]
+    
+    def read_position(self):
+        """Latest GPS fix as (lat, lon), or (None, None)."""
+        lat, lon, _ = self.read_fix()
+        return lat, lon
+    
+    def read_sensors(self):
+        """
+        Latest accel and heading samples from the acquisition process, each
+        (acquisition time, value). Returns (None, None) without it, so
+        the control step reads the drivers.
+        """
+        if self.sensors is None:
+            return None, None
+        self.sensors.check()
+        t_accel, accel = self.sensors.latest('imu')
+        t_heading, (heading,) = self.sensors.latest('mag')
+        return (t_accel, accel), (t_heading, heading)
     
     def update_from_gps(self):
         """Resync position from GPS (called periodically)."""
-        lat, lon = get_position()
+        t, (lat, lon, accuracy) = self.read_fix_sample()
         if lat is not None and lon is not None:
+            self.last_fix = [lat, lon, accuracy]
             x, y = latlon_to_xy(lat, lon)
-            self.nav.reset_position(x, y)
+            self.nav.apply_fix(x, y, t)  # carried forward from when it was measured
             if config.DEBUG_PRINT_NAVIGATION:
                 print(f"GPS resync: ({x:.2f}, {y:.2f})")
             return lat, lon
@@ -73,63 +389,108 @@ class RoverController:
     
     def control_loop(self):
         """Main control loop - call this repeatedly."""
+        if self.watchdog is not None:
+            self.watchdog.pet()
+        self.timing.start()
+        try:
+            self._control_step()
+        finally:
+            self.timing.end()
+    
+    def _control_step(self):
+        timing = self.timing
+        self.ticks += 1
+        if self.commands is not None:
+            self.apply_commands()
+            timing.mark('commands')
+        self.maneuvers.update()  # steps the maneuver when there is no timer thread
+        timing.mark('motors')
+        self.update_state_cache()
+        timing.mark('state')
+        if self.paused:
+            return  # motors are halted; hold position until resume
+        
+        # Each sensor is read once per tick and the sample passed on,
+        # with its acquisition time
+        timing.enter('sensors')
+        accel_sample, heading_sample = self.read_sensors()
+        if self.sensors is not None:
+            timing.mark('sensors')
+        if heading_sample is None:
+            timing.enter('mag')
+            heading_sample = get_heading_sample()
+            timing.mark('mag')
+        heading = heading_sample[1]
+        
         # Get navigation command FIRST
-        command, speed = self.nav.get_navigation_command()
+        command, speed = self.nav.get_navigation_command(heading)
+        timing.mark('navigation')
         
         # Only update position when moving forward (not during turns)
         if command == 'forward':
-            state = self.nav.update_position()
+            if accel_sample is None:
+                timing.enter('imu')
+                accel_sample = get_accel_sample()
+                timing.mark('imu')
+            t, accel = accel_sample
+            state = self.nav.update_position(accel, heading, t)
+            timing.mark('navigation')
             if state is None:
                 return  # First iteration, skip
         else:
             # During turns, just get current state without updating position
-            from magnetometer import get_heading_basic
             state = {
                 'x': self.nav.x,
                 'y': self.nav.y,
                 'vx': self.nav.vx,
                 'vy': self.nav.vy,
-                'heading': get_heading_basic(),
+                'heading': heading,
                 'ax_body': 0, 'ay_body': 0, 'az_body': 0,
                 'ax_earth': 0, 'ay_earth': 0
             }
         
+        self.last_heading = state['heading']
+        
         # Check if GPS resync needed
         lat, lon = None, None
         if self.nav.should_resync_gps():
+            timing.enter('gps')
             lat, lon = self.update_from_gps()
-            self.last_gps_update = time.time()
+            self.last_gps_update = clock.time()
+            timing.mark('gps')
         
-        time.sleep(0.1)
-        
-        # Execute motor command
+        # Execute motor command without blocking; sensing continues next tick
         if command == 'forward':
-            motor_helper.forward(speed)
-            time.sleep(0.1)
-        elif command == 'turn_left':
-            motor_helper.turn_left(speed)
-            time.sleep(0.4)
-            motor_helper.stop()
-            time.sleep(0.1)
-        elif command == 'turn_right':
-            motor_helper.turn_right(speed)
-            time.sleep(0.4)
-            motor_helper.stop()
-            time.sleep(0.1)
+            # Renewed every tick; the motors stop if the loop stalls
+            self.maneuvers.hold('forward', speed, config.FORWARD_HOLD)
+        elif command in ('turn_left', 'turn_right'):
+            if not self.maneuvers.busy(command):  # let the current pulse finish
+                self.maneuvers.submit(command, [(command, speed, config.TURN_PULSE),
+                                                ('stop', 0, config.TURN_SETTLE)])
         elif command == 'stop':
-            motor_helper.stop()
+            self.maneuvers.stop()
             self.running = False
+        timing.mark('motors')
+        
+        dist = self.nav.get_distance_to_destination()
+        heading_err = self.nav.get_heading_error(heading)
+        if self.telemetry is not None:
+            fix = self.last_fix or (None, None)
+            self.telemetry.publish(state['x'], state['y'], state['vx'], state['vy'],
+                                   state['heading'], heading_err, dist,
+                                   fix[0], fix[1], command)
+            timing.mark('telemetry')
         
         # Debug print
         if config.DEBUG_PRINT_NAVIGATION:
-            dist = self.nav.get_distance_to_destination()
-            heading_err = self.nav.get_heading_error()
             print(f"Pos:({state['x']:.1f},{state['y']:.1f}) "
                 f"Heading:{state['heading']:.1f}° "
                 f"Dist:{dist:.1f}m HErr:{heading_err:.1f}° Cmd:{command}")
+            timing.mark('debug')
             
         # Log data
         if config.LOG_ENABLED:
+            timing.enter('log')
             log_data(
                 lat=lat,
                 lon=lon,
@@ -144,42 +505,125 @@ class RoverController:
                 ay_earth=state['ay_earth'],
                 heading=state['heading'],
                 target_bearing=self.nav.get_bearing_to_destination(),
-                heading_error=self.nav.get_heading_error(),
-                distance_to_dest=self.nav.get_distance_to_destination(),
+                heading_error=heading_err,
+                distance_to_dest=dist,
                 motor_command=command
             )
+            timing.mark('log')
+    
+    def loop_stats(self):
+        """(tick rate Hz, tick p99 ms, dropped log rows) for telemetry frames."""
+        if not isinstance(self.timing, LoopTimer):
+            return 0.0, 0.0, 0
+        period = self.timing.period
+        rate = period.count * 1e9 / period.total if period.total else 0.0
+        log = datalogger.stats()
+        return rate, self.timing.tick.percentile(99) / 1e6, log['dropped'] if log else 0
     
-    def run(self):
-        """Run the control loop until destination reached."""
+    def metrics(self):
+        """Counters for the metrics endpoint: [(name, type, help, value)]."""
+        metrics = [
+            ('rover_running', 'gauge', "1 while navigating", int(self.running)),
+            ('rover_distance_to_destination_meters', 'gauge', "Distance left",
+             self.nav.get_distance_to_destination()),
+        ]
+        if isinstance(self.timing, LoopTimer):
+            stages = self.timing.summary()['stages']
+            metrics += [
+                ('rover_ticks_total', 'counter', "Control loop ticks", self.timing.tick.count),
+                ('rover_loop_rate_hz', 'gauge', "Mean control loop rate", self.loop_stats()[0]),
+                ('rover_stage_p50_us{stage}', 'gauge', "Median stage time per tick",
+                 {stage: s['p50'] for stage, s in stages.items()}),
+                ('rover_stage_p99_us{stage}', 'gauge', "99th percentile stage time per tick",
+                 {stage: s['p99'] for stage, s in stages.items()}),
+                ('rover_stage_max_us{stage}', 'gauge', "Longest stage time",
+                 {stage: s['max'] for stage, s in stages.items()}),
+            ]
+        log = datalogger.stats()
+        if log:
+            metrics += [
+                ('rover_log_rows_total{result}', 'counter', "Log rows by outcome",
+                 {'written': log['written'], 'dropped': log['dropped'],
+                  'blocked': log['blocked']}),
+                ('rover_log_errors_total', 'counter', "Log write errors", log['errors']),
+            ]
+        bus = i2cbus.stats()
+        if bus:
+            metrics += [
+                ('rover_i2c_transactions_total', 'counter', "I2C transactions completed",
+                 bus['transactions']),
+                ('rover_i2c_errors_total{kind}', 'counter', "I2C failed attempts",
+                 {'retried': bus['retries'], 'failed': bus['failures']}),
+                ('rover_i2c_utilization', 'gauge', "Fraction of time the I2C bus was held",
+                 bus['utilization']),
+                ('rover_i2c_max_wait_seconds', 'gauge', "Longest wait for the I2C bus",
+                 bus['max_wait']),
+            ]
+        if self.watchdog is not None:
+            watchdog = self.watchdog.stats()
+            metrics += [
+                ('rover_watchdog_misses_total', 'counter', "Control loop deadline misses",
+                 watchdog['misses']),
+                ('rover_watchdog_stop_latency_seconds', 'gauge',
+                 "Worst time from a missed deadline to motors stopped",
+                 watchdog['worst_stop_latency']),
+            ]
+        gpio = motor_helper.driver.stats()
+        maneuvers = self.maneuvers.stats()
+        metrics += [
+            ('rover_gpio_writes_total{kind}', 'counter', "Motor pin writes issued",
+             {'digital': gpio['digital_writes'], 'pwm': gpio['pwm_writes']}),
+            ('rover_gpio_skipped_total', 'counter', "Motor pin writes avoided (unchanged)",
+             gpio['skipped']),
+            ('rover_maneuvers_total{event}', 'counter', "Maneuver executor events",
+             maneuvers),
+        ]
+        return metrics
+    
+    def run(self, timeout=None):
+        """
+        Run the control loop until destination reached.
+        timeout: optional limit in (clock) seconds, e.g. for simulated missions.
+        """
         self.running = True
         loop_time = 1.0 / config.IMU_FREQUENCY
+        deadline = None if timeout is None else clock.monotonic() + timeout
         
         print("Starting navigation...")
         
         try:
-            while self.running and not self.nav.has_reached_destination():
-                start = time.time()
+            while self.running:
+                if self.nav.has_reached_destination() and not self.next_waypoint():
+                    break
+                if deadline is not None and clock.monotonic() >= deadline:
+                    print("Mission timed out")
+                    break
+                
+                start = clock.time()
                 
                 self.control_loop()
                 
                 # Maintain loop timing
-                elapsed = time.time() - start
+                elapsed = clock.time() - start
                 if elapsed < loop_time:
-                    time.sleep(loop_time - elapsed)
+                    clock.sleep(loop_time - elapsed)
             
             # Reached destination or stopped
-            motor_helper.stop()
+            self.maneuvers.stop()
             print("Navigation complete!")
             
         except KeyboardInterrupt:
             print("\nStopping...")
-            motor_helper.stop()
+            self.maneuvers.stop()
+        
+        except SensorProcessError as e:
+            print(f"\nSensor failure: {e}")
+            self.maneuvers.stop()
         
         finally:
-            # Flush and close logger
-            if config.LOG_ENABLED:
-                flush()
-                close_logger()
+            if self.watchdog is not None:
+                self.watchdog.disarm()
+            self.shutdown()
 
 # Standalone test/demo
 if __name__ == "__main__":
@@ -0,0 +1,223 @@
+# maneuver.py
+"""
+Non-blocking timed motor maneuvers.
+A maneuver is a list of steps (command, speed, duration), e.g. a turn
+pulse followed by a settle stop. submit() returns immediately and the
+executor runs the steps on its own timer thread, so the control loop
+keeps reading sensors while the motors execute. Speeds ramp over
+MOTOR_RAMP seconds, a new maneuver preempts the running one, and the
+motors are stopped whenever a maneuver ends without being renewed.
+
+Under a VirtualClock nothing runs in the background: the controller calls
+update() every tick, so simulated missions and replays stay deterministic.
+"""
+import threading
+import clock
+import config
+import motor_helper
+
+COMMANDS = ('forward', 'backward', 'turn_left', 'turn_right', 'stop')
+
+
+class Maneuver:
+    """Handle for a submitted maneuver."""
+
+    def __init__(self, name, steps, ramp):
+        self.name = name
+        self.steps = [(command, speed, duration) for command, speed, duration in steps]
+        for command, _, _ in self.steps:
+            if command not in COMMANDS:
+                raise ValueError(f"Unknown motor command '{command}'")
+        self.ramp = ramp
+        self.status = 'pending'  # 'running' | 'done' | 'preempted'
+        self.done = threading.Event()
+
+        self.step = -1  # index of the step being executed
+        self.step_start = None
+        self.step_end = None
+        self.start_speed = 0.0
+
+    def wait(self, timeout=None):
+        return self.done.wait(timeout)
+
+    def _finish(self, status):
+        self.status = status
+        self.done.set()
+
+
+class ManeuverExecutor:
+    def __init__(self, motors=motor_helper, ramp=None, rate=None, threaded=None):
+        self.motors = motors
+        self.ramp = config.MOTOR_RAMP if ramp is None else ramp
+        self.period = 1.0 / (rate or config.MANEUVER_RATE)
+        if threaded is None:
+            threaded = clock.get_clock() is None  # a VirtualClock only advances in the loop
+        self.threaded = threaded
+
+        self.cond = threading.Condition()
+        self.current = None
+        self.command = 'stop'  # last command sent to the motors
+        self.speed = 0.0
+        self.closed = False
+        self.halted = False  # set by halt(): motors stay stopped until release()
+        self._thread = None
+
+        # Counters
+        self.submitted = 0
+        self.preempted = 0
+        self.timeouts = 0  # maneuvers that ended in a stop without being renewed
+        self.errors = 0
+        self.refused = 0  # submitted while halted
+
+    # ------------------------------ Commands ------------------------------ #
+    def submit(self, name, steps, ramp=None):
+        """
+        Run steps [(command, speed, duration), ...] from now, preempting the
+        running maneuver. The motors stop after the last step. Returns the
+        Maneuver without waiting for it, or None while halted.
+        """
+        maneuver = Maneuver(name, steps, self.ramp if ramp is None else ramp)
+        with self.cond:
+            if self.closed:
+                raise RuntimeError("maneuver executor is closed")
+            if self.halted:
+                self.refused += 1
+                return None
+            if self.current is not None:
+                self.current._finish('preempted')
+                self.preempted += 1
+            self.current = maneuver
+            self.submitted += 1
+            self._start_step(maneuver, 0, clock.monotonic())
+            self.cond.notify()
+        self._ensure_thread()
+        return maneuver
+
+    def hold(self, command, speed, duration):
+        """
+        Keep running command at speed for another duration seconds.
+        Renews the running maneuver if it is the same single command (the
+        speed ramp continues), otherwise starts a new one.
+        """
+        with self.cond:
+            maneuver = self.current
+            if (maneuver is not None and maneuver.name == command
+                    and len(maneuver.steps) == 1 and not self.closed):
+                maneuver.steps[0] = (command, speed, duration)
+                maneuver.step_end = clock.monotonic() + duration
+                self.cond.notify()
+                return maneuver
+        return self.submit(command, [(command, speed, duration)])
+
+    def busy(self, name=None):
+        """True while a maneuver (named name, if given) is running."""
+        maneuver = self.current
+        return maneuver is not None and (name is None or maneuver.name == name)
+
+    def stop(self):
+        """Cancel any maneuver and stop the motors now."""
+        with self.cond:
+            if self.current is not None:
+                self.current._finish('preempted')
+                self.preempted += 1
+                self.current = None
+            self._send('stop', 0)
+            self.cond.notify()
+
+    def halt(self):
+        """
+        Stop the motors now and refuse new maneuvers until release().
+        Safe to call from any thread: a tick in progress can't restart the
+        motors after the stop.
+        """
+        with self.cond:
+            self.halted = True
+            self.stop()
+
+    def release(self):
+        """Accept maneuvers again after halt()."""
+        with self.cond:
+            self.halted = False
+
+    def close(self):
+        """Stop the motors and the timer thread. Safe to call more than once."""
+        self.stop()
+        with self.cond:
+            self.closed = True
+            self.cond.notify()
+        if self._thread is not None:
+            self._thread.join(timeout=1.0)
+            self._thread = None
+
+    def stats(self):
+        return {'submitted': self.submitted, 'preempted': self.preempted,
+                'timeouts': self.timeouts, 'errors': self.errors, 'refused': self.refused}
+
+    # ------------------------------ Execution ------------------------------ #
+    def update(self):
+        """
+        Apply the motor state for the current time: next step, ramp speed,
+        or the stop after the last step. Returns seconds until the next
+        change (None when idle).
+        """
+        with self.cond:
+            maneuver = self.current
+            if maneuver is None:
+                return None
+            now = clock.monotonic()
+            while now >= maneuver.step_end:
+                if maneuver.step + 1 < len(maneuver.steps):
+                    self._start_step(maneuver, maneuver.step + 1, maneuver.step_end)
+                    continue
+                self._send('stop', 0)
+                self.current = None
+                self.timeouts += maneuver.steps[-1][0] != 'stop'
+                maneuver._finish('done')
+                return None
+
+            command, speed, _ = maneuver.steps[maneuver.step]
+            elapsed = now - maneuver.step_start
+            if command == 'stop' or elapsed >= maneuver.ramp:
+                self._send(command, speed)
+                return maneuver.step_end - now
+            fraction = elapsed / maneuver.ramp
+            self._send(command, maneuver.start_speed + (speed - maneuver.start_speed) * fraction)
+            return min(self.period, maneuver.step_end - now)
+
+    def _start_step(self, maneuver, index, start):
+        command = maneuver.steps[index][0]
+        maneuver.step = index
+        maneuver.step_start = start
+        maneuver.step_end = start + maneuver.steps[index][2]
+        maneuver.status = 'running'
+        # Ramp from the current speed when continuing the same motion
+        maneuver.start_speed = self.speed if command == self.command else 0.0
+        if maneuver.ramp <= 0 or command == 'stop':
+            self._send(command, maneuver.steps[index][1])
+        else:
+            self._send(command, maneuver.start_speed)
+
+    def _send(self, command, speed):
+        try:
+            getattr(self.motors, command)(*(() if command == 'stop' else (speed,)))
+        except Exception as e:
+            self.errors += 1
+            print(f"Maneuver: motor command {command} failed: {e}")
+            if command != 'stop':
+                self.motors.stop()
+                command, speed = 'stop', 0
+        self.command = command
+        self.speed = speed
+
+    def _ensure_thread(self):
+        if self.threaded and self._thread is None and not self.closed:
+            self._thread = threading.Thread(target=self._run, daemon=True, name='maneuver')
+            self._thread.start()
+
+    def _run(self):
+        with self.cond:
+            while not self.closed:
+                wait = self.update()
+                if self.closed:
+                    break
+                self.cond.wait(timeout=wait)
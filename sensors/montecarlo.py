@@ -0,0 +1,153 @@
+# montecarlo.py
+"""
+Monte Carlo mission evaluation.
+Fans seeded simulated missions out across a process pool; each run draws
+its own destination, sensor noise and residual bias, and sends back a
+compact result tuple. The results are aggregated into percentile tables.
+Usage:
+    python3 montecarlo.py --runs 2000
+    python3 montecarlo.py --runs 1000 --vary GPS_UPDATE_INTERVAL=10,30,60
+    python3 montecarlo.py --runs 400 --scaling
+"""
+import os
+import ast
+import math
+import time
+import random
+import argparse
+from concurrent.futures import ProcessPoolExecutor
+import config
+from simulate import run_mission
+
+PERCENTILES = (50, 90, 95, 99)
+
+# Compact per-run result: (index, reached, arrival_error, estimate_error, sim_time)
+RESULT_FIELDS = ('index', 'reached', 'arrival_error', 'estimate_error', 'sim_time')
+
+
+def sample_run(seed):
+    """Destination and simulated sensor errors for one run, drawn from seed."""
+    rng = random.Random(seed)
+
+    distance = rng.uniform(5.0, 30.0)
+    bearing = rng.uniform(0.0, 2 * math.pi)
+    dest = (distance * math.sin(bearing), distance * math.cos(bearing))
+
+    sim_params = {
+        'SIM_HEADING': rng.uniform(0.0, 360.0),
+        'ACCEL_NOISE': rng.uniform(0.02, 0.10),
+        'GYRO_NOISE': rng.uniform(0.05, 0.20),
+        'MAG_NOISE': rng.uniform(0.1, 1.0),
+        'GPS_NOISE': rng.uniform(0.5, 3.0),
+        # Residual bias left after config's calibration values
+        'ACCEL_BIAS': [config.ACCEL_BIAS_X + rng.gauss(0.0, 0.05),
+                       config.ACCEL_BIAS_Y + rng.gauss(0.0, 0.05),
+                       config.ACCEL_BIAS_Z],
+        'MAG_BIAS': [rng.gauss(0.0, 2.0), rng.gauss(0.0, 2.0), 0.0],
+    }
+    return dest, sim_params
+
+
+def _run_one(job):
+    """Worker: simulate one mission, return the compact result tuple."""
+    index, seed, overrides, timeout = job
+    dest, sim_params = sample_run(seed)
+    result = run_mission(*dest, timeout=timeout, seed=seed,
+                         overrides=overrides, sim_params=sim_params)
+    return (index, result['reached'], result['arrival_error'],
+            result['estimate_error'], result['sim_time'])
+
+
+def evaluate(runs, workers=None, base_seed=0, overrides=None, timeout=600.0):
+    """
+    Simulate runs missions on a pool of workers (default: all cores).
+    Run i always uses seed base_seed + i, so batches with different
+    overrides see the same destinations and sensor errors.
+    """
+    workers = workers or os.cpu_count()
+    jobs = [(i, base_seed + i, overrides or {}, timeout) for i in range(runs)]
+    chunksize = max(1, runs // (workers * 8))
+
+    with ProcessPoolExecutor(max_workers=workers) as pool:
+        return list(pool.map(_run_one, jobs, chunksize=chunksize))
+
+
+def percentile(sorted_values, p):
+    """Nearest-rank percentile of an already sorted list."""
+    if not sorted_values:
+        return float('nan')
+    rank = max(0, math.ceil(p / 100 * len(sorted_values)) - 1)
+    return sorted_values[rank]
+
+
+def summarize(results):
+    """Reach rate plus percentiles of each metric over all runs."""
+    summary = {'runs': len(results),
+               'reached': sum(1 for r in results if r[1]) / len(results)}
+    for field in ('arrival_error', 'estimate_error', 'sim_time'):
+        column = sorted(r[RESULT_FIELDS.index(field)] for r in results)
+        summary[field] = {p: percentile(column, p) for p in PERCENTILES}
+        summary[field]['max'] = column[-1]
+    return summary
+
+
+def print_table(label, rows):
+    """rows: [(value label, summary)] -> percentile table."""
+    cols = [f"p{p}" for p in PERCENTILES] + ['max']
+    print(f"\n{label:<22} {'runs':>5} {'reached':>8} | arrival error (m) "
+          + ' '.join(f"{c:>6}" for c in cols)
+          + " | time p95 (s)")
+    for value, s in rows:
+        arrival = s['arrival_error']
+        print(f"{value:<22} {s['runs']:5d} {s['reached'] * 100:7.1f}% |"
+              + ' ' * 18
+              + ' '.join(f"{arrival[p]:6.2f}" for p in PERCENTILES)
+              + f" {arrival['max']:6.2f} | {s['sim_time'][95]:8.1f}")
+
+
+def scaling(runs, base_seed=0):
+    """Throughput of the same batch on 1, 2, 4 and N workers."""
+    counts = sorted({1, 2, 4, os.cpu_count()})
+    print(f"\nScaling ({runs} runs per batch, {os.cpu_count()} cores)")
+    print(f"{'workers':>7} {'wall (s)':>9} {'runs/s':>8} {'speedup':>8} {'efficiency':>10}")
+    baseline = None
+    for workers in counts:
+        start = time.perf_counter()
+        evaluate(runs, workers=workers, base_seed=base_seed)
+        wall = time.perf_counter() - start
+        baseline = baseline or wall
+        speedup = baseline / wall
+        print(f"{workers:7d} {wall:9.2f} {runs / wall:8.1f} "
+              f"{speedup:7.2f}x {speedup / workers * 100:9.0f}%")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Monte Carlo mission evaluation")
+    parser.add_argument('--runs', type=int, default=1000, help="missions per batch")
+    parser.add_argument('--workers', type=int, default=None, help="default: all cores")
+    parser.add_argument('--seed', type=int, default=0, help="base seed")
+    parser.add_argument('--timeout', type=float, default=600.0,
+                        help="simulated seconds before a mission is abandoned")
+    parser.add_argument('--vary', metavar='NAME=V1,V2,...',
+                        help="compare batches over values of one config parameter")
+    parser.add_argument('--scaling', action='store_true',
+                        help="measure throughput on 1, 2, 4 and N workers")
+    args = parser.parse_args()
+
+    if args.scaling:
+        scaling(args.runs, base_seed=args.seed)
+    else:
+        batches = [('default', {})]
+        label = 'config'
+        if args.vary:
+            label, _, values = args.vary.partition('=')
+            batches = [(v, {label: ast.literal_eval(v)}) for v in values.split(',')]
+
+        rows = []
+        for value, overrides in batches:
+            start = time.perf_counter()
+            results = evaluate(args.runs, workers=args.workers, base_seed=args.seed,
+                               overrides=overrides, timeout=args.timeout)
+            print(f"{label}={value}: {args.runs} runs in {time.perf_counter() - start:.1f}s")
+            rows.append((value, summarize(results)))
+        print_table(label, rows)
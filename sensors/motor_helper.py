@@ -1,126 +1,157 @@
-from gpiozero import PWMOutputDevice, DigitalOutputDevice
-### if motors to fast lower speed value ### 
-
-# right motors (front) moving opposite for some reason, fix next time.
+import threading
+import backends
+### if motors to fast lower speed value ###
 
 # differential steering, one motor driver for left motors and one for right motors
-# LEFT FRONT
-lf_enable = PWMOutputDevice(16)
-lf_in1 = DigitalOutputDevice(20)   
-lf_in2 = DigitalOutputDevice(21)
-# LEFT BACK
-lb_enable = PWMOutputDevice(13)
-lb_in1 = DigitalOutputDevice(19)
-lb_in2 = DigitalOutputDevice(26)
-# RIGHT FRONT
-rf_enable = PWMOutputDevice(18)
-rf_in1 = DigitalOutputDevice(23)
-rf_in2 = DigitalOutputDevice(24)
-# RIGHT BACK
-rb_enable = PWMOutputDevice(17)
-rb_in1 = DigitalOutputDevice(27)
-rb_in2 = DigitalOutputDevice(22)
+# Wheel -> (PWM pin, in1 pin, in2 pin, +1 if in1 on means forward).
+# The right front and left back motors are wired reversed on the L298N,
+# so for them in2 on means forward.
+WHEELS = {
+    'lf': (16, 20, 21, +1),
+    'lb': (13, 19, 26, -1),
+    'rf': (18, 23, 24, -1),
+    'rb': (17, 27, 22, +1),
+}
+
+
+class MotorDriver:
+    """
+    Four L298N motor channels behind a per-wheel calibration table.
+    Keeps the last value written to every pin and only writes pins whose
+    value changes, so repeating a command (the usual case while driving
+    forward) issues no GPIO operations at all.
+    Pins are claimed on first use, not at construction.
+    """
+
+    def __init__(self, wheels=WHEELS, create=None):
+        self.wheels = dict(wheels)
+        self.create = create or backends.create
+        self.lock = threading.Lock()
+        self.pins = None  # wheel -> (pwm, in1, in2) once claimed
+        self.state = {}  # wheel -> (in1, in2, pwm) last written; None = unknown
+
+        # GPIO operations issued and avoided
+        self.digital_writes = 0
+        self.pwm_writes = 0
+        self.skipped = 0
+
+    def init(self):
+        """Claim the motor driver pins. Safe to call multiple times."""
+        with self.lock:
+            if self.pins is not None:
+                return
+            self.pins = {wheel: (self.create('pwm_output', pwm),
+                                 self.create('digital_output', in1),
+                                 self.create('digital_output', in2))
+                         for wheel, (pwm, in1, in2, _) in self.wheels.items()}
+            self.state = dict.fromkeys(self.wheels, (None, None, None))
+
+    def set(self, wheel, direction, speed=1.0):
+        """Drive one wheel 'forward', 'backward' or anything else to coast."""
+        self.command({wheel: (direction, speed)})
+
+    def command(self, wheels):
+        """Apply {wheel: (direction, speed)}, writing only the pins that change."""
+        if self.pins is None:
+            self.init()
+        with self.lock:
+            for wheel, (direction, speed) in wheels.items():
+                self._apply(wheel, *self._pin_values(wheel, direction, speed))
+
+    def _pin_values(self, wheel, direction, speed):
+        polarity = self.wheels[wheel][3]
+        if direction == "forward":
+            in1 = 1 if polarity > 0 else 0
+        elif direction == "backward":
+            in1 = 0 if polarity > 0 else 1
+        else:   # coasting, if want sudden brake change to on() for both
+            return 0, 0, speed
+        return in1, 1 - in1, speed
+
+    def _apply(self, wheel, in1, in2, pwm):
+        pwm_pin, in1_pin, in2_pin = self.pins[wheel]
+        old_in1, old_in2, old_pwm = self.state[wheel]
+        writes = 0
+        # Switch off before on, so both inputs are never high together (brake)
+        for pin, value, old in sorted(((in1_pin, in1, old_in1), (in2_pin, in2, old_in2)),
+                                      key=lambda p: p[1]):
+            if value == old:
+                continue
+            if value:
+                pin.on()
+            else:
+                pin.off()
+            writes += 1
+        self.digital_writes += writes
+        if pwm != old_pwm:
+            pwm_pin.value = pwm
+            self.pwm_writes += 1
+            writes += 1
+        self.skipped += 3 - writes
+        self.state[wheel] = (in1, in2, pwm)
+
+    def invalidate(self):
+        """Forget the cached pin state, so the next command rewrites every pin."""
+        with self.lock:
+            self.state = dict.fromkeys(self.wheels, (None, None, None))
+
+    def stats(self):
+        return {'digital_writes': self.digital_writes, 'pwm_writes': self.pwm_writes,
+                'skipped': self.skipped}
+
+
+driver = MotorDriver()
+
+
+def init_motors():
+    """Claim the motor driver pins. Safe to call multiple times."""
+    driver.init()
 
 # -------------------------- Motor Defintions ---------------------------------- #
 
 def lf_motor(direction, speed = 1.0):
-    if direction == "forward":
-        lf_in1.on()
-        lf_in2.off()  # L298N specific, moves both left motors forward
-    elif direction == "backward":
-        lf_in1.off()
-        lf_in2.on()  
-    else:   # coasting, if want sudden brake change to on() for both
-        lf_in1.off()
-        lf_in2.off()
-    
-    lf_enable.value = speed
+    driver.set('lf', direction, speed)
 
 def lb_motor(direction, speed = 1.0):
-    if direction == "backward":
-        lb_in1.on()
-        lb_in2.off() 
-    elif direction == "forward":
-        lb_in1.off()
-        lb_in2.on()  
-    else:
-        lb_in1.off()
-        lb_in2.off()
-        
-    lb_enable.value = speed
+    driver.set('lb', direction, speed)
 
 def rf_motor(direction, speed = 1.0):
-    if direction == "backward":
-        rf_in1.on()
-        rf_in2.off()  # L298N specific, moves both left motors forward
-    elif direction == "forward":
-        rf_in1.off()
-        rf_in2.on()
-    else:   # coasting, if want sudden brake change to on() for both
-        rf_in1.off()
-        rf_in2.off()
-    
-    rf_enable.value = speed
+    driver.set('rf', direction, speed)
 
 def rb_motor(direction, speed = 1.0):
-    if direction == "forward":
-        rb_in1.on()
-        rb_in2.off() 
-    elif direction == "backward":
-        rb_in1.off()
-        rb_in2.on()  
-    else:
-        rb_in1.off()
-        rb_in2.off()
-    
-    rb_enable.value = speed
-
-# ------------------------- Movement Functions ---------------------------- # 
+    driver.set('rb', direction, speed)
+
+# ------------------------- Movement Functions ---------------------------- #
 def stop():
-    lf_motor("stop", 0)
-    lb_motor("stop", 0)
-    rf_motor("stop", 0)
-    rb_motor("stop", 0)
+    driver.command({wheel: ("stop", 0) for wheel in WHEELS})
 
 # change speed of motors here
 def forward(speed = 1.0):
-    lf_motor("forward", speed)
-    lb_motor("forward", speed)
-    rf_motor("forward", speed)
-    rb_motor("forward", speed)
+    driver.command({wheel: ("forward", speed) for wheel in WHEELS})
 
 def backward(speed = 1.0):
-    lf_motor("backward", speed)
-    lb_motor("backward", speed)
-    rf_motor("backward", speed)
-    rb_motor("backward", speed)
-    
+    driver.command({wheel: ("backward", speed) for wheel in WHEELS})
+
 # smooth turn, might change based on implementation
 def turn_left(speed = 1.0):
-    rf_motor("forward", speed* 0.3)
-    rb_motor("forward", speed* 0.3)
-    lf_motor("backward", speed * 0.3)
-    lb_motor("backward", speed * 0.3)
+    driver.command({'rf': ("forward", speed * 0.3), 'rb': ("forward", speed * 0.3),
+                    'lf': ("backward", speed * 0.3), 'lb': ("backward", speed * 0.3)})
 
 
 def turn_right(speed = 1.0):
-    lf_motor("forward", speed* 0.3)
-    lb_motor("forward", speed* 0.3)
-    rf_motor("backward", speed * 0.4)
-    rb_motor("backward", speed * 0.4)
+    driver.command({'lf': ("forward", speed * 0.3), 'lb': ("forward", speed * 0.3),
+                    'rf': ("backward", speed * 0.4), 'rb': ("backward", speed * 0.4)})
+
 # for more fine-tuned navgation, might not need this
-    def steer(speed_left, speed_right):
-        if speed_left > 0:
-            lf_motor("forward", speed_left)
-        elif speed_left < 0:
-            lf_motor("backward", speed_left)
+def steer(speed_left, speed_right):
+    """Signed speeds (-1..1) for the left and right sides."""
+    wheels = {}
+    for side, speed in (('l', speed_left), ('r', speed_right)):
+        if speed > 0:
+            direction = "forward"
+        elif speed < 0:
+            direction = "backward"
         else:
-            lf_motor("stop", 0)
-        
-        if speed_right > 0:
-            lb_motor("forward", speed_right)
-        elif speed_right < 0:
-            lb_motor("backward", speed_right)
-        else:
-            lb_motor("stop", 0)
-
+            direction = "stop"
+        wheels[side + 'f'] = wheels[side + 'b'] = (direction, abs(speed))
+    driver.command(wheels)
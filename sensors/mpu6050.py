@@ -1,5 +1,4 @@
 #IMU Orientation 
-import smbus
 import time
 
 class mpu6050:
@@ -49,11 +48,20 @@ class mpu6050:
     GYRO_CONFIG = 0x1B
 
     def __init__(self, address, bus=1):
+        """bus: I2C bus number, or a bus object such as i2cbus.I2CBus"""
+        if isinstance(bus, int):
+            import smbus  # imported here so importing this module needs no I2C
+            bus = smbus.SMBus(bus)
         self.address = address
-        self.bus = smbus.SMBus(bus)
+        self.bus = bus
         # Wake up the MPU-6050 since it starts in sleep mode
         self.bus.write_byte_data(self.address, self.PWR_MGMT_1, 0x00)
 
+        # Range registers only change through set_*_range; cache them so a
+        # data read is a single burst instead of six byte reads plus one
+        self._accel_range = None
+        self._gyro_range = None
+
     # I2C communication methods
 
     def read_i2c_word(self, register):
@@ -68,15 +76,26 @@ class mpu6050:
         else:
             return value
 
+    def read_i2c_words(self, register, count):
+        """count consecutive signed words in one block read (one transaction)"""
+        data = self.bus.read_i2c_block_data(self.address, register, 2 * count)
+        words = []
+        for i in range(0, 2 * count, 2):
+            value = (data[i] << 8) + data[i + 1]
+            words.append(value - 0x10000 if value >= 0x8000 else value)
+        return words
+
     def set_accel_range(self, accel_range):
         # First change it to 0x00 to make sure we write the correct value later
         self.bus.write_byte_data(self.address, self.ACCEL_CONFIG, 0x00)
 
         # Write the new range to the ACCEL_CONFIG register
         self.bus.write_byte_data(self.address, self.ACCEL_CONFIG, accel_range)
+        self._accel_range = accel_range
 
     def read_accel_range(self, raw = False):
         raw_data = self.bus.read_byte_data(self.address, self.ACCEL_CONFIG)
+        self._accel_range = raw_data
 
         if raw is True:
             return raw_data
@@ -93,12 +112,12 @@ class mpu6050:
                 return -1
 
     def get_accel_data(self, g = False):
-        x = self.read_i2c_word(self.ACCEL_XOUT0)
-        y = self.read_i2c_word(self.ACCEL_YOUT0)
-        z = self.read_i2c_word(self.ACCEL_ZOUT0)
+        x, y, z = self.read_i2c_words(self.ACCEL_XOUT0, 3)
 
         accel_scale_modifier = None
-        accel_range = self.read_accel_range(True)
+        accel_range = self._accel_range
+        if accel_range is None:
+            accel_range = self.read_accel_range(True)
 
         if accel_range == self.ACCEL_RANGE_2G:
             accel_scale_modifier = self.ACCEL_SCALE_MODIFIER_2G
@@ -130,9 +149,11 @@ class mpu6050:
 
         # Write the new range to the ACCEL_CONFIG register
         self.bus.write_byte_data(self.address, self.GYRO_CONFIG, gyro_range)
+        self._gyro_range = gyro_range
 
     def read_gyro_range(self, raw = False):
         raw_data = self.bus.read_byte_data(self.address, self.GYRO_CONFIG)
+        self._gyro_range = raw_data
 
         if raw is True:
             return raw_data
@@ -150,30 +171,12 @@ class mpu6050:
                 return -1
 
     def get_gyro_data(self):
-        x = self.read_i2c_word(self.GYRO_XOUT0)
-        y = self.read_i2c_word(self.GYRO_YOUT0)
-        z = self.read_i2c_word(self.GYRO_ZOUT0)
-
-        gyro_scale_modifier = None
-        gyro_range = self.read_gyro_range(True)
-
-        if gyro_range == self.GYRO_RANGE_250DEG:
-            gyro_scale_modifier = self.GYRO_SCALE_MODIFIER_250DEG
-        elif gyro_range == self.GYRO_RANGE_500DEG:
-            gyro_scale_modifier = self.GYRO_SCALE_MODIFIER_500DEG
-        elif gyro_range == self.GYRO_RANGE_1000DEG:
-            gyro_scale_modifier = self.GYRO_SCALE_MODIFIER_1000DEG
-        elif gyro_range == self.GYRO_RANGE_2000DEG:
-            gyro_scale_modifier = self.GYRO_SCALE_MODIFIER_2000DEG
-        else:
-            gyro_scale_modifier = self.GYRO_SCALE_MODIFIER_250DEG
-
-        x = x / gyro_scale_modifier
-        y = y / gyro_scale_modifier
-        z = self.read_i2c_word(self.GYRO_ZOUT0)
+        x, y, z = self.read_i2c_words(self.GYRO_XOUT0, 3)
 
         gyro_scale_modifier = None
-        gyro_range = self.read_gyro_range(True)
+        gyro_range = self._gyro_range
+        if gyro_range is None:
+            gyro_range = self.read_gyro_range(True)
 
         if gyro_range == self.GYRO_RANGE_250DEG:
             gyro_scale_modifier = self.GYRO_SCALE_MODIFIER_250DEG
@@ -199,9 +202,9 @@ class mpu6050:
 
         return [accel, gyro, temp]
 
-mpu = mpu6050(0x68)
-
 if __name__ == "__main__":
+    mpu = mpu6050(0x68)
+
     while (1):
         try:
            accel_data = mpu.get_accel_data()
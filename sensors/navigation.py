@@ -4,8 +4,10 @@ Core navigation using IMU double integration with magnetometer drift compensatio
 Implements relative positioning between GPS waypoints.
 """
 import time
+import collections
 import config
-from imu import get_accel
+import clock
+from imu import get_accel_sample
 from magnetometer import get_heading_basic
 from coordinate_transform import (
     body_to_earth_frame, 
@@ -26,12 +28,16 @@ class Navigator:
         self.dest_x = None
         self.dest_y = None
         
-        # Timing
+        # Timing (clock.monotonic() acquisition time of the last integrated sample)
         self.last_update_time = None
         self.dt = 1.0 / config.IMU_FREQUENCY
         
+        # Recent dead-reckoned positions (t, x, y), for delayed GPS fixes
+        self.history = collections.deque(
+            maxlen=int(config.NAV_HISTORY * config.IMU_FREQUENCY) + 1)
+        
         # GPS resync tracking
-        self.last_gps_sync = time.time()
+        self.last_gps_sync = clock.monotonic()
         
         print(f"Navigator initialized (IMU freq: {config.IMU_FREQUENCY}Hz)")
     
@@ -51,27 +57,72 @@ class Navigator:
         self.y = y
         self.vx = 0.0
         self.vy = 0.0
-        self.last_gps_sync = time.time()
-        print(f"Position reset: ({x:.2f}, {y:.2f})")
+        self.history.clear()  # a new frame; older positions don't apply
+        self.last_gps_sync = clock.monotonic()
+        if config.DEBUG_PRINT_NAVIGATION:
+            print(f"Position reset: ({x:.2f}, {y:.2f})")
+    
+    def apply_fix(self, x, y, t=None):
+        """
+        Reset to a GPS fix measured at clock.monotonic() time t, carried
+        forward to the present by the motion dead-reckoned since t. Fixes
+        older than the history are carried from its oldest entry; without
+        t this is reset_position().
+        """
+        if t is None or not self.history:
+            self.reset_position(x, y)
+            return
+        then = self.history[0]
+        for entry in reversed(self.history):
+            if entry[0] <= t:
+                then = entry
+                break
+        x += self.x - then[1]
+        y += self.y - then[2]
+        
+        # Shift the history into the corrected frame for the next fix
+        cx, cy = x - self.x, y - self.y
+        self.history = collections.deque(((ht, hx + cx, hy + cy)
+                                          for ht, hx, hy in self.history),
+                                         maxlen=self.history.maxlen)
+        self.x = x
+        self.y = y
+        self.vx = 0.0
+        self.vy = 0.0
+        self.last_gps_sync = clock.monotonic()
+        if config.DEBUG_PRINT_NAVIGATION:
+            print(f"Position reset: ({x:.2f}, {y:.2f}), fix carried {cx:+.2f},{cy:+.2f}m")
     
-    def update_position(self):
+    def update_position(self, accel=None, heading=None, t=None):
         """
         Main navigation update - double integrate IMU acceleration.
         Call this at IMU_FREQUENCY Hz.
+        accel/heading: already-read samples (ax, ay, az) and degrees;
+        the sensors are read here when they are not given.
+        t: clock.monotonic() acquisition time of accel; dt is measured
+        between sample times, so read latency and wall-clock jumps don't
+        enter the integration, and a repeated sample adds nothing.
         """
-        # Get current time
-        current_time = time.time()
+        # Read sensors
+        if accel is None:
+            t, accel = get_accel_sample()
+        elif t is None:
+            t = clock.monotonic()
+        if heading is None:
+            heading = get_heading_basic()
+        
         if self.last_update_time is None:
-            self.last_update_time = current_time
+            self.last_update_time = t
+            self.history.append((t, self.x, self.y))
             return
         
-        # Calculate actual dt (in case loop timing varies)
-        dt = current_time - self.last_update_time
-        self.last_update_time = current_time
-        
-        # Read sensors
-        ax_body, ay_body, az_body = get_accel()
-        heading = get_heading_basic()
+        # Time between samples (in case loop timing varies)
+        dt = t - self.last_update_time
+        if dt > 0:
+            self.last_update_time = t
+        else:
+            dt = 0.0  # same (or older) sample as last time
+        ax_body, ay_body, az_body = accel
         
         # Remove gravity from z-axis and apply calibration offsets
         az_body -= 9
@@ -82,13 +133,15 @@ class Navigator:
         ax_earth, ay_earth = body_to_earth_frame(ax_body, ay_body, heading)
         
         # Double integration: accel -> velocity -> position
-        # Velocity update with decay (simulates friction/drag)
-        self.vx = self.vx * config.VELOCITY_DECAY_FACTOR + ax_earth * dt
-        self.vy = self.vy * config.VELOCITY_DECAY_FACTOR + ay_earth * dt
-        
-        # Position update
-        self.x += self.vx * dt
-        self.y += self.vy * dt
+        if dt > 0:
+            # Velocity update with decay (simulates friction/drag)
+            self.vx = self.vx * config.VELOCITY_DECAY_FACTOR + ax_earth * dt
+            self.vy = self.vy * config.VELOCITY_DECAY_FACTOR + ay_earth * dt
+            
+            # Position update
+            self.x += self.vx * dt
+            self.y += self.vy * dt
+            self.history.append((t, self.x, self.y))
         
         # Return state for logging
         return {
@@ -116,9 +169,10 @@ class Navigator:
             return None
         return bearing_to_point(self.x, self.y, self.dest_x, self.dest_y)
     
-    def get_heading_error(self):
+    def get_heading_error(self, current_heading=None):
         """
         Calculate heading error (how much to turn).
+        current_heading: latest heading in degrees (read from magnetometer if None)
         Returns: degrees to turn (-180 to +180)
             Positive = need to turn right
             Negative = need to turn left
@@ -127,9 +181,8 @@ class Navigator:
         if target_bearing is None:
             return 0.0
         
-        current_heading = get_heading_basic()
-        target_angle = angle_difference(target_bearing, current_heading)
-        print(target_angle)
+        if current_heading is None:
+            current_heading = get_heading_basic()
         return angle_difference(target_bearing, current_heading)
     
     def has_reached_destination(self):
@@ -139,10 +192,10 @@ class Navigator:
     
     def should_resync_gps(self):
         """Check if GPS resync is needed (time-based or drift threshold)."""
-        time_since_sync = time.time() - self.last_gps_sync
+        time_since_sync = clock.monotonic() - self.last_gps_sync
         return time_since_sync > config.GPS_UPDATE_INTERVAL
     
-    def get_navigation_command(self):
+    def get_navigation_command(self, current_heading=None):
         """
         High-level navigation decision.
         Returns: ('forward'|'turn_left'|'turn_right'|'stop', speed)
@@ -150,7 +203,7 @@ class Navigator:
         if self.has_reached_destination():
             return 'stop', 0.0
         
-        heading_error = self.get_heading_error()
+        heading_error = self.get_heading_error(current_heading)
         
         # If heading is way off, turn in place
         if abs(heading_error) > config.HEADING_TOLERANCE:
@@ -0,0 +1,224 @@
+# recorder.py
+"""
+Full-rate raw sensor recording.
+Wraps every IMU, magnetometer and GPS driver created through backends,
+so each reading the drivers return (before any bias correction or
+heading math) is stored with its clock.monotonic() acquisition time.
+replay.py feeds a recording back through the unchanged control code.
+
+Enable with RECORD_RAW = True in config.py (RoverController starts it),
+or call start() before the sensors are initialized.
+
+File layout:
+    MAGIC | header length (uint32) | header JSON | records...
+    record: kind (uint8), time (float64), 4 values (float64)
+Unused values are NaN. A record cut short by a crash is ignored.
+"""
+import json
+import math
+import struct
+import threading
+import clock
+import config
+import backends
+
+MAGIC = b'RVRRAW\x00\x01'
+VERSION = 1
+RECORD = struct.Struct('<Bd4d')
+
+# kind code -> (name, value names)
+KINDS = {
+    0: ('imu', ('ax', 'ay', 'az', 'g')),  # as returned; g = 1 if asked for g units
+    1: ('gyro', ('gx', 'gy', 'gz', '')),
+    2: ('mag', ('mx', 'my', 'mz', '')),
+    3: ('gps', ('lat', 'lon', 'mode', 'accuracy')),
+    4: ('dest', ('x', 'y', '', '')),  # destination set on the controller
+}
+CODES = {name: code for code, (name, _) in KINDS.items()}
+
+# Config values the recording was made with, for replay to restore
+RECORDED_CONFIG = ('ACCEL_BIAS_X', 'ACCEL_BIAS_Y', 'ACCEL_BIAS_Z',
+                   'VELOCITY_DECAY_FACTOR', 'HEADING_TOLERANCE',
+                   'GPS_UPDATE_INTERVAL', 'IMU_FREQUENCY', 'BASE_SPEED',
+                   'TURN_SPEED')
+
+FLUSH_INTERVAL = 1.0  # seconds of recording between file flushes
+
+NAN = math.nan
+_active = None  # Recorder while recording
+_forward = None  # where mark() sends events while another process records
+
+
+class Recorder:
+    def __init__(self, filename):
+        self.filename = filename
+        self.records = 0
+        self.lock = threading.Lock()
+        self.last_flush = clock.monotonic()
+
+        header = json.dumps({
+            'version': VERSION,
+            'start_time': clock.time(),
+            'start_monotonic': self.last_flush,
+            'backend': backends.get_backend(),
+            'kinds': {code: [name, list(values)] for code, (name, values) in KINDS.items()},
+            'config': {name: getattr(config, name) for name in RECORDED_CONFIG},
+        }).encode()
+        self._file = open(filename, 'wb')
+        self._file.write(MAGIC + struct.pack('<I', len(header)) + header)
+
+    def record(self, kind, a=NAN, b=NAN, c=NAN, d=NAN):
+        """Store one reading of kind, stamped now."""
+        t = clock.monotonic()
+        data = RECORD.pack(CODES[kind], t, a, b, c, d)
+        with self.lock:
+            if self._file is None:
+                return
+            self._file.write(data)
+            self.records += 1
+            if t - self.last_flush >= FLUSH_INTERVAL:
+                self._file.flush()
+                self.last_flush = t
+
+    def wrap(self, kind, device):
+        """backends wrapper: record what the sensor drivers return."""
+        if kind == 'imu':
+            return _RecordingIMU(device, self)
+        if kind == 'mag':
+            return _RecordingMag(device, self)
+        if kind == 'gps':
+            return _RecordingGPS(device, self)
+        return device
+
+    def close(self):
+        with self.lock:
+            if self._file is not None:
+                self._file.close()
+                self._file = None
+
+
+class _Proxy:
+    def __init__(self, device, recorder):
+        self._device = device
+        self._recorder = recorder
+
+    def __getattr__(self, name):
+        return getattr(self._device, name)
+
+
+class _RecordingIMU(_Proxy):
+    def get_accel_data(self, g=False):
+        data = self._device.get_accel_data(g)
+        self._recorder.record('imu', data['x'], data['y'], data['z'], 1.0 if g else 0.0)
+        return data
+
+    def get_gyro_data(self):
+        data = self._device.get_gyro_data()
+        self._recorder.record('gyro', data['x'], data['y'], data['z'])
+        return data
+
+
+class _RecordingMag(_Proxy):
+    def read_mag_data(self):
+        data = self._device.read_mag_data()
+        self._recorder.record('mag', *data[:3])
+        return data
+
+
+class _RecordingGPS(_Proxy):
+    def get_current(self):
+        packet = self._device.get_current()
+        try:
+            accuracy = packet.position_precision()[0]
+        except Exception:
+            accuracy = NAN
+        self._recorder.record('gps', packet.lat, packet.lon, packet.mode, accuracy)
+        return packet
+
+
+def start(filename=None):
+    """Record every sensor driver created from now on. Returns the Recorder."""
+    global _active
+    if _active is not None:
+        return _active
+    _active = Recorder(filename or config.RECORD_FILE)
+    backends.add_wrapper(_active.wrap)
+    print(f"Recording raw sensor data: {_active.filename}")
+    return _active
+
+
+def stop():
+    """Stop recording and close the file. Safe to call when not recording."""
+    global _active
+    if _active is None:
+        return
+    backends.remove_wrapper(_active.wrap)
+    _active.close()
+    print(f"Raw recording closed: {_active.records} readings")
+    _active = None
+
+
+def start_in_child(filename):
+    """SensorProcess setup: record in the acquisition process, stop at exit."""
+    start(filename)
+    return stop
+
+
+def forward_marks(send):
+    """
+    While this process isn't recording, pass mark() events to
+    send(kind, *values) instead, e.g. SensorProcess.mark when the sensor
+    process records. None stops forwarding.
+    """
+    global _forward
+    _forward = send
+
+
+def mark(kind, *values):
+    """Record a non-sensor event (e.g. 'dest') if recording."""
+    if _active is not None:
+        _active.record(kind, *values)
+    elif _forward is not None:
+        _forward(kind, *values)
+
+
+def read_header(f):
+    """Return (header dict, offset of the first record) for an open recording."""
+    if f.read(len(MAGIC)) != MAGIC:
+        raise ValueError(f"{f.name}: not a raw sensor recording")
+    (length,) = struct.unpack('<I', f.read(4))
+    header = json.loads(f.read(length))
+    if header['version'] != VERSION:
+        raise ValueError(f"{f.name}: recording version {header['version']}, "
+                         f"reader supports {VERSION}")
+    return header, len(MAGIC) + 4 + length
+
+
+def load(filename):
+    """
+    Read a recording. Returns (header, {kind: [(t, (a, b, c, d)), ...]})
+    with each kind's readings in time order.
+    """
+    with open(filename, 'rb') as f:
+        header, _ = read_header(f)
+        data = f.read()
+    streams = {name: [] for name, _ in KINDS.values()}
+    whole = len(data) - len(data) % RECORD.size
+    for code, t, a, b, c, d in RECORD.iter_unpack(memoryview(data)[:whole]):
+        streams[KINDS[code][0]].append((t, (a, b, c, d)))
+    for readings in streams.values():
+        readings.sort(key=lambda r: r[0])  # threads may interleave writes
+    return header, streams
+
+
+if __name__ == "__main__":
+    import sys
+
+    header, streams = load(sys.argv[1])
+    duration = max((r[-1][0] for r in streams.values() if r), default=0.0) \
+        - header['start_monotonic']
+    print(f"{sys.argv[1]}: backend '{header['backend']}', {duration:.1f}s")
+    for name, readings in streams.items():
+        if readings:
+            print(f"  {name:<5} {len(readings):7d} readings "
+                  f"({len(readings) / max(duration, 1e-9):.1f}/s)")
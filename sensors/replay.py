@@ -0,0 +1,266 @@
+# replay.py
+"""
+Deterministic replay of raw sensor recordings (see recorder.py).
+RoverController runs unchanged on the 'replay' backend: every driver read
+returns the next recorded reading of that device, and time only advances
+when the control loop sleeps. A run
+replays as fast as the CPU allows and gives the same result every time,
+so navigation changes can be regression-tested on real field data.
+
+Replay starts at the recorded reference fix and is open loop: motor
+commands don't change what was recorded. It checks estimation and
+decision logic against real data; once a change makes the rover drive
+differently, use simulate.py for closed-loop behaviour.
+Usage:
+    python3 replay.py rover_raw.rec
+    python3 replay.py rover_raw.rec --set VELOCITY_DECAY_FACTOR=0.95 --trajectory out.csv
+    python3 replay.py rover_raw.rec --check    # replay twice, compare
+"""
+import os
+import ast
+import csv
+import math
+import time
+import bisect
+import hashlib
+import argparse
+import contextlib
+import clock
+import config
+import backends
+import recorder
+
+source = None  # ReplaySource being played back
+
+MAX_READ_LATENCY = 0.1  # seconds - a reading stamped up to this far ahead was being read
+
+
+class ReplaySource:
+    """Recorded readings per kind, played back in recorded order."""
+
+    def __init__(self, streams):
+        self.times = {kind: [t for t, _ in readings] for kind, readings in streams.items()}
+        self.values = {kind: [v for _, v in readings] for kind, readings in streams.items()}
+        self.reads = dict.fromkeys(streams, 0)
+        self.next = dict.fromkeys(streams, 0)  # kind -> index of the next reading
+
+    def sample(self, kind):
+        """
+        Next reading of kind. Readings are stamped when the read returned,
+        after the tick that asked for them started, so the latest reading
+        at or before now is the previous one; only readings the replay
+        didn't ask for (stamped before now) are skipped. The clock then
+        advances to the stamp, as the recorded read took that long. The
+        last reading repeats once the recording runs out.
+        """
+        times = self.times[kind]
+        if not times:
+            return None
+        self.reads[kind] += 1
+        i = max(self.next[kind], bisect.bisect_right(times, clock.monotonic()) - 1)
+        i = min(i, len(times) - 1)
+        self.next[kind] = i + 1
+        latency = times[i] - clock.monotonic()
+        if 0 < latency <= MAX_READ_LATENCY:
+            clock.sleep(latency)
+        return self.values[kind][i]
+
+    def first_fix_time(self):
+        """Time of the first recorded GPS reading with a fix."""
+        for t, (lat, lon, mode, _) in zip(self.times['gps'], self.values['gps']):
+            if mode >= 2 and not math.isnan(lat) and not math.isnan(lon):
+                return t
+        return None
+
+    def end_time(self):
+        return max((times[-1] for times in self.times.values() if times), default=0.0)
+
+
+# ------------------------------ Drivers ------------------------------ #
+class ReplayIMU:
+    GRAVITIY_MS2 = 9.80665
+
+    def __init__(self, address=0x68):
+        self.address = address
+
+    def get_accel_data(self, g=False):
+        x, y, z, in_g = source.sample('imu')
+        scale = 1.0
+        if in_g and not g:
+            scale = self.GRAVITIY_MS2
+        elif g and not in_g:
+            scale = 1.0 / self.GRAVITIY_MS2
+        return {'x': x * scale, 'y': y * scale, 'z': z * scale}
+
+    def get_gyro_data(self):
+        reading = source.sample('gyro')
+        if reading is None:
+            return {'x': 0.0, 'y': 0.0, 'z': 0.0}  # gyro wasn't read in the recorded run
+        return {'x': reading[0], 'y': reading[1], 'z': reading[2]}
+
+
+class ReplayMagnetometer:
+    def read_mag_data(self):
+        return list(source.sample('mag')[:3])
+
+
+class _Packet:
+    """Subset of a gpsd-py3 response."""
+
+    def __init__(self, lat, lon, mode, accuracy):
+        self.lat = lat
+        self.lon = lon
+        self.mode = int(mode)
+        self.accuracy = accuracy
+
+    def position_precision(self):
+        if math.isnan(self.accuracy):
+            raise ValueError("no error estimate recorded")
+        return self.accuracy, math.nan
+
+
+class ReplayGPS:
+    def connect(self, *args, **kwargs):
+        pass
+
+    def get_current(self):
+        reading = source.sample('gps')
+        if reading is None:
+            return _Packet(math.nan, math.nan, 1, math.nan)
+        return _Packet(*reading)
+
+
+class ReplayOutput:
+    """Motor pins: commands are accepted and ignored (open loop)."""
+
+    def __init__(self, pin):
+        self.pin = pin
+        self.value = 0
+
+    def on(self):
+        self.value = 1
+
+    def off(self):
+        self.value = 0
+
+
+backends.register('replay', 'imu', ReplayIMU)
+backends.register('replay', 'mag', ReplayMagnetometer)
+backends.register('replay', 'gps', ReplayGPS)
+backends.register('replay', 'pwm_output', ReplayOutput)
+backends.register('replay', 'digital_output', ReplayOutput)
+
+
+# ------------------------------ Runner ------------------------------ #
+def replay(filename, dest=None, overrides=None):
+    """
+    Replay a recording through RoverController.
+    dest: (x, y) destination; default is the one set in the recorded run.
+    overrides: {config name: value} on top of the recorded config.
+    Returns a dict with the per-tick trajectory [(t, x, y, heading)],
+    its digest, and timing.
+    """
+    global source
+    header, streams = recorder.load(filename)
+    source = ReplaySource(streams)
+    start = source.first_fix_time()
+    if start is None:
+        raise ValueError(f"{filename}: no GPS fix recorded, nothing to use as reference")
+    end = source.end_time()
+    if dest is None:
+        if not streams['dest']:
+            raise ValueError(f"{filename}: no destination recorded; pass one")
+        dest = streams['dest'][-1][1][:2]
+
+    settings = dict(header['config'])
+    settings.update(LOG_ENABLED=False, WARM_START_ENABLED=False, RECORD_RAW=False,
+                    DEBUG_PRINT_NAVIGATION=False, TIMING_ENABLED=False)
+    settings.update(overrides or {})
+    saved = {name: getattr(config, name) for name in settings}
+
+    # Wall-clock time continues from the recording's
+    virtual = clock.VirtualClock(start=start,
+                                 epoch=header['start_time'] - header['start_monotonic'])
+    from main import RoverController
+
+    trajectory = []
+    wall_start = time.perf_counter()
+    with open(os.devnull, 'w') as devnull, contextlib.redirect_stdout(devnull):
+        try:
+            for name, value in settings.items():
+                setattr(config, name, value)
+            backends.set_backend('replay')
+            clock.set_clock(virtual)
+
+            rover = RoverController(use_sensor_process=False)
+            rover.set_destination_xy(*dest)
+            rover.running = True
+            loop_time = 1.0 / config.IMU_FREQUENCY
+            while (rover.running and not rover.nav.has_reached_destination()
+                   and clock.monotonic() < end):
+                tick = clock.monotonic()
+                rover.control_loop()
+                trajectory.append((clock.monotonic() - start, rover.nav.x,
+                                   rover.nav.y, rover.last_heading))
+                clock.sleep(loop_time - (clock.monotonic() - tick))  # paced like run()
+            rover.shutdown()
+        finally:
+            clock.set_clock(None)
+            backends.set_backend(None)
+            for name, value in saved.items():
+                setattr(config, name, value)
+    wall_time = time.perf_counter() - wall_start
+
+    digest = hashlib.sha1(repr([tuple(round(v, 6) for v in step)
+                                for step in trajectory]).encode()).hexdigest()
+    return {
+        'trajectory': trajectory,
+        'digest': digest,
+        'reached': rover.nav.has_reached_destination(),
+        'final': (rover.nav.x, rover.nav.y),
+        'replayed': virtual.monotonic() - start,
+        'wall_time': wall_time,
+        'speedup': (virtual.monotonic() - start) / wall_time,
+        'reads': dict(source.reads),
+    }
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Replay a raw sensor recording")
+    parser.add_argument('recording')
+    parser.add_argument('--dest', nargs=2, type=float, metavar=('X', 'Y'),
+                        help="destination (default: the recorded one)")
+    parser.add_argument('--set', action='append', default=[], metavar='NAME=VALUE',
+                        help="override a config value for the replay")
+    parser.add_argument('--trajectory', metavar='FILE', help="write the per-tick path as CSV")
+    parser.add_argument('--check', action='store_true', help="replay twice and compare")
+    args = parser.parse_args()
+
+    overrides = {}
+    for text in args.set:
+        name, _, value = text.partition('=')
+        try:
+            overrides[name] = ast.literal_eval(value)
+        except (ValueError, SyntaxError):
+            overrides[name] = value
+
+    result = replay(args.recording, dest=args.dest, overrides=overrides)
+    x, y = result['final']
+    print(f"Replayed {result['replayed']:.1f}s in {result['wall_time']:.2f}s "
+          f"({result['speedup']:.0f}x real time), {len(result['trajectory'])} ticks")
+    print(f"Final estimate: ({x:.2f}, {y:.2f}), "
+          f"{'reached' if result['reached'] else 'not reached'}")
+    print(f"Trajectory digest: {result['digest']}")
+
+    if args.trajectory:
+        with open(args.trajectory, 'w', newline='') as f:
+            writer = csv.writer(f)
+            writer.writerow(['t', 'x', 'y', 'heading'])
+            writer.writerows(result['trajectory'])
+        print(f"Wrote {args.trajectory}")
+
+    if args.check:
+        again = replay(args.recording, dest=args.dest, overrides=overrides)
+        if again['digest'] != result['digest']:
+            raise SystemExit("Replay is NOT deterministic: digests differ")
+        print("Deterministic: second replay matches")
@@ -0,0 +1,311 @@
+# sensor_process.py
+"""
+Sensor acquisition in a dedicated child process.
+IMU, magnetometer and GPS are sampled on their own schedule in a separate
+interpreter, so navigation/logging work can't delay sampling through the
+GIL. Samples are published into shared-memory ring buffers that the
+controller reads in place (no pipes, no pickling).
+"""
+import time
+import multiprocessing as mp
+from multiprocessing import shared_memory
+import config
+import backends
+import recorder
+
+# Channel name -> fields stored per sample (after its acquisition time)
+CHANNELS = {
+    'imu': ('ax', 'ay', 'az'),
+    'mag': ('heading',),
+    'gps': ('lat', 'lon', 'accuracy'),  # accuracy NaN when unknown
+}
+
+# Ring header: [samples written, heartbeat (time.monotonic)]
+HEADER_WORDS = 2
+
+# An I2C device due this soon is read early, back-to-back with one that is
+# already due, so the IMU and magnetometer share one bus hold
+I2C_GROUP_WINDOW = 0.002  # seconds
+
+
+class SensorProcessError(RuntimeError):
+    """Acquisition process failed to start, exited or stopped responding."""
+
+
+class RingBuffer:
+    """
+    Fixed-size ring of float64 samples over any writable buffer.
+    One writer, any number of readers. Each slot stores the sequence
+    number it holds; readers check it before and after copying so a slot
+    overwritten mid-read is detected instead of returned torn.
+    """
+
+    def __init__(self, buf, nfields, capacity):
+        self.nfields = nfields
+        self.capacity = capacity
+        self.slot_words = nfields + 2  # seq, t, fields...
+        self.words = memoryview(buf).cast('d')
+
+    @staticmethod
+    def size(nfields, capacity):
+        """Bytes needed for a ring of this shape."""
+        return 8 * (HEADER_WORDS + capacity * (nfields + 2))
+
+    @property
+    def count(self):
+        """Total samples written so far."""
+        return int(self.words[0])
+
+    @property
+    def heartbeat(self):
+        return self.words[1]
+
+    def beat(self):
+        self.words[1] = time.monotonic()
+
+    def write(self, t, values):
+        w = self.words
+        seq = int(w[0])
+        base = HEADER_WORDS + (seq % self.capacity) * self.slot_words
+
+        w[base] = -1.0  # slot is being rewritten
+        w[base + 1] = t
+        for i, value in enumerate(values):
+            w[base + 2 + i] = value
+        w[base] = seq
+        w[0] = seq + 1
+
+    def read(self, seq):
+        """Sample seq as (t, values), or None if it was overwritten."""
+        w = self.words
+        base = HEADER_WORDS + (seq % self.capacity) * self.slot_words
+        if w[base] != seq:
+            return None
+        t = w[base + 1]
+        values = tuple(w[base + 2:base + 2 + self.nfields].tolist())
+        if w[base] != seq:
+            return None
+        return t, values
+
+    def latest(self):
+        """Newest sample as (t, values), or None if nothing written yet."""
+        while True:
+            count = self.count
+            if count == 0:
+                return None
+            sample = self.read(count - 1)
+            if sample is not None:
+                return sample
+
+    def since(self, seq):
+        """All samples from seq onward still held in the ring, oldest first."""
+        count = self.count
+        seq = max(seq, count - self.capacity)
+        samples = []
+        for s in range(seq, count):
+            sample = self.read(s)
+            if sample is not None:
+                samples.append(sample)
+        return samples
+
+    def release(self):
+        self.words.release()
+
+
+def _read_gps():
+    from gpsmanager import get_fix_sample
+    t, (lat, lon, accuracy) = get_fix_sample()
+    if lat is None or lon is None:
+        return None
+    return t, (lat, lon, accuracy if accuracy is not None else float('nan'))
+
+
+def _read_heading():
+    from magnetometer import get_heading_sample
+    t, heading = get_heading_sample()
+    return t, (heading,)
+
+
+def _record_marks(marks):
+    while marks is not None and not marks.empty():
+        kind, values = marks.get()
+        recorder.mark(kind, *values)
+
+
+def acquire(rings, stop, ready, marks=None):
+    """
+    Sampling loop: read each sensor when it is due and publish it.
+    Runs in the child process (or a thread, for comparison benchmarks).
+    marks: optional queue of (kind, values) events from the controller,
+    passed to recorder.mark() (see SensorProcess.mark).
+    """
+    from imu import init_imu, get_accel_sample
+    from magnetometer import init_mag
+    from gpsmanager import init_gps
+    from i2cbus import get_bus
+
+    init_imu()
+    init_mag()
+    init_gps()
+
+    # (ring, read, period, on the I2C bus)
+    schedule = [
+        (rings['imu'], get_accel_sample, 1.0 / config.IMU_FREQUENCY, True),
+        (rings['mag'], _read_heading, 1.0 / config.MAG_HEADING_UPDATE, True),
+        (rings['gps'], _read_gps, 1.0 / config.GPS_POLL_FREQUENCY, False),
+    ]
+    next_due = [time.monotonic()] * len(schedule)
+    bus = get_bus()
+
+    def take(i, now):
+        ring, read, period, _ = schedule[i]
+        try:
+            sample = read()  # (acquisition time, values)
+            if sample is not None:
+                ring.write(*sample)
+        except Exception as e:
+            print(f"Sensor read error: {e}")
+
+        next_due[i] += period
+        if next_due[i] < now:  # fell behind, don't burst to catch up
+            next_due[i] = now + period
+
+    while not stop.is_set():
+        _record_marks(marks)
+        now = time.monotonic()
+        # I2C devices due within I2C_GROUP_WINDOW are read back-to-back in
+        # one bus hold; nothing else gets onto the bus between them
+        group = [i for i, entry in enumerate(schedule)
+                 if entry[3] and next_due[i] - now <= I2C_GROUP_WINDOW]
+        if any(next_due[i] <= now for i in group):
+            with bus.transaction():
+                for i in group:
+                    take(i, now)
+
+        for i, entry in enumerate(schedule):
+            now = time.monotonic()
+            if entry[3] or now < next_due[i]:
+                continue
+            take(i, now)
+
+        for ring in rings.values():
+            ring.beat()
+        if not ready.is_set() and rings['imu'].count and rings['mag'].count:
+            ready.set()
+
+        time.sleep(max(0.0, min(next_due) - time.monotonic()))
+    _record_marks(marks)  # sent just before stop
+
+
+def _child_main(shm_names, capacity, stop, ready, marks, backend, setup):
+    """Entry point of the acquisition process."""
+    backends.set_backend(backend)  # same drivers as the parent
+    cleanup = setup() if setup is not None else None
+
+    shms, rings = [], {}
+    for name, shm_name in shm_names.items():
+        # Spawned children share the parent's resource tracker, and the
+        # parent unlinks the blocks, so attaching needs no extra cleanup
+        shm = shared_memory.SharedMemory(name=shm_name)
+        shms.append(shm)
+        rings[name] = RingBuffer(shm.buf, len(CHANNELS[name]), capacity)
+
+    try:
+        acquire(rings, stop, ready, marks)
+    except KeyboardInterrupt:
+        pass  # parent handles Ctrl+C and shuts us down
+    finally:
+        for ring in rings.values():
+            ring.release()
+        for shm in shms:
+            shm.close()
+        if cleanup is not None:
+            cleanup()
+
+
+class SensorProcess:
+    """
+    Owns the acquisition process and its shared-memory rings.
+    The child uses the parent's hardware backend.
+    setup: optional picklable function run in the child before the
+    sensors are initialized; if it returns a function, that runs when
+    the child exits.
+    """
+
+    def __init__(self, setup=None, capacity=None):
+        self.setup = setup
+        self.capacity = capacity or config.SENSOR_RING_CAPACITY
+        self.rings = {}
+        self._shms = []
+        self._proc = None
+        self._stop = None
+        self._marks = None
+
+    def start(self, timeout=None):
+        """Start acquisition and wait for the first IMU and mag samples."""
+        if timeout is None:
+            timeout = config.SENSOR_PROCESS_START_TIMEOUT
+
+        ctx = mp.get_context('spawn')  # child opens its own bus handles
+        shm_names = {}
+        for name, fields in CHANNELS.items():
+            shm = shared_memory.SharedMemory(
+                create=True, size=RingBuffer.size(len(fields), self.capacity))
+            self._shms.append(shm)
+            self.rings[name] = RingBuffer(shm.buf, len(fields), self.capacity)
+            shm_names[name] = shm.name
+
+        self._stop = ctx.Event()
+        ready = ctx.Event()
+        self._marks = ctx.SimpleQueue()
+        self._proc = ctx.Process(
+            target=_child_main,
+            args=(shm_names, self.capacity, self._stop, ready, self._marks,
+                  backends.get_backend(), self.setup),
+            name='sensor-acquisition',
+            daemon=True)
+        self._proc.start()
+
+        if not ready.wait(timeout):
+            exitcode = self._proc.exitcode
+            self.stop()
+            raise SensorProcessError(
+                f"Sensor process not ready after {timeout}s (exit code {exitcode})")
+        print(f"Sensor process started (pid {self._proc.pid})")
+
+    def latest(self, name):
+        """Newest sample of a channel as (t, values), or None."""
+        return self.rings[name].latest()
+
+    def mark(self, kind, *values):
+        """Record a non-sensor event in the child (where the recorder runs)."""
+        if self._marks is not None:
+            self._marks.put((kind, values))
+
+    def check(self):
+        """Raise SensorProcessError if acquisition died or stalled."""
+        if self._proc.exitcode is not None:
+            raise SensorProcessError(
+                f"Sensor process exited (code {self._proc.exitcode})")
+        age = time.monotonic() - self.rings['imu'].heartbeat
+        if age > config.SENSOR_PROCESS_TIMEOUT:
+            raise SensorProcessError(f"Sensor process stalled ({age:.2f}s)")
+
+    def stop(self):
+        """Stop the child and free the shared memory. Safe to call twice."""
+        if self._proc is not None:
+            self._stop.set()
+            self._proc.join(timeout=2.0)
+            if self._proc.is_alive():
+                self._proc.terminate()
+                self._proc.join()
+            self._proc = None
+        self._marks = None
+
+        for ring in self.rings.values():
+            ring.release()
+        self.rings = {}
+        for shm in self._shms:
+            shm.close()
+            shm.unlink()
+        self._shms = []
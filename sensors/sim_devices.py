@@ -0,0 +1,375 @@
+# sim_devices.py
+"""
+Simulated drivers for the 'sim' hardware backend, so the control stack
+can run on a dev box or in CI. Select them with HARDWARE_BACKEND = 'sim'
+in config.py or by calling install().
+
+A kinematic rover plant is driven by the simulated motor pins and feeds
+consistent accel, gyro, magnetometer and GPS readings (with configurable
+noise and bias) back to the unchanged RoverController.
+Each read also sleeps for a configurable latency and records when it
+finished, so sense-to-actuate latency can be measured end to end.
+"""
+import math
+import time
+import random
+import collections
+from datetime import datetime, timezone
+import threading
+import clock
+import config
+import backends
+import motor_helper
+
+# ========================== DEVICE LATENCY ========================== #
+I2C_LATENCY = 0.0005  # per I2C byte transaction
+IMU_READ_TRANSACTIONS = 2  # mpu6050.get_accel_data(): one 6-byte burst ~ two byte reads
+MAG_LATENCY = 0.004  # one BMM150 read_mag_data()
+GPS_LATENCY = 0.002  # one gpsd.get_current() round trip
+
+# ========================== ROVER PLANT ========================== #
+SIM_LAT = 33.6189  # Start position
+SIM_LON = -117.6142
+SIM_HEADING = 0.0  # degrees, 0 = North
+MAX_WHEEL_SPEED = 0.5  # m/s at PWM 1.0
+TRACK_WIDTH = 0.25  # meters between left and right wheels
+MOTOR_TAU = 0.2  # seconds - first-order lag from PWM to wheel speed
+# Wheel -> (deadband, gain): PWM below deadband doesn't turn the wheel,
+# above it speed is gain * MAX_WHEEL_SPEED * (pwm - deadband) / (1 - deadband)
+WHEEL_RESPONSE = {'lf': (0.0, 1.0), 'lb': (0.0, 1.0), 'rf': (0.0, 1.0), 'rb': (0.0, 1.0)}
+GRAVITY = 9.80665
+
+# ========================== SENSOR ERRORS ========================== #
+SEED = None  # Random seed for noise (None = nondeterministic)
+ACCEL_NOISE = 0.05  # m/s^2 std dev per axis
+GYRO_NOISE = 0.1  # deg/s std dev per axis
+MAG_NOISE = 0.3  # uT std dev per axis
+MAG_FIELD = 30.0  # uT horizontal field strength
+GPS_NOISE = 1.5  # meters std dev per axis
+GPS_RATE = 1.0  # Hz - How often the simulated receiver produces a new fix
+GPS_DELAY = 0.0  # seconds - Receiver latency: a fix reports where the rover was this long ago
+# Wall-clock time at virtual t=0: fix times are rounded to the millisecond,
+# so a seeded run only repeats exactly if the epoch is fixed too
+SIM_EPOCH = 1700000000.0
+ACCEL_BIAS_WALK = 0.0  # m/s^2/sqrt(s) - Accel bias random walk per axis (0 = fixed bias)
+GYRO_BIAS_WALK = 0.0  # deg/s/sqrt(s) - Gyro bias random walk per axis
+
+# Sensor biases; accel defaults to what config compensates for
+ACCEL_BIAS = [config.ACCEL_BIAS_X, config.ACCEL_BIAS_Y, config.ACCEL_BIAS_Z]
+GYRO_BIAS = [0.0, 0.0, 0.0]  # deg/s
+MAG_BIAS = [0.0, 0.0, 0.0]  # uT hard-iron offset
+
+# Wheel -> (PWM pin, in1 pin, in2 pin, +1 if in1 on means forward)
+WHEELS = motor_helper.WHEELS
+
+# Finish time (clock.monotonic) of the most recent read of each device
+last_read = {'imu': None, 'mag': None, 'gps': None}
+
+# Simulated pin devices by pin number, read back by the plant
+_pins = {}
+
+# Injected hangs: device -> seconds its next read blocks (see hang())
+_hangs = {}
+hang_started = {}  # device -> time.monotonic() when the last injected hang began
+
+
+class RoverPlant:
+    """
+    Differential-drive rover: wheel PWM -> wheel speed (first-order lag)
+    -> forward speed and yaw rate -> position and heading.
+    Advanced lazily to the current clock time whenever a sensor is read.
+    """
+
+    def __init__(self, time_source=clock.monotonic, seed=SEED):
+        self.time_source = time_source
+        self.rng = random.Random(seed)
+        self.lock = threading.Lock()
+
+        self.x = 0.0  # East (m)
+        self.y = 0.0  # North (m)
+        self.heading = SIM_HEADING  # degrees, clockwise from North
+        self.v = 0.0  # forward speed (m/s)
+        self.yaw_rate = 0.0  # deg/s, positive = turning right
+        self.accel = 0.0  # forward acceleration (m/s^2)
+        self.t = time_source()
+
+        self.gps_fix = None
+        self.gps_time = None  # measurement time of gps_fix
+        self.track = collections.deque()  # (t, x, y) over the last GPS_DELAY seconds
+        self.accel_drift = [0.0, 0.0, 0.0]  # bias random walk, added to ACCEL_BIAS
+        self.gyro_drift = [0.0, 0.0, 0.0]
+
+    def wheel_command(self, wheel):
+        """Signed effective drive (-1..1) of one wheel, after its response."""
+        pwm_pin, in1_pin, in2_pin, polarity = WHEELS[wheel]
+        if pwm_pin not in _pins:
+            return 0.0
+        direction = (_pins[in1_pin].value - _pins[in2_pin].value) * polarity
+        deadband, gain = WHEEL_RESPONSE[wheel]
+        drive = max(0.0, _pins[pwm_pin].value - deadband) / (1.0 - deadband)
+        return direction * gain * drive
+
+    def advance(self):
+        """Integrate the plant up to the current clock time."""
+        with self.lock:
+            now = self.time_source()
+            dt = now - self.t
+            if dt <= 0:
+                self.t = now  # clock was swapped (e.g. for a VirtualClock)
+                return
+            self.t = now
+
+            left = (self.wheel_command('lf') + self.wheel_command('lb')) / 2
+            right = (self.wheel_command('rf') + self.wheel_command('rb')) / 2
+            v_target = MAX_WHEEL_SPEED * (left + right) / 2
+            yaw_target = math.degrees(MAX_WHEEL_SPEED * (left - right) / TRACK_WIDTH)
+
+            # First-order lag toward the commanded speeds (exact for constant input)
+            alpha = 1.0 - math.exp(-dt / MOTOR_TAU)
+            v_new = self.v + (v_target - self.v) * alpha
+            self.accel = (v_new - self.v) / dt
+            self.yaw_rate += (yaw_target - self.yaw_rate) * alpha
+
+            heading_mid = math.radians(self.heading + self.yaw_rate * dt / 2)
+            v_mid = (self.v + v_new) / 2
+            self.x += v_mid * math.sin(heading_mid) * dt
+            self.y += v_mid * math.cos(heading_mid) * dt
+            self.heading = (self.heading + self.yaw_rate * dt) % 360
+            self.v = v_new
+            for drift, walk in ((self.accel_drift, ACCEL_BIAS_WALK),
+                                (self.gyro_drift, GYRO_BIAS_WALK)):
+                if walk > 0:
+                    for i in range(3):
+                        drift[i] += self.rng.gauss(0, walk * math.sqrt(dt))
+            if GPS_DELAY > 0:
+                self.track.append((now, self.x, self.y))
+                while len(self.track) > 1 and self.track[1][0] <= now - GPS_DELAY:
+                    self.track.popleft()
+
+    def read_accel(self):
+        """Body-frame accel (x forward, y left, z up) in m/s^2."""
+        self.advance()
+        omega = math.radians(self.yaw_rate)
+        lateral = -self.v * omega  # centripetal, toward the inside of the turn
+        noise = self.rng.gauss
+        drift = self.accel_drift
+        return (self.accel + ACCEL_BIAS[0] + drift[0] + noise(0, ACCEL_NOISE),
+                lateral + ACCEL_BIAS[1] + drift[1] + noise(0, ACCEL_NOISE),
+                GRAVITY + ACCEL_BIAS[2] + drift[2] + noise(0, ACCEL_NOISE))
+
+    def read_gyro(self):
+        """Angular rate in deg/s (z up, so turning right is negative z)."""
+        self.advance()
+        noise = self.rng.gauss
+        drift = self.gyro_drift
+        return (GYRO_BIAS[0] + drift[0] + noise(0, GYRO_NOISE),
+                GYRO_BIAS[1] + drift[1] + noise(0, GYRO_NOISE),
+                -self.yaw_rate + GYRO_BIAS[2] + drift[2] + noise(0, GYRO_NOISE))
+
+    def read_mag(self):
+        """Field in uT such that atan2(-my, mx) is the heading."""
+        self.advance()
+        h = math.radians(self.heading)
+        noise = self.rng.gauss
+        return (MAG_FIELD * math.cos(h) + MAG_BIAS[0] + noise(0, MAG_NOISE),
+                -MAG_FIELD * math.sin(h) + MAG_BIAS[1] + noise(0, MAG_NOISE),
+                -40.0 + MAG_BIAS[2] + noise(0, MAG_NOISE))
+
+    def latlon(self, x, y):
+        """Local XY -> lat/lon around the start point (same model as coordinate_transform)."""
+        lat = SIM_LAT + y / 110540
+        lon = SIM_LON + x / (111320 * math.cos(math.radians(SIM_LAT)))
+        return lat, lon
+
+    def local_xy(self, lat, lon):
+        """Inverse of latlon(): lat/lon -> local XY around the start point."""
+        x = (lon - SIM_LON) * 111320 * math.cos(math.radians(SIM_LAT))
+        y = (lat - SIM_LAT) * 110540
+        return x, y
+
+    def read_gps(self):
+        """
+        Latest noisy fix as (lat, lon); a new one every 1/GPS_RATE s, of
+        the position GPS_DELAY seconds before it is produced.
+        """
+        self.advance()
+        now = self.time_source()
+        if self.gps_time is None or now - self.gps_time >= 1.0 / GPS_RATE + GPS_DELAY:
+            x, y, t = self.x, self.y, now
+            if GPS_DELAY > 0 and self.track:
+                t, x, y = self.track[0]  # the latest position at least GPS_DELAY old
+            noise = self.rng.gauss
+            self.gps_fix = self.latlon(x + noise(0, GPS_NOISE), y + noise(0, GPS_NOISE))
+            self.gps_time = t
+        return self.gps_fix
+
+
+plant = RoverPlant()
+
+
+def reset(time_source=clock.monotonic, seed=SEED):
+    """Start a fresh plant (at SIM_LAT/SIM_LON, SIM_HEADING, at rest)."""
+    global plant
+    plant = RoverPlant(time_source=time_source, seed=seed)
+    return plant
+
+
+# ------------------------------ Drivers ------------------------------ #
+class SimIMU:
+    """Stands in for mpu6050."""
+
+    GRAVITIY_MS2 = 9.80665
+
+    def __init__(self, address=0x68):
+        self.address = address
+
+    def get_accel_data(self, g=False):
+        _stall('imu')
+        clock.sleep(I2C_LATENCY * IMU_READ_TRANSACTIONS)
+        x, y, z = plant.read_accel()
+        last_read['imu'] = clock.monotonic()
+        if g:
+            return {'x': x / GRAVITY, 'y': y / GRAVITY, 'z': z / GRAVITY}
+        return {'x': x, 'y': y, 'z': z}
+
+    def get_gyro_data(self):
+        _stall('imu')
+        clock.sleep(I2C_LATENCY * IMU_READ_TRANSACTIONS)
+        x, y, z = plant.read_gyro()
+        return {'x': x, 'y': y, 'z': z}
+
+
+class SimMagnetometer:
+    """Stands in for BMM150."""
+
+    def read_mag_data(self):
+        _stall('mag')
+        clock.sleep(MAG_LATENCY)
+        mag = plant.read_mag()
+        last_read['mag'] = clock.monotonic()
+        return mag
+
+
+class _Packet:
+    """Subset of a gpsd-py3 response."""
+
+    def __init__(self, lat, lon, fix_time=None):
+        self.mode = 3
+        self.lat = lat
+        self.lon = lon
+        # UTC time of the fix, like gpsd's ISO 8601 'time' ('' if unknown)
+        self.time = '' if fix_time is None else datetime.fromtimestamp(
+            fix_time, timezone.utc).isoformat(timespec='milliseconds').replace('+00:00', 'Z')
+
+    def position_precision(self):
+        return GPS_NOISE * math.sqrt(2), 2 * GPS_NOISE  # horizontal, vertical (m)
+
+
+class SimGPS:
+    """Stands in for the gpsd-py3 module."""
+
+    fix_available = True  # set False to simulate no fix
+
+    def connect(self, *args, **kwargs):
+        pass
+
+    def get_current(self):
+        _stall('gps')
+        clock.sleep(GPS_LATENCY)
+        last_read['gps'] = clock.monotonic()
+        if not self.fix_available:
+            packet = _Packet(float('nan'), float('nan'))
+            packet.mode = 1
+            return packet
+        lat, lon = plant.read_gps()
+        age = plant.time_source() - plant.gps_time  # gpsd hands out its last fix
+        return _Packet(lat, lon, clock.time() - age)
+
+
+class SimDigitalOutput:
+    def __init__(self, pin):
+        self.pin = pin
+        self.value = 0
+        _pins[pin] = self
+
+    def on(self):
+        plant.advance()  # integrate up to the moment the command changes
+        self.value = 1
+
+    def off(self):
+        plant.advance()
+        self.value = 0
+
+
+class SimPWMOutput:
+    def __init__(self, pin):
+        self.pin = pin
+        self._value = 0.0
+        _pins[pin] = self
+
+    @property
+    def value(self):
+        return self._value
+
+    @value.setter
+    def value(self, value):
+        plant.advance()
+        self._value = value
+
+
+backends.register('sim', 'imu', SimIMU)
+backends.register('sim', 'mag', SimMagnetometer)
+backends.register('sim', 'gps', SimGPS)
+backends.register('sim', 'pwm_output', SimPWMOutput)
+backends.register('sim', 'digital_output', SimDigitalOutput)
+
+
+def hang(device, seconds):
+    """
+    Make the next read of device ('imu', 'mag' or 'gps') block for seconds
+    of wall-clock time, like a stuck I2C transaction or gpsd call.
+    """
+    _hangs[device] = seconds
+
+
+def _stall(device):
+    seconds = _hangs.pop(device, None)
+    if seconds:
+        hang_started[device] = time.monotonic()
+        time.sleep(seconds)
+
+
+def install():
+    """Use the simulated drivers for every device created from now on."""
+    backends.set_backend('sim')
+    print("Simulated devices installed")
+
+
+def sample_age():
+    """Seconds since the freshest IMU or magnetometer read finished."""
+    reads = [t for t in (last_read['imu'], last_read['mag']) if t is not None]
+    if not reads:
+        return None
+    return clock.monotonic() - max(reads)
+
+
+# Closed-loop demo: drive the real controller against the plant
+if __name__ == "__main__":
+    install()
+    config.LOG_ENABLED = False
+    config.WARM_START_ENABLED = False
+    config.DEBUG_PRINT_NAVIGATION = False
+
+    from main import RoverController
+
+    rover = RoverController()
+    rover.set_destination_xy(2, 3)
+
+    start = time.monotonic()
+    rover.run()
+    elapsed = time.monotonic() - start
+
+    print(f"\nRun took {elapsed:.1f}s")
+    print(f"Navigator estimate: ({rover.nav.x:.2f}, {rover.nav.y:.2f})")
+    print(f"True position:      ({plant.x:.2f}, {plant.y:.2f}), "
+          f"heading {plant.heading:.1f}°")
@@ -0,0 +1,355 @@
+# smoother.py
+"""
+Offline trajectory reconstruction: Kalman filter forward, Rauch-Tung-Striebel
+smoother backward, over a whole recorded run.
+
+Each axis (East, North) is a position/velocity state driven by the
+IMU acceleration rotated into the earth frame with the magnetometer
+heading (the same rotation Navigator uses); GPS fixes correct position.
+The smoothed track uses every fix, before and after each point, so it
+has no jumps at GPS resyncs.
+
+Inputs: a raw recording (recorder.py, best: full-rate IMU) or a
+navigation log (.bin/.csv/.seg, control-loop rate, accel already
+bias-corrected). Input preparation (heading interpolation, rotation,
+time steps) is vectorized; the filter and smoother recursions step over
+Python floats, collecting each step's results in lists that become
+arrays at the end, and since both axes share one covariance it is
+computed once.
+Usage:
+    python3 smoother.py rover_raw.rec --out smoothed.csv
+    python3 smoother.py rover_navigation_log.bin --out smoothed.csv
+    python3 smoother.py --benchmark 1      # 1 hour of synthetic 50 Hz data
+"""
+import csv
+import math
+import time
+import argparse
+
+import numpy as np
+
+
+ACCEL_SIGMA = 0.3  # m/s^2 - acceleration uncertainty (noise + bias drift)
+GPS_SIGMA = 2.0  # meters - per-axis fix error when the receiver gives none
+INITIAL_SIGMA = 1000.0  # meters - position uncertainty before the first fix
+
+LAT_M_PER_DEG = 110540  # same flat-Earth model as coordinate_transform
+
+
+# ------------------------------ Inputs ------------------------------ #
+def rotate_to_earth(ax_body, ay_body, heading_deg):
+    """Vectorized coordinate_transform.body_to_earth_frame."""
+    h = np.radians(heading_deg)
+    sin_h, cos_h = np.sin(h), np.cos(h)
+    return ax_body * sin_h + ay_body * cos_h, ax_body * cos_h - ay_body * sin_h
+
+
+def _unwrap_interp(t, t_heading, heading):
+    """Heading at times t, interpolated without jumping at 0/360."""
+    unwrapped = np.degrees(np.unwrap(np.radians(heading)))
+    return np.interp(t, t_heading, unwrapped) % 360
+
+
+def _dedupe_fixes(t, lat, lon, sigma):
+    """Keep valid fixes, and only the first of each run of repeated reads."""
+    valid = ~(np.isnan(lat) | np.isnan(lon))
+    t, lat, lon, sigma = t[valid], lat[valid], lon[valid], sigma[valid]
+    new = np.ones(len(t), dtype=bool)
+    new[1:] = (np.diff(lat) != 0) | (np.diff(lon) != 0)
+    return t[new], lat[new], lon[new], sigma[new]
+
+
+def load_recording(filename):
+    """Run inputs from a raw recording: full-rate accel, mag heading, GPS."""
+    import recorder
+
+    header, streams = recorder.load(filename)
+    imu = np.array([(t,) + v for t, v in streams['imu']])
+    mag = np.array([(t,) + v for t, v in streams['mag']])
+    gps = np.array([(t,) + v for t, v in streams['gps']])
+    if len(imu) == 0 or len(mag) == 0 or len(gps) == 0:
+        raise ValueError(f"{filename}: needs IMU, magnetometer and GPS readings")
+
+    scale = np.where(imu[:, 4] > 0, 9.80665, 1.0)  # readings taken in g
+    bias = header['config']
+    heading = np.degrees(np.arctan2(-mag[:, 2], mag[:, 1])) % 360  # get_heading_basic
+    gps = gps[gps[:, 3] >= 2]  # mode: 2D/3D fix
+    sigma = np.where(np.isnan(gps[:, 4]), GPS_SIGMA, gps[:, 4] / math.sqrt(2))
+
+    t = imu[:, 0]
+    return {
+        't': t,
+        'ax_body': imu[:, 1] * scale - bias['ACCEL_BIAS_X'],
+        'ay_body': imu[:, 2] * scale - bias['ACCEL_BIAS_Y'],
+        'heading': _unwrap_interp(t, mag[:, 0], heading),
+        'gps': _dedupe_fixes(gps[:, 0], gps[:, 1], gps[:, 2], sigma),
+    }
+
+
+def load_log(path):
+    """Run inputs from a navigation log (accel there is already bias-corrected)."""
+    import analyze
+
+    records, _ = analyze.load(path)
+    heading = records['heading'].astype(np.float64)
+    ok = ~np.isnan(heading)
+    t = records['timestamp'][ok]
+    ax = np.nan_to_num(records['ax_body'][ok].astype(np.float64))
+    ay = np.nan_to_num(records['ay_body'][ok].astype(np.float64))
+
+    fix = ~np.isnan(records['lat'])
+    gps_t = records['timestamp'][fix]
+    return {
+        't': t,
+        'ax_body': ax,
+        'ay_body': ay,
+        'heading': heading[ok],
+        'gps': _dedupe_fixes(gps_t, records['lat'][fix], records['lon'][fix],
+                             np.full(len(gps_t), GPS_SIGMA)),
+    }
+
+
+# ------------------------------ Smoother ------------------------------ #
+def smooth(run, accel_sigma=ACCEL_SIGMA):
+    """
+    Filter forward and smooth backward over a run (see load_*).
+    Returns a dict of arrays: t, x, y, vx, vy, sigma (smoothed position
+    std dev per axis), filtered_x, filtered_y, and the reference lat/lon
+    of the local frame (the first fix).
+    """
+    t = np.asarray(run['t'], dtype=np.float64)
+    n = len(t)
+    ax_e, ay_e = rotate_to_earth(run['ax_body'], run['ay_body'], run['heading'])
+
+    gps_t, gps_lat, gps_lon, gps_sigma = run['gps']
+    if len(gps_t) == 0:
+        raise ValueError("no GPS fixes to anchor the trajectory")
+    ref_lat, ref_lon = float(gps_lat[0]), float(gps_lon[0])
+    lon_m_per_deg = 111320 * math.cos(math.radians(ref_lat))
+    zx = (gps_lon - ref_lon) * lon_m_per_deg
+    zy = (gps_lat - ref_lat) * LAT_M_PER_DEG
+
+    # Each fix updates the first sample at or after it; one fix per sample
+    step = np.searchsorted(t, gps_t).clip(0, n - 1)
+    has_fix = np.zeros(n, dtype=bool)
+    fix_x = np.zeros(n)
+    fix_y = np.zeros(n)
+    fix_r = np.zeros(n)
+    has_fix[step] = True
+    fix_x[step], fix_y[step], fix_r[step] = zx, zy, gps_sigma ** 2
+
+    dt = np.empty(n)
+    dt[0] = 0.0
+    dt[1:] = np.diff(t)
+    q = accel_sigma ** 2
+    # Process noise terms per step (acceleration white noise over dt)
+    q00 = (q * dt ** 4 / 4).tolist()
+    q01 = (q * dt ** 3 / 2).tolist()
+    q11 = (q * dt ** 2).tolist()
+    # Input: acceleration held from the previous sample
+    ax_in = np.concatenate(([0.0], ax_e[:-1]))
+    ay_in = np.concatenate(([0.0], ay_e[:-1]))
+    half_dt2 = 0.5 * dt ** 2
+    dpx = (ax_in * half_dt2).tolist()
+    dpy = (ay_in * half_dt2).tolist()
+    dvx = (ax_in * dt).tolist()
+    dvy = (ay_in * dt).tolist()
+
+    dts = dt.tolist()
+    has = has_fix.tolist()
+    zxs, zys, rs = fix_x.tolist(), fix_y.tolist(), fix_r.tolist()
+
+    # Predicted and filtered mean (px, vx, py, vy) and covariance
+    # (P00, P01, P11, shared by both axes) per step
+    px = vx = py = vy = 0.0
+    p00, p01, p11 = INITIAL_SIGMA ** 2, 0.0, 1.0
+    pred_rows, filt_rows, pred_cov, filt_cov = [], [], [], []
+    for k in range(n):
+        d = dts[k]
+        # Predict
+        px += vx * d + dpx[k]
+        vx += dvx[k]
+        py += vy * d + dpy[k]
+        vy += dvy[k]
+        p00 = p00 + 2 * d * p01 + d * d * p11 + q00[k]
+        p01 = p01 + d * p11 + q01[k]
+        p11 = p11 + q11[k]
+        pred_rows.append((px, vx, py, vy))
+        pred_cov.append((p00, p01, p11))
+
+        # GPS position update
+        if has[k]:
+            s = p00 + rs[k]
+            k0, k1 = p00 / s, p01 / s
+            ex, ey = zxs[k] - px, zys[k] - py
+            px += k0 * ex
+            vx += k1 * ex
+            py += k0 * ey
+            vy += k1 * ey
+            p11 -= k1 * p01
+            p01 *= 1 - k0
+            p00 *= 1 - k0
+        filt_rows.append((px, vx, py, vy))
+        filt_cov.append((p00, p01, p11))
+    filt = np.array(filt_rows)
+
+    # Backward RTS pass
+    sx, svx, sy, svy = filt_rows[-1]
+    s00, s01, s11 = filt_cov[-1]
+    out_rows = [None] * n
+    out_p00 = [0.0] * n
+    out_rows[-1] = (sx, svx, sy, svy)
+    out_p00[-1] = s00
+    for k in range(n - 2, -1, -1):
+        d = dts[k + 1]
+        f00, f01, f11 = filt_cov[k]
+        b00, b01, b11 = pred_cov[k + 1]
+        # C = P_filt F' inv(P_pred)
+        m00, m01 = f00 + d * f01, f01
+        m10, m11 = f01 + d * f11, f11
+        det = b00 * b11 - b01 * b01
+        c00 = (m00 * b11 - m01 * b01) / det
+        c01 = (m01 * b00 - m00 * b01) / det
+        c10 = (m10 * b11 - m11 * b01) / det
+        c11 = (m11 * b00 - m10 * b01) / det
+
+        fx, fvx, fy, fvy = filt_rows[k]
+        ppx, ppvx, ppy, ppvy = pred_rows[k + 1]
+        ex, evx = sx - ppx, svx - ppvx
+        ey, evy = sy - ppy, svy - ppvy
+        sx = fx + c00 * ex + c01 * evx
+        svx = fvx + c10 * ex + c11 * evx
+        sy = fy + c00 * ey + c01 * evy
+        svy = fvy + c10 * ey + c11 * evy
+
+        # P_s = P_f + C (P_s' - P_pred) C'
+        d00, d01, d11 = s00 - b00, s01 - b01, s11 - b11
+        t00 = c00 * d00 + c01 * d01
+        t01 = c00 * d01 + c01 * d11
+        t10 = c10 * d00 + c11 * d01
+        t11 = c10 * d01 + c11 * d11
+        s00 = f00 + t00 * c00 + t01 * c01
+        s01 = f01 + t00 * c10 + t01 * c11
+        s11 = f11 + t10 * c10 + t11 * c11
+
+        out_rows[k] = (sx, svx, sy, svy)
+        out_p00[k] = s00
+    smoothed = np.array(out_rows)
+    smoothed_p00 = np.array(out_p00)
+
+    return {
+        't': t,
+        'x': smoothed[:, 0], 'vx': smoothed[:, 1],
+        'y': smoothed[:, 2], 'vy': smoothed[:, 3],
+        'sigma': np.sqrt(np.maximum(smoothed_p00, 0.0)),
+        'filtered_x': filt[:, 0], 'filtered_y': filt[:, 2],
+        'ref_lat': ref_lat, 'ref_lon': ref_lon,
+    }
+
+
+def to_latlon(result):
+    """Smoothed positions as (lat, lon) arrays."""
+    lat = result['ref_lat'] + result['y'] / LAT_M_PER_DEG
+    lon = result['ref_lon'] + result['x'] / (111320 * math.cos(math.radians(result['ref_lat'])))
+    return lat, lon
+
+
+def write_csv(result, filename):
+    lat, lon = to_latlon(result)
+    columns = np.column_stack([result['t'] - result['t'][0], result['x'], result['y'],
+                               result['vx'], result['vy'], result['sigma'], lat, lon])
+    with open(filename, 'w', newline='') as f:
+        writer = csv.writer(f)
+        writer.writerow(['t', 'x', 'y', 'vx', 'vy', 'sigma', 'lat', 'lon'])
+        for row in columns.tolist():
+            writer.writerow([f"{row[0]:.3f}"] + [f"{v:.3f}" for v in row[1:6]]
+                            + [f"{row[6]:.8f}", f"{row[7]:.8f}"])
+
+
+# ------------------------------ Benchmark ------------------------------ #
+def synthetic_run(hours=1.0, rate=50.0, gps_rate=1.0, seed=0):
+    """A wandering 0.5 m/s drive with noisy accel, heading and GPS; returns (run, truth)."""
+    rng = np.random.default_rng(seed)
+    n = int(hours * 3600 * rate)
+    dt = 1.0 / rate
+    t = np.arange(n) * dt
+
+    speed = 0.5 + 0.2 * np.sin(t / 20.0)
+    accel = np.gradient(speed, dt)
+    heading = np.cumsum(rng.normal(0, 2.0, n) * math.sqrt(dt)) % 360
+    h = np.radians(heading)
+    x = np.cumsum(speed * np.sin(h)) * dt
+    y = np.cumsum(speed * np.cos(h)) * dt
+
+    every = int(rate / gps_rate)
+    gps_t = t[::every]
+    ref_lat, ref_lon = 33.6189, -117.6142
+    lon_m_per_deg = 111320 * math.cos(math.radians(ref_lat))
+    gps_x = x[::every] + rng.normal(0, 1.5, len(gps_t))
+    gps_y = y[::every] + rng.normal(0, 1.5, len(gps_t))
+
+    run = {
+        't': t,
+        'ax_body': accel + rng.normal(0, 0.05, n) + 0.02,  # noise + residual bias
+        'ay_body': rng.normal(0, 0.05, n),
+        'heading': (heading + rng.normal(0, 1.0, n)) % 360,
+        'gps': (gps_t, ref_lat + gps_y / LAT_M_PER_DEG, ref_lon + gps_x / lon_m_per_deg,
+                np.full(len(gps_t), 1.5)),
+    }
+    return run, (x - gps_x[0], y - gps_y[0])
+
+
+def benchmark(hours):
+    run, (true_x, true_y) = synthetic_run(hours)
+    n = len(run['t'])
+    start = time.perf_counter()
+    result = smooth(run)
+    elapsed = time.perf_counter() - start
+
+    def rms(x, y):
+        return float(np.sqrt(np.mean((x - true_x) ** 2 + (y - true_y) ** 2)))
+
+    gps_t, lat, lon, _ = run['gps']
+    gx = (lon - result['ref_lon']) * 111320 * math.cos(math.radians(result['ref_lat']))
+    gy = (lat - result['ref_lat']) * LAT_M_PER_DEG
+    every = n // len(gps_t)
+    gps_rms = float(np.sqrt(np.mean((gx - true_x[::every]) ** 2 + (gy - true_y[::every]) ** 2)))
+
+    print(f"{hours:g}h of {n / (hours * 3600):.0f} Hz data ({n} samples, {len(gps_t)} fixes): "
+          f"{elapsed:.2f}s ({n / elapsed / 1e3:.0f}k samples/s)")
+    print(f"Position RMS error: GPS {gps_rms:.2f}m, filter "
+          f"{rms(result['filtered_x'], result['filtered_y']):.2f}m, "
+          f"smoother {rms(result['x'], result['y']):.2f}m")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Smooth a recorded run's trajectory")
+    parser.add_argument('input', nargs='?', help="raw recording (.rec) or navigation log")
+    parser.add_argument('--out', metavar='FILE', help="write t, x, y, v, sigma, lat, lon as CSV")
+    parser.add_argument('--accel-sigma', type=float, default=ACCEL_SIGMA)
+    parser.add_argument('--benchmark', type=float, metavar='HOURS',
+                        help="time the smoother on synthetic 50 Hz data")
+    args = parser.parse_args()
+
+    if args.benchmark:
+        benchmark(args.benchmark)
+    elif args.input:
+        start = time.perf_counter()
+        if args.input.endswith('.rec'):
+            run = load_recording(args.input)
+        else:
+            run = load_log(args.input)
+        result = smooth(run, args.accel_sigma)
+        elapsed = time.perf_counter() - start
+
+        steps = np.hypot(np.diff(result['x']), np.diff(result['y']))
+        print(f"{args.input}: {len(result['t'])} samples, {len(run['gps'][0])} fixes, "
+              f"{result['t'][-1] - result['t'][0]:.1f}s, smoothed in {elapsed:.2f}s")
+        print(f"Distance {steps.sum():.1f}m, final position "
+              f"({result['x'][-1]:.2f}, {result['y'][-1]:.2f}), "
+              f"sigma median {np.median(result['sigma']):.2f}m")
+        if args.out:
+            write_csv(result, args.out)
+            print(f"Wrote {args.out}")
+    else:
+        parser.error("give an input file or --benchmark")
@@ -0,0 +1,68 @@
+# statecache.py
+"""
+Warm-start cache: persist the rover's last known state so a restart
+(e.g. after a brownout) can resume in seconds instead of waiting for a
+full GPS fix acquisition.
+"""
+import os
+import json
+import time
+import zlib
+import config
+
+STATE_VERSION = 1
+
+
+def calibration_id():
+    """Short ID of the current calibration values in config."""
+    values = (
+        config.MAG_OFFSET_X, config.MAG_OFFSET_Y, config.MAG_OFFSET_Z,
+        config.ACCEL_BIAS_X, config.ACCEL_BIAS_Y, config.ACCEL_BIAS_Z,
+        config.GYRO_BIAS_X, config.GYRO_BIAS_Y, config.GYRO_BIAS_Z,
+        config.MAGNETIC_DECLINATION,
+    )
+    return format(zlib.crc32(repr(values).encode()), '08x')
+
+
+def save_state(state, filename=None):
+    """
+    Write state atomically: temp file, fsync, then rename over the old
+    file, so a power cut leaves either the old or the new state, never
+    a half-written one.
+    """
+    if filename is None:
+        filename = config.STATE_FILE
+
+    state = dict(state, version=STATE_VERSION, saved_at=time.time())
+    tmp = filename + '.tmp'
+    with open(tmp, 'w') as f:
+        json.dump(state, f)
+        f.flush()
+        os.fsync(f.fileno())
+    os.replace(tmp, filename)
+
+
+def load_state(filename=None):
+    """Load saved state, or None if missing, unreadable or another version."""
+    if filename is None:
+        filename = config.STATE_FILE
+
+    try:
+        with open(filename) as f:
+            state = json.load(f)
+    except (OSError, ValueError):
+        return None
+
+    if state.get('version') != STATE_VERSION:
+        return None
+    return state
+
+
+def is_fresh(state):
+    """
+    True if the state is recent enough to resume from.
+    A negative age means the clock hasn't been set yet after power loss
+    (no RTC on the Pi); that is accepted and left to live-fix validation.
+    """
+    age = time.time() - state['saved_at']
+    return age <= config.STATE_MAX_AGE
@@ -0,0 +1,322 @@
+# telemetry.py
+"""
+Live telemetry for a ground station.
+The control loop hands its latest state to publish() (one attribute
+store, no I/O); a publisher thread packs it into a compact binary frame
+and sends it over UDP, or a unix datagram socket, at TELEMETRY_RATE.
+A stalled or missing receiver never slows the loop: sends are
+non-blocking and a failed send is counted and dropped.
+
+A Prometheus-style text endpoint (GET /metrics on TELEMETRY_METRICS_PORT)
+serves the counters of whatever sources are registered with it.
+
+Frame (little-endian, 72 bytes):
+    magic 'RT', version, command code, sequence, time,
+    x, y, vx, vy, heading, heading error, distance (float32),
+    lat, lon (float64, NaN until a fix), tick rate (Hz), tick p99 (ms),
+    dropped log rows
+Usage:
+    python3 telemetry.py --listen 0.0.0.0:5600       # print received frames
+    python3 telemetry.py --listen unix:/tmp/rover_telemetry.sock
+    python3 telemetry.py --bench                     # publishing cost per frame
+"""
+import os
+import math
+import time
+import socket
+import struct
+import argparse
+import threading
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+import clock
+import config
+from binlog import MOTOR_COMMANDS
+
+MAGIC = b'RT'
+VERSION = 1
+FRAME = struct.Struct('<2sBBId7fddffI')
+COMMAND_CODES = {name: code for code, name in enumerate(MOTOR_COMMANDS)}
+
+NAN = math.nan
+
+
+def parse_address(text):
+    """'host:port' -> (AF_INET, (host, port)); 'unix:/path' -> (AF_UNIX, path)."""
+    if text.startswith('unix:'):
+        return socket.AF_UNIX, text[5:]
+    host, _, port = text.rpartition(':')
+    return socket.AF_INET, (host or '127.0.0.1', int(port))
+
+
+def pack_frame(seq, t, state, loop=(0.0, 0.0, 0)):
+    """
+    state: (x, y, vx, vy, heading, heading_error, distance, lat, lon, command)
+    loop: (tick rate Hz, tick p99 ms, dropped log rows)
+    """
+    x, y, vx, vy, heading, heading_error, distance, lat, lon, command = state
+    return FRAME.pack(MAGIC, VERSION, COMMAND_CODES.get(command, 0), seq, t,
+                      x, y, vx, vy, _num(heading), _num(heading_error), _num(distance),
+                      _num(lat), _num(lon), *loop)
+
+
+def unpack_frame(data):
+    """Frame bytes -> dict, or None if it isn't a telemetry frame."""
+    if len(data) != FRAME.size or data[:2] != MAGIC:
+        return None
+    (_, version, code, seq, t, x, y, vx, vy, heading, heading_error, distance,
+     lat, lon, rate, p99, dropped) = FRAME.unpack(data)
+    if version != VERSION:
+        return None
+    return {'seq': seq, 'time': t, 'x': x, 'y': y, 'vx': vx, 'vy': vy,
+            'heading': heading, 'heading_error': heading_error, 'distance': distance,
+            'lat': lat, 'lon': lon,
+            'command': MOTOR_COMMANDS[code] if code < len(MOTOR_COMMANDS) else '',
+            'rate': rate, 'tick_p99': p99, 'log_dropped': dropped}
+
+
+def _num(value):
+    return NAN if value is None else value
+
+
+class TelemetryPublisher:
+    """Sends the latest published state at a fixed rate from its own thread."""
+
+    def __init__(self, address=None, rate=None, loop_stats=None):
+        self.family, self.address = parse_address(address or config.TELEMETRY_ADDRESS)
+        self.period = 1.0 / (rate or config.TELEMETRY_RATE)
+        self.loop_stats = loop_stats  # callable -> (rate, p99 ms, dropped) or None
+        self.sock = socket.socket(self.family, socket.SOCK_DGRAM)
+        self.sock.setblocking(False)
+
+        self._latest = None  # state tuple from publish()
+        self._sent_state = None
+        self._stop = threading.Event()
+        self._thread = None
+
+        # Counters
+        self.seq = 0
+        self.frames = 0
+        self.bytes = 0
+        self.errors = 0
+        self.stale = 0  # periods with no new state (loop stalled or not started)
+
+    def publish(self, x, y, vx, vy, heading, heading_error, distance, lat, lon, command):
+        """Hand over the latest state; called from the control loop."""
+        self._latest = (x, y, vx, vy, heading, heading_error, distance, lat, lon, command)
+
+    def start(self):
+        self._thread = threading.Thread(target=self._run, daemon=True, name='telemetry')
+        self._thread.start()
+        print(f"Telemetry: {self.address} at {1 / self.period:.0f} Hz")
+        return self
+
+    def send_latest(self):
+        """Pack and send the latest state once (the thread does this every period)."""
+        state = self._latest
+        if state is None:
+            return False
+        if state is self._sent_state:
+            self.stale += 1
+        self._sent_state = state
+        loop = self.loop_stats() if self.loop_stats else (0.0, 0.0, 0)
+        frame = pack_frame(self.seq, clock.time(), state, loop)
+        self.seq = (self.seq + 1) & 0xFFFFFFFF
+        try:
+            self.sock.sendto(frame, self.address)
+        except OSError:  # no receiver, buffer full, network down: drop it
+            self.errors += 1
+            return False
+        self.frames += 1
+        self.bytes += len(frame)
+        return True
+
+    def _run(self):
+        next_send = time.monotonic()
+        while not self._stop.is_set():
+            try:
+                self.send_latest()
+            except Exception as e:
+                self.errors += 1
+                print(f"Telemetry error: {e}")
+            next_send += self.period
+            delay = next_send - time.monotonic()
+            if delay < 0:
+                next_send = time.monotonic()  # fell behind; don't burst to catch up
+                delay = 0
+            self._stop.wait(delay)
+
+    def close(self):
+        self._stop.set()
+        if self._thread is not None:
+            self._thread.join(timeout=1.0)
+            self._thread = None
+        self.sock.close()
+
+    def metrics(self):
+        return [
+            ('rover_telemetry_frames_total', 'counter', "Telemetry frames sent", self.frames),
+            ('rover_telemetry_bytes_total', 'counter', "Telemetry bytes sent", self.bytes),
+            ('rover_telemetry_errors_total', 'counter', "Telemetry frames dropped on send",
+             self.errors),
+            ('rover_telemetry_stale_total', 'counter',
+             "Telemetry periods without a new state from the loop", self.stale),
+        ]
+
+
+# ------------------------------ Metrics ------------------------------ #
+class MetricsServer:
+    """
+    Prometheus text exposition on GET /metrics.
+    Sources are callables returning [(name, type, help, value), ...];
+    value is a number or {label value: number} (label given by the name
+    as 'metric{label}').
+    """
+
+    def __init__(self, port=None, host='0.0.0.0'):
+        self.sources = []
+        server = self
+
+        class Handler(BaseHTTPRequestHandler):
+            def do_GET(self):
+                if self.path.split('?')[0] != '/metrics':
+                    self.send_error(404)
+                    return
+                body = server.render().encode()
+                self.send_response(200)
+                self.send_header('Content-Type', 'text/plain; version=0.0.4')
+                self.send_header('Content-Length', str(len(body)))
+                self.end_headers()
+                self.wfile.write(body)
+
+            def log_message(self, *args):
+                pass  # no per-scrape console output
+
+        self.httpd = ThreadingHTTPServer(
+            (host, config.TELEMETRY_METRICS_PORT if port is None else port), Handler)
+        self.port = self.httpd.server_address[1]
+        self._thread = None
+
+    def add_source(self, source):
+        self.sources.append(source)
+
+    def render(self):
+        lines = []
+        for source in self.sources:
+            try:
+                metrics = source()
+            except Exception as e:
+                lines.append(f"# source error: {e}")
+                continue
+            for name, kind, help_text, value in metrics:
+                base, _, label = name.partition('{')
+                lines.append(f"# HELP {base} {help_text}")
+                lines.append(f"# TYPE {base} {kind}")
+                if isinstance(value, dict):
+                    label = label.rstrip('}')
+                    for key, v in value.items():
+                        lines.append(f'{base}{{{label}="{key}"}} {_format(v)}')
+                else:
+                    lines.append(f"{base} {_format(value)}")
+        return "\n".join(lines) + "\n"
+
+    def start(self):
+        self._thread = threading.Thread(target=self.httpd.serve_forever, daemon=True,
+                                        name='metrics')
+        self._thread.start()
+        print(f"Metrics: http://localhost:{self.port}/metrics")
+        return self
+
+    def close(self):
+        if self._thread is not None:
+            self.httpd.shutdown()
+            self._thread.join(timeout=1.0)
+            self._thread = None
+        self.httpd.server_close()
+
+
+def _format(value):
+    if value is None or (isinstance(value, float) and math.isnan(value)):
+        return 'NaN'
+    return repr(float(value)) if isinstance(value, float) else str(int(value))
+
+
+# ------------------------------ Tools ------------------------------ #
+def listen(address, count=None):
+    """Print received frames, with the receive rate and sequence gaps."""
+    family, addr = parse_address(address)
+    sock = socket.socket(family, socket.SOCK_DGRAM)
+    if family == socket.AF_UNIX and os.path.exists(addr):
+        os.unlink(addr)
+    sock.bind(addr)
+    print(f"Listening on {address}")
+    last_seq, lost, received, start = None, 0, 0, time.monotonic()
+    try:
+        while count is None or received < count:
+            frame = unpack_frame(sock.recv(256))
+            if frame is None:
+                continue
+            received += 1
+            if last_seq is not None and frame['seq'] != (last_seq + 1) & 0xFFFFFFFF:
+                lost += (frame['seq'] - last_seq - 1) & 0xFFFFFFFF
+            last_seq = frame['seq']
+            rate = received / max(time.monotonic() - start, 1e-9)
+            print(f"#{frame['seq']:<6} ({frame['x']:7.2f},{frame['y']:7.2f}) "
+                  f"v=({frame['vx']:5.2f},{frame['vy']:5.2f}) hdg {frame['heading']:5.1f}° "
+                  f"err {frame['heading_error']:+6.1f}° dist {frame['distance']:6.1f}m "
+                  f"{frame['command'] or '-':<10} loop {frame['rate']:4.1f}Hz "
+                  f"p99 {frame['tick_p99']:5.1f}ms | rx {rate:4.1f}/s lost {lost}")
+    except KeyboardInterrupt:
+        pass
+    finally:
+        sock.close()
+        if family == socket.AF_UNIX:
+            os.unlink(addr)
+
+
+def benchmark(frames=100000):
+    """Per-frame cost of publish() (control thread) and pack + send (publisher)."""
+    receiver = socket.socket(socket.AF_INET, socket.SOCK_DGRAM)
+    receiver.bind(('127.0.0.1', 0))
+    receiver.setblocking(False)
+    address = f"127.0.0.1:{receiver.getsockname()[1]}"
+    publisher = TelemetryPublisher(address, rate=50, loop_stats=lambda: (50.0, 8.1, 0))
+
+    start = time.perf_counter()
+    for i in range(frames):
+        publisher.publish(1.0, 2.0, 0.1, 0.2, 90.0, -5.0, 12.0, 33.6, -117.6, 'forward')
+    publish = (time.perf_counter() - start) / frames
+
+    start = time.perf_counter()
+    for i in range(frames):
+        publisher.publish(1.0, 2.0, 0.1, 0.2, 90.0, -5.0, 12.0, 33.6, -117.6, 'forward')
+        publisher.send_latest()
+        if i % 64 == 0:  # keep the receive buffer from filling up
+            try:
+                while receiver.recv(256):
+                    pass
+            except BlockingIOError:
+                pass
+    send = (time.perf_counter() - start) / frames
+    publisher.close()
+    receiver.close()
+    return publish, send
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Rover telemetry tools")
+    parser.add_argument('--listen', metavar='ADDRESS', nargs='?', const=None, default=False,
+                        help="receive and print frames (default TELEMETRY_ADDRESS)")
+    parser.add_argument('--bench', action='store_true', help="measure publishing cost")
+    args = parser.parse_args()
+
+    if args.bench:
+        publish, send = benchmark()
+        print(f"Frame: {FRAME.size} bytes")
+        print(f"publish() on the control thread: {publish * 1e6:.2f} us")
+        print(f"pack + sendto on the publisher:  {send * 1e6:.2f} us per frame "
+              f"({send * config.TELEMETRY_RATE * 100:.3f}% of a core at "
+              f"{config.TELEMETRY_RATE} Hz)")
+    elif args.listen is not False:
+        listen(args.listen or config.TELEMETRY_ADDRESS)
+    else:
+        parser.print_help()
@@ -0,0 +1,51 @@
+# test_analyze.py
+"""
+Log a simulated mission with every row and decimated to 10 Hz, and check
+analyze.py reports the loop rate, resync errors and dead-reckoning
+distance from the full log but recognises the decimated one and skips
+the metrics it can't compute.
+Usage: python3 test_analyze.py
+"""
+import os
+import shutil
+import tempfile
+
+import config
+import analyze
+from simulate import run_mission
+
+MISSION = dict(dest_x=0, dest_y=40, timeout=200.0, seed=2)
+
+
+def log_mission(directory, frequency):
+    filename = os.path.join(directory, f'log_{frequency}hz.bin')
+    run_mission(**MISSION, overrides={'LOG_ENABLED': True, 'LOG_FORMAT': 'binary',
+                                      'LOG_BINARY_FILE': filename,
+                                      'LOG_FREQUENCY': frequency,
+                                      'GPS_UPDATE_INTERVAL': 10})
+    return analyze.summarize(analyze.load(filename)[0])
+
+
+def check_decimation():
+    directory = tempfile.mkdtemp()
+    try:
+        full = log_mission(directory, 0)
+        decimated = log_mission(directory, 10)
+    finally:
+        shutil.rmtree(directory)
+
+    rate = 1 / full['loop_period']['mean']
+    assert not full['decimated'] and abs(rate - config.IMU_FREQUENCY) < 1, rate
+    assert full['resync_error'] is not None and full['resync_error']['p50'] > 0.5, full
+
+    assert decimated['decimated'], decimated
+    assert decimated['loop_period'] is None and abs(1 / decimated['log_period']['mean'] - 10) < 1
+    assert decimated['resync_error'] is None and decimated['distance_dr'] is None
+    assert decimated['resyncs'] == full['resyncs'], (decimated['resyncs'], full['resyncs'])
+    print(f"decimation ok: full log {rate:.1f} Hz, resync p50 "
+          f"{full['resync_error']['p50']:.2f}m; 10 Hz log flagged, {decimated['resyncs']} resyncs")
+
+
+if __name__ == "__main__":
+    check_decimation()
+    print("All analyze checks passed")
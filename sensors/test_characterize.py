@@ -0,0 +1,113 @@
+# test_characterize.py
+"""
+Check the characterization suite: the vectorized Allan deviation against
+a direct evaluation of the definition, noise terms recovered from
+synthetic white noise and bias random walk over hours of samples (and
+how long that takes), and a capture on simulated devices (virtual clock)
+analyzed live and again from its raw recording.
+Usage: python3 test_characterize.py [hours]
+"""
+import io
+import os
+import sys
+import time
+import tempfile
+from contextlib import redirect_stdout
+
+import numpy as np
+
+import clock
+import recorder
+import sim_devices
+from characterize import allan_deviation, noise_parameters, capture, load_recording, characterize
+
+
+def _reference(y, tau0, m):
+    """Overlapping Allan deviation straight from the definition (slow)."""
+    n = len(y)
+    means = [y[k:k + m].mean() for k in range(n - m + 1)]
+    diffs = [(means[k + m] - means[k]) ** 2 for k in range(n - 2 * m + 1)]
+    return np.sqrt(sum(diffs) / (2 * len(diffs)))
+
+
+def check_definition():
+    rng = np.random.default_rng(0)
+    y = rng.normal(5.0, 0.3, size=(2000, 2)) + np.cumsum(rng.normal(0, 0.01, size=(2000, 2)), axis=0)
+    taus, adev = allan_deviation(y, 0.02)
+    for i, tau in enumerate(taus):
+        m = int(round(tau / 0.02))
+        for axis in range(2):
+            expected = _reference(y[:, axis], 0.02, m)
+            assert abs(adev[i, axis] - expected) < 1e-9 * expected, (m, axis)
+    print(f"definition ok: {len(taus)} taus match the direct sum")
+
+
+def check_noise_terms(hours):
+    rate, sigma, walk = 100.0, 0.05, 0.002  # Hz, white std, bias random walk /sqrt(s)
+    n = int(hours * 3600 * rate)
+    rng = np.random.default_rng(1)
+    white = rng.normal(0.0, sigma, size=(n, 3))
+    drift = np.cumsum(rng.normal(0.0, walk / np.sqrt(rate), size=(n, 3)), axis=0)
+
+    start = time.perf_counter()
+    taus, adev = allan_deviation(white + 9.81, 1 / rate)
+    elapsed = time.perf_counter() - start
+    theory = sigma * np.sqrt(1 / rate / taus)
+    tolerance = 3 / np.sqrt(n / rate / taus)  # ~3 sigma for n / m independent averages
+    assert np.all(np.abs(adev / theory[:, None] - 1) < tolerance[:, None])
+    for axis in range(3):
+        params = noise_parameters(taus, adev[:, axis])
+        assert abs(params['white'] / (sigma / np.sqrt(rate)) - 1) < 0.05, params
+
+    taus, adev = allan_deviation(white + drift, 1 / rate)
+    for axis in range(3):
+        params = noise_parameters(taus, adev[:, axis])
+        assert abs(params['white'] / (sigma / np.sqrt(rate)) - 1) < 0.05, params
+        assert abs(params['random_walk'] / walk - 1) < 0.35, params
+        assert params['minimum_found'], params
+    print(f"noise terms ok: white and random walk recovered from {hours:g} h "
+          f"({n} samples x 3 axes) at {rate:.0f} Hz; Allan deviation in {elapsed:.2f}s")
+    assert elapsed < 10.0
+
+
+def check_sim_capture(seconds=60.0):
+    filename = os.path.join(tempfile.mkdtemp(), 'capture.rec')
+    with redirect_stdout(io.StringIO()):
+        sim_devices.install()
+        clock.set_clock(clock.VirtualClock())
+        sim_devices.reset(seed=3)
+        recorder.start(filename)
+        try:
+            live = {sensor: capture(sensor, seconds) for sensor in ('imu', 'mag')}
+            paced = capture('imu', seconds, rate=50)
+        finally:
+            recorder.stop()
+            clock.set_clock(None)
+
+    imu = characterize('imu', *live['imu'])
+    mag = characterize('mag', *live['mag'])
+    read_time = sim_devices.I2C_LATENCY * sim_devices.IMU_READ_TRANSACTIONS
+    assert abs(imu['rate'] - 1 / read_time) < 1.0, imu['rate']
+    assert abs(imu['latency']['p50'] - read_time) < 1e-9, imu['latency']
+    assert abs(mag['rate'] - 1 / sim_devices.MAG_LATENCY) < 1.0, mag['rate']
+    assert abs(characterize('imu', *paced)['rate'] - 50) < 0.01
+    for summary, noise in ((imu, sim_devices.ACCEL_NOISE), (mag, sim_devices.MAG_NOISE)):
+        for axis, adev in summary['adev'].items():
+            if axis != 'tau':
+                assert abs(adev[0] / noise - 1) < 0.05, (axis, adev[0], noise)
+
+    # The recording gives the same curves (its times are taken after each read)
+    recorded = load_recording(filename)
+    again = characterize('mag', *recorded['mag'])
+    assert again['latency'] is None and abs(again['rate'] - mag['rate']) < 0.1
+    assert abs(again['axes']['mx']['white'] / mag['axes']['mx']['white'] - 1) < 0.01
+    print(f"sim capture ok: imu {imu['rate']:.0f} Hz ({imu['latency']['p50'] * 1000:.1f} ms "
+          f"reads), mag {mag['rate']:.0f} Hz, sample noise matches sim_devices; "
+          f"recording agrees")
+
+
+if __name__ == "__main__":
+    check_definition()
+    check_noise_terms(float(sys.argv[1]) if len(sys.argv) > 1 else 2.0)
+    check_sim_capture()
+    print("All characterization checks passed")
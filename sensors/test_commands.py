@@ -0,0 +1,134 @@
+# test_commands.py
+"""
+Check command parsing, then run RoverController on simulated devices
+(real time) with the command server on, retask it over UDP and TCP,
+and measure command-to-motor latency: emergency stop (handled on
+receipt) against pause (applied at the next tick).
+Usage: python3 test_commands.py [stops]
+"""
+import io
+import os
+import sys
+import json
+import time
+import socket
+import tempfile
+import threading
+from contextlib import redirect_stdout
+
+from commandserver import parse_command, send
+
+
+def check_parse():
+    assert parse_command(b'{"seq": 1, "cmd": "goto", "x": 5, "y": -2}') == \
+        {'seq': 1, 'cmd': 'goto', 'waypoints': [('xy', 5.0, -2.0)]}
+    command = parse_command(b'{"cmd": "mission", "waypoints": '
+                            b'[[1, 2], {"lat": 33.6, "lon": -117.6}, {"x": 3, "y": 4}]}')
+    assert command['seq'] is None
+    assert command['waypoints'] == [('xy', 1.0, 2.0), ('latlon', 33.6, -117.6), ('xy', 3.0, 4.0)]
+    for bad in (b'nope', b'[1]', b'{"cmd": "fly"}', b'{"cmd": "goto", "x": 1}',
+                b'{"cmd": "mission", "waypoints": []}', b'{"cmd": "mission", "waypoints": [5]}'):
+        try:
+            parse_command(bad)
+        except ValueError:
+            continue
+        raise AssertionError(bad)
+    print("parse ok")
+
+
+def _motors_on(pins):
+    return any(pin.value > 0 for pin in pins)
+
+
+def _wait(condition, timeout=3.0):
+    end = time.monotonic() + timeout
+    while not condition():
+        if time.monotonic() > end:
+            raise AssertionError("timed out")
+        time.sleep(0.001)
+
+
+def _latency(pins, command, port):
+    """Seconds from sending command until every PWM pin reads 0."""
+    with socket.socket(socket.AF_INET, socket.SOCK_DGRAM) as sock:
+        start = time.perf_counter()
+        sock.sendto(json.dumps(command).encode(), ('127.0.0.1', port))
+        while _motors_on(pins):
+            pass
+        latency = time.perf_counter() - start
+        sock.settimeout(2.0)
+        ack = json.loads(sock.recv(4096))
+    assert ack == {'seq': command['seq'], 'status': 'ok', **({'tick': ack['tick']}
+                                                            if 'tick' in ack else {})}
+    return latency
+
+
+def run_controller(stops):
+    import sim_devices
+    sim_devices.install()
+    import config
+    import motor_helper
+    config.LOG_ENABLED = False
+    config.WARM_START_ENABLED = False
+    config.COMMAND_ENABLED = True
+    config.COMMAND_HOST = '127.0.0.1'
+    config.COMMAND_UDP_PORT = 0
+    config.COMMAND_TCP_PORT = 0
+    directory = tempfile.mkdtemp()
+    config.STATE_FILE = os.path.join(directory, 'state.json')
+    config.TIMING_FILE = os.path.join(directory, 'loop_timing.json')
+    from main import RoverController
+
+    with redirect_stdout(io.StringIO()):
+        rover = RoverController()
+        rover.set_destination_xy(0, 1000)
+        runner = threading.Thread(target=rover.run)
+        runner.start()
+    server = rover.commands
+    udp, tcp = server.udp_port, server.tcp_port
+    motor_helper.driver.init()
+    pins = [sim_devices._pins[pwm] for pwm, _, _, _ in motor_helper.WHEELS.values()]
+
+    try:
+        # Retask over UDP and TCP; acks carry the tick that applied the command
+        with redirect_stdout(io.StringIO()):
+            ack = send({'seq': 1, 'cmd': 'goto', 'x': 20, 'y': 0}, port=udp)
+            assert ack['seq'] == 1 and ack['status'] == 'ok' and ack['tick'] > 0, ack
+            assert (rover.nav.dest_x, rover.nav.dest_y) == (20.0, 0.0)
+            ack = send({'seq': 2, 'cmd': 'mission', 'waypoints': [[0, 30], [30, 30]]},
+                       port=tcp, tcp=True)
+            assert ack['status'] == 'ok' and rover.nav.dest_y == 30.0 and len(rover.mission) == 1
+        ack = send({'seq': 3, 'cmd': 'fly'}, port=udp)
+        assert ack['status'] == 'error' and 'fly' in ack['error']
+        print(f"retask ok: queue latency {server.last_queue_latency * 1000:.1f} ms")
+
+        estop, pause = [], []
+        for i in range(stops):
+            for name, results in (('stop', estop), ('pause', pause)):
+                send({'seq': 100 + i, 'cmd': 'resume'}, port=udp)
+                _wait(lambda: _motors_on(pins))
+                time.sleep(0.005 * (i % 4))  # land at different points in the tick
+                results.append(_latency(pins, {'seq': 200 + i, 'cmd': name}, udp))
+                time.sleep(0.1)
+                assert not _motors_on(pins), "motors restarted while halted"
+        send({'seq': 300, 'cmd': 'resume'}, port=udp)
+        _wait(lambda: _motors_on(pins))
+        print("pause/resume ok: motors stay off until resume")
+    finally:
+        rover.running = False
+        with redirect_stdout(io.StringIO()):
+            runner.join()
+
+    for name, results in (('stop (on receipt)', estop), ('pause (next tick)', pause)):
+        results.sort()
+        print(f"{name:<18} command-to-motor latency: "
+              f"median {results[len(results) // 2] * 1000:6.2f} ms, "
+              f"max {results[-1] * 1000:6.2f} ms over {len(results)}")
+    assert estop[len(estop) // 2] < 0.002 and estop[-1] < pause[-1], (estop, pause)
+    return estop, pause
+
+
+if __name__ == "__main__":
+    check_parse()
+    run_controller(int(sys.argv[1]) if len(sys.argv) > 1 else 20)
+    print("All command channel checks passed")
@@ -0,0 +1,174 @@
+# test_i2cbus.py
+"""
+Check the shared I2C bus manager on a FakeBus with per-transaction
+latency: the MPU6050 driver's burst reads, retries, IMU and magnetometer
+threads sharing the bus with and without the manager (overlapping
+transactions, utilization, lock wait), and back-to-back grouped reads
+while another thread keeps the bus busy.
+Usage: python3 test_i2cbus.py [seconds]
+"""
+import sys
+import time
+import struct
+import threading
+
+from i2cbus import I2CBus, FakeBus, SharedDevice
+from mpu6050 import mpu6050
+
+IMU_ADDRESS = 0x68
+MAG_ADDRESS = 0x13
+OTHER_ADDRESS = 0x50  # some other device on the bus
+
+
+class FakeBMM150:
+    """Like the bmm150 library: its own handle, a status byte then 8 data bytes."""
+
+    def __init__(self, handle):
+        self.handle = handle
+
+    def read_mag_data(self):
+        self.handle.read_byte_data(MAG_ADDRESS, 0x48)
+        data = self.handle.read_i2c_block_data(MAG_ADDRESS, 0x42, 8)
+        x, y, z, _ = struct.unpack('<hhhh', bytes(data))
+        return x / 16.0, y / 16.0, z / 16.0
+
+
+def _fake_bus(**kwargs):
+    fake = FakeBus(**kwargs)
+    regs = fake.regs(IMU_ADDRESS)
+    regs[0x3B:0x41] = struct.pack('>hhh', 16384, -8192, 1000)  # accel, +-2 g range
+    regs[0x43:0x49] = struct.pack('>hhh', 131, -262, 0)  # gyro, +-250 deg/s range
+    fake.regs(MAG_ADDRESS)[0x42:0x4A] = struct.pack('<hhhh', 480, -160, 800, 0)
+    return fake
+
+
+def check_driver():
+    fake = _fake_bus()
+    imu = mpu6050(IMU_ADDRESS, bus=I2CBus(fake))
+    imu.get_accel_data()  # first reads fetch the range registers
+    imu.get_gyro_data()
+    before = len(fake.log)
+    accel = imu.get_accel_data()
+    gyro = imu.get_gyro_data()
+    assert len(fake.log) - before == 2, "one burst per read once the range is known"
+    assert abs(accel['x'] - 9.80665) < 1e-9 and abs(accel['y'] + 4.903325) < 1e-9, accel
+    assert gyro == {'x': 1.0, 'y': -2.0, 'z': 0.0}, gyro
+
+    imu.set_accel_range(imu.ACCEL_RANGE_4G)
+    assert abs(imu.get_accel_data(g=True)['x'] - 2.0) < 1e-9, "cached range follows set"
+    _, start, end = fake.log[-1]
+    print(f"driver ok: accel read is 1 transaction ({(end - start) * 1e6:.0f} us on a "
+          f"100 kHz bus) instead of 7 byte reads")
+
+
+def check_retries():
+    fake = _fake_bus(error_rate=0.3, seed=1)
+    bus = I2CBus(fake, retries=5, retry_delay=0.0)
+    imu = mpu6050(IMU_ADDRESS, bus=bus)
+    for _ in range(100):
+        assert abs(imu.get_accel_data()['x'] - 9.80665) < 1e-9
+    stats = bus.stats()
+    assert stats['errors'] == stats['retries'] > 0 and stats['failures'] == 0, stats
+
+    fake.error_rate = 1.0
+    try:
+        imu.get_accel_data()
+    except OSError:
+        pass
+    else:
+        raise AssertionError("read succeeded on a dead bus")
+    stats = bus.stats()
+    assert stats['failures'] == 1, stats
+    print(f"retries ok: {stats['retries']} retries over {stats['transactions']} transactions "
+          f"at 30% errors, failure raised after {bus.retries} retries")
+
+
+def _loop(read, rate_hz, seconds, latencies):
+    period = 1.0 / rate_hz
+    next_due = time.perf_counter()
+    end = next_due + seconds
+    while next_due < end:
+        start = time.perf_counter()
+        read()
+        latencies.append(time.perf_counter() - start)
+        next_due += period
+        time.sleep(max(0.0, next_due - time.perf_counter()))
+
+
+def _share(managed, seconds):
+    """IMU at 200 Hz and magnetometer at 100 Hz on their own threads."""
+    fake = _fake_bus()
+    bus = I2CBus(fake)
+    imu = mpu6050(IMU_ADDRESS, bus=bus if managed else fake)
+    mag = FakeBMM150(fake)
+    if managed:
+        mag = SharedDevice(mag, bus, ['read_mag_data'])
+    imu_latency, mag_latency = [], []
+    threads = [threading.Thread(target=_loop, args=(imu.get_accel_data, 200, seconds, imu_latency)),
+               threading.Thread(target=_loop, args=(mag.read_mag_data, 100, seconds, mag_latency))]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    return fake, bus, imu_latency, mag_latency
+
+
+def check_threads(seconds):
+    fake, _, _, _ = _share(False, seconds)
+    unmanaged = fake.collisions
+    fake, bus, imu_latency, mag_latency = _share(True, seconds)
+    stats = bus.stats()
+    assert fake.collisions == 0, fake.collisions
+    # The magnetometer library's own transfers run inside its holds, uncounted
+    assert stats['transactions'] == sum(a == IMU_ADDRESS for a, _, _ in fake.log), stats
+    imu_latency.sort()
+    mag_latency.sort()
+    print(f"threads ok: {unmanaged} overlapping transactions without the manager, 0 with it")
+    print(f"  utilization {stats['utilization'] * 100:.1f}%, "
+          f"{stats['transactions']} transactions, max lock wait {stats['max_wait'] * 1e3:.2f} ms")
+    print(f"  read latency p50/max: imu {imu_latency[len(imu_latency) // 2] * 1e3:.2f}/"
+          f"{imu_latency[-1] * 1e3:.2f} ms, mag {mag_latency[len(mag_latency) // 2] * 1e3:.2f}/"
+          f"{mag_latency[-1] * 1e3:.2f} ms")
+
+
+def check_back_to_back(reads=50):
+    """Grouped IMU + magnetometer reads while another thread hammers the bus."""
+    fake = _fake_bus()
+    bus = I2CBus(fake)
+    imu = mpu6050(IMU_ADDRESS, bus=bus)
+    mag = SharedDevice(FakeBMM150(fake), bus, ['read_mag_data'])
+    imu.get_accel_data()
+    done = threading.Event()
+
+    def other():
+        while not done.is_set():
+            bus.read_byte_data(OTHER_ADDRESS, 0)
+
+    thread = threading.Thread(target=other)
+    thread.start()
+    gaps = []
+    try:
+        for _ in range(reads):
+            with bus.transaction():
+                first = len(fake.log)
+                imu.get_accel_data()
+                mag.read_mag_data()
+                group = fake.log[first:]
+            assert [a for a, _, _ in group] == [IMU_ADDRESS, MAG_ADDRESS, MAG_ADDRESS], group
+            gaps.append(group[1][1] - group[0][2])
+            time.sleep(0.002)
+    finally:
+        done.set()
+        thread.join()
+    gaps.sort()
+    assert any(a == OTHER_ADDRESS for a, _, _ in fake.log)
+    print(f"back-to-back ok: IMU then magnetometer with no other transaction between, "
+          f"gap p50 {gaps[len(gaps) // 2] * 1e6:.0f} us")
+
+
+if __name__ == "__main__":
+    check_driver()
+    check_retries()
+    check_threads(float(sys.argv[1]) if len(sys.argv) > 1 else 1.0)
+    check_back_to_back()
+    print("All I2C bus checks passed")
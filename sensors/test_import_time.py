@@ -0,0 +1,62 @@
+# test_import_time.py
+"""
+Import-time budget check for the modules offline tools depend on.
+Each import runs in a fresh interpreter with -X importtime; the check
+fails if it takes longer than its budget or loads a hardware library.
+Usage: python3 test_import_time.py
+"""
+import os
+import sys
+import subprocess
+
+# Cumulative import time budgets (ms), best of RUNS
+BUDGETS_MS = {
+    'navigation': 50,
+    'coordinate_transform': 20,
+    'analyze': 400,  # numpy dominates; mostly here for the hardware check
+}
+RUNS = 3
+
+# Must only be imported when a device is actually used
+HARDWARE_MODULES = ('smbus', 'bmm150', 'gpsd', 'gpiozero', 'requests', 'mpu6050')
+
+HERE = os.path.dirname(os.path.abspath(__file__))
+
+
+def measure_import(module):
+    """Return (cumulative import time in ms, hardware modules loaded)."""
+    code = (f"import sys, {module}; "
+            f"print(','.join(m for m in {HARDWARE_MODULES!r} if m in sys.modules))")
+    result = subprocess.run(
+        [sys.executable, '-X', 'importtime', '-c', code],
+        cwd=HERE, capture_output=True, text=True, check=True)
+
+    # stderr lines: "import time: self [us] | cumulative | imported package"
+    cumulative_us = None
+    for line in result.stderr.splitlines():
+        parts = line.split('|')
+        if len(parts) == 3 and parts[2].strip() == module:
+            cumulative_us = int(parts[1])
+
+    loaded = [m for m in result.stdout.strip().split(',') if m]
+    return cumulative_us / 1000, loaded
+
+
+def check_budget(module, budget_ms):
+    times, loaded = [], []
+    for _ in range(RUNS):
+        ms, loaded = measure_import(module)
+        times.append(ms)
+    best = min(times)
+
+    ok = best <= budget_ms and not loaded
+    status = "ok" if ok else "FAIL"
+    print(f"{status:<4} import {module:<22} {best:6.1f}ms (budget {budget_ms}ms)")
+    if loaded:
+        print(f"     hardware modules loaded at import: {', '.join(loaded)}")
+    return ok
+
+
+if __name__ == "__main__":
+    results = [check_budget(m, b) for m, b in BUDGETS_MS.items()]
+    sys.exit(0 if all(results) else 1)
@@ -0,0 +1,97 @@
+# test_kinematics.py
+"""
+Check DiffDrive and wheel calibration against the simulated plant, with
+every wheel given its own deadband and gain: calibrate on a virtual
+clock, then compare the (v, omega) the plant actually reaches for
+calibrated and nominal tables. Also times the per-tick conversion.
+Usage: python3 test_kinematics.py
+"""
+import time
+import clock
+import sim_devices
+import kinematics
+import motor_helper
+from kinematics import DiffDrive
+
+# Deliberately mismatched wheels: (deadband, gain)
+RESPONSE = {'lf': (0.15, 0.9), 'lb': (0.10, 1.0), 'rf': (0.20, 1.1), 'rb': (0.12, 0.8)}
+
+COMMANDS = [(0.2, 0.0), (0.3, 20.0), (0.15, -30.0), (0.0, 45.0), (0.1, 0.0)]
+
+
+def measure(drive, v, omega):
+    """Plant speed and yaw rate after driving (v, omega) until settled."""
+    drive.drive(v, omega)
+    clock.sleep(2.0)  # > 5 motor time constants
+    plant = sim_devices.plant
+    plant.advance()
+    return plant.v, plant.yaw_rate
+
+
+def errors(drive):
+    worst_v = worst_w = 0.0
+    for v, omega in COMMANDS:
+        got_v, got_w = measure(drive, v, omega)
+        worst_v = max(worst_v, abs(got_v - v))
+        worst_w = max(worst_w, abs(got_w - omega))
+    drive.stop()
+    return worst_v, worst_w
+
+
+def check_fit():
+    """Reversed wheel and deadband recovered from clean data."""
+    levels = kinematics.CAL_LEVELS
+    speeds = [-0.5 * max(0.0, p - 0.25) / 0.75 for p in levels]
+    fit = kinematics._fit_wheel(levels, speeds)
+    assert fit['polarity'] == -1
+    assert abs(fit['deadband'] - 0.25) < 1e-6, fit['deadband']
+    assert abs(fit['gain'] - 0.5 / 0.75) < 1e-3
+    drive = DiffDrive({'track_width': 0.25, 'wheels': dict.fromkeys(motor_helper.WHEELS, fit)},
+                      driver=motor_helper.MotorDriver(create=lambda kind, pin: None))
+    direction, pwm = drive.wheel_pwm('lf', 0.25)
+    assert direction == 'backward' and abs(pwm - (0.25 + 0.25 / (0.5 / 0.75))) < 1e-3
+    assert drive.wheel_pwm('lf', 0.0) == ('stop', 0)
+    print("fit ok: polarity, deadband and gain recovered")
+
+
+def check_sim():
+    saved = dict(sim_devices.WHEEL_RESPONSE)
+    sim_devices.WHEEL_RESPONSE.update(RESPONSE)
+    sim_devices.install()
+    clock.set_clock(clock.VirtualClock())
+    sim_devices.reset(seed=1)
+    kinematics.print = lambda *args, **kwargs: None  # quiet calibration progress
+    try:
+        calibration = kinematics.calibrate()
+        for wheel, (deadband, _) in RESPONSE.items():
+            fit = calibration['wheels'][wheel]
+            assert fit['polarity'] == 1
+            assert abs(fit['deadband'] - deadband) < 0.05, (wheel, fit['deadband'])
+
+        nominal_v, nominal_w = errors(DiffDrive(kinematics.nominal_calibration()))
+        calibrated_v, calibrated_w = errors(DiffDrive(calibration))
+    finally:
+        del kinematics.print
+        clock.set_clock(None)
+        sim_devices.WHEEL_RESPONSE.update(saved)
+    print(f"worst error nominal:    {nominal_v:.3f} m/s  {nominal_w:5.1f} deg/s")
+    print(f"worst error calibrated: {calibrated_v:.3f} m/s  {calibrated_w:5.1f} deg/s")
+    assert calibrated_v < 0.02 and calibrated_w < 3.0
+    assert calibrated_v < nominal_v and calibrated_w < nominal_w
+    return calibration
+
+
+def bench(calibration, n=100000):
+    drive = DiffDrive(calibration)
+    start = time.perf_counter()
+    for i in range(n):
+        drive.pwms(0.3, (i % 90) - 45.0)
+    per_call = (time.perf_counter() - start) / n
+    print(f"pwms(v, omega): {per_call * 1e6:.2f} us per call")
+
+
+if __name__ == "__main__":
+    check_fit()
+    calibration = check_sim()
+    bench(calibration)
+    print("All kinematics checks passed")
@@ -0,0 +1,115 @@
+# test_log_segments.py
+"""
+Check segmented logs: rotation, time-range reads through the block index,
+and recovery of a last segment cut short by a crash at every kind of
+boundary (inside a block header, inside block data, inside the footer).
+Usage: python3 test_log_segments.py
+"""
+import os
+import shutil
+import tempfile
+
+import numpy as np
+
+import binlog
+import logsegments
+from logsegments import SegmentedLogWriter, BLOCK, FOOTER
+
+RATE = 50  # records per second of log time
+
+
+def write_run(directory, records, **kwargs):
+    writer = SegmentedLogWriter(directory, 'test', 1.7e9, **kwargs)
+    for i in range(records):
+        t = i / RATE
+        writer.write(t, 33.6 + i * 1e-7 if i % 50 == 0 else None, None,
+                     float(i), 2.0 * i, 0.5, 0.1, 0.01, 0.02, 9.8, 0.0, 0.0,
+                     i % 360, 90.0, -5.0, 100 - t, 'forward')
+    writer.close()
+    return writer
+
+
+def check_complete_run(directory):
+    writer = write_run(directory, 20000, max_bytes=60_000, sync_records=500)
+    assert len(writer.segments) > 2, "expected rotation into several segments"
+
+    header, records = logsegments.read_range(writer.segments)
+    assert len(records) == 20000
+    assert np.array_equal(records['x_calc'], np.arange(20000, dtype=np.float32))
+    assert np.isnan(records['lat'][1]) and not np.isnan(records['lat'][0])
+
+    # Time range: only the overlapping blocks get decompressed
+    blocks = list(logsegments.read_blocks(writer.segments[1], 0, 10))
+    assert blocks == [], "segment 1 starts after 10s"
+    _, part = logsegments.read_range(writer.segments, 100.0, 110.0)
+    assert part['timestamp'][0] == 100.0 and part['timestamp'][-1] == 110.0
+    assert len(part) == 10 * RATE + 1
+
+    rows = list(logsegments.iter_range(writer.segments, 100.0, 100.1))
+    assert [r['x_calc'] for r in rows] == [5000.0, 5001.0, 5002.0, 5003.0, 5004.0, 5005.0]
+    assert rows[0]['lon'] is None and rows[0]['motor_command'] == 'forward'
+    print(f"complete run: {len(writer.segments)} segments, range reads ok")
+    return writer
+
+
+def check_truncation(directory, source):
+    """Cut the last segment at many points; every complete block must survive."""
+    last = source.segments[-1]
+    with open(last, 'rb') as f:
+        data = f.read()
+    _, index, complete = logsegments.segment_index(last)
+    assert complete
+    index_offset = len(data) - FOOTER.size - len(index) * logsegments.INDEX_ENTRY.size
+    earlier = sum(len(logsegments.read_range([s])[1]) for s in source.segments[:-1])
+
+    cuts = set()
+    for offset, _, _, _ in index:
+        cuts.update({offset, offset + 3, offset + BLOCK.size, offset + BLOCK.size + 10})
+    cuts.update({index_offset, index_offset + 5, len(data) - 1})
+
+    for cut in sorted(cuts):
+        name = os.path.join(directory, 'cut.seg')
+        with open(name, 'wb') as f:
+            f.write(data[:cut])
+        # Blocks that end at or before the cut are complete
+        expected = sum(records for offset, _, _, records in index
+                       if offset + BLOCK.size + _block_length(data, offset) <= cut)
+
+        _, records = logsegments.read_range([name])
+        assert len(records) == expected, (cut, len(records), expected)
+
+        kept = logsegments.repair(name)
+        assert kept is not None, "truncated segment should need repair"
+        assert logsegments.segment_index(name)[2], "footer missing after repair"
+        assert len(logsegments.read_range([name])[1]) == expected
+        assert logsegments.repair(name) is None, "second repair should be a no-op"
+
+        _, all_records = logsegments.read_range(source.segments[:-1] + [name])
+        assert len(all_records) == earlier + expected
+    print(f"truncation: {len(cuts)} cut points recovered")
+
+
+def _block_length(data, offset):
+    return BLOCK.unpack_from(data, offset)[0]
+
+
+def check_csv(directory, source):
+    name = os.path.join(directory, 'out.csv')
+    header = logsegments.segment_index(source.segments[0])[0]
+    rows = binlog.write_csv(header['start_time'],
+                            logsegments.iter_range(source.segments, 0, 1), name)
+    assert rows == RATE + 1
+    with open(name) as f:
+        assert f.readline().startswith('timestamp,datetime,lat,lon')
+    print("csv export ok")
+
+
+if __name__ == "__main__":
+    directory = tempfile.mkdtemp()
+    try:
+        run = check_complete_run(directory)
+        check_truncation(directory, run)
+        check_csv(directory, run)
+        print("All segment log checks passed")
+    finally:
+        shutil.rmtree(directory)
@@ -0,0 +1,129 @@
+# test_looptiming.py
+"""
+Check the loop timing histograms against exact percentiles, measure the
+cost of instrumenting a tick, check the periodic dump is written off the
+loop thread, and run RoverController on simulated
+devices for a few seconds to show a per-stage dump.
+Usage: python3 test_looptiming.py [seconds]
+"""
+import io
+import os
+import sys
+import json
+import time
+import random
+import shutil
+import tempfile
+import threading
+from contextlib import redirect_stdout
+
+import looptiming
+from looptiming import Histogram, LoopTimer, bucket_index, bucket_high
+
+
+def check_buckets():
+    """Every value lands in a bucket whose range contains it, within 1.6%."""
+    for value in list(range(0, 5000)) + [random.randrange(1, 1 << 39) for _ in range(20000)]:
+        index = bucket_index(value)
+        high = bucket_high(index)
+        low = bucket_high(index - 1) + 1 if index else 0
+        assert low <= value <= high, (value, low, high)
+        assert high - low <= max(1, value * 2 / looptiming._SUB), (value, low, high)
+    print(f"buckets ok: {looptiming.BUCKETS} per histogram")
+
+
+def check_percentiles():
+    rng = random.Random(7)
+    values = [int(rng.lognormvariate(11, 1.2)) for _ in range(100000)]  # ~60 us median
+    hist = Histogram()
+    for v in values:
+        hist.record(v)
+    values.sort()
+    for p in (50, 90, 99, 99.9):
+        exact = values[max(0, round(len(values) * p / 100) - 1)]
+        got = hist.percentile(p)
+        assert exact <= got <= exact * 1.02, (p, exact, got)
+    assert hist.max == values[-1] and hist.percentile(100) == values[-1]
+    print("percentiles ok: within 2% of exact")
+
+
+def bench_overhead(ticks=200000):
+    """Cost of start + 8 marks + end, against an empty loop."""
+    stages = looptiming.STAGES[:8]
+    timer = LoopTimer()
+    start = time.perf_counter()
+    for _ in range(ticks):
+        timer.start()
+        for stage in stages:
+            timer.mark(stage)
+        timer.end()
+    instrumented = time.perf_counter() - start
+
+    start = time.perf_counter()
+    for _ in range(ticks):
+        for stage in stages:
+            pass
+    empty = time.perf_counter() - start
+    per_tick = (instrumented - empty) / ticks
+    print(f"overhead: {per_tick * 1e6:.1f} us per tick with 8 stages "
+          f"({per_tick * 50 * 100:.3f}% of a core at 50 Hz)")
+    return per_tick
+
+
+def check_background_dump():
+    """end() never writes the file; the dump thread does, on its interval."""
+    directory = tempfile.mkdtemp()
+    filename = os.path.join(directory, 'loop_timing.json')
+    timer = LoopTimer(filename=filename, dump_interval=0.05)
+    writers = []
+    dump = timer.dump
+    timer.dump = lambda *a: writers.append(threading.current_thread()) or dump(*a)
+    try:
+        for _ in range(20):
+            timer.start()
+            timer.mark('mag')
+            timer.end()
+            time.sleep(0.01)
+    finally:
+        timer.close()
+    with open(filename) as f:
+        assert json.load(f)['ticks'] > 0
+    shutil.rmtree(directory)
+    assert writers and threading.main_thread() not in writers, writers
+    print(f"background dump ok: {len(writers)} dumps, none on the loop thread")
+
+
+def run_controller(seconds):
+    import sim_devices
+    sim_devices.install()
+    import config
+    config.LOG_ENABLED = True
+    config.LOG_FORMAT = 'binary'
+    config.DEBUG_PRINT_NAVIGATION = False
+    config.WARM_START_ENABLED = False
+    directory = tempfile.mkdtemp()
+    config.LOG_BINARY_FILE = os.path.join(directory, 'log.bin')
+    config.STATE_FILE = os.path.join(directory, 'state.json')
+    config.TIMING_FILE = os.path.join(directory, 'loop_timing.json')
+    config.TIMING_DUMP_INTERVAL = 1.0
+    from main import RoverController
+
+    with redirect_stdout(io.StringIO()):
+        rover = RoverController()
+        rover.set_destination_xy(0, 1000)
+        threading.Timer(seconds, lambda: setattr(rover, 'running', False)).start()
+        rover.run()
+    with open(config.TIMING_FILE) as f:
+        summary = json.load(f)
+    shutil.rmtree(directory)
+    print(looptiming.format_summary(summary))
+    assert summary['ticks'] > 0 and 'mag' in summary['stages']
+
+
+if __name__ == "__main__":
+    check_buckets()
+    check_percentiles()
+    bench_overhead()
+    check_background_dump()
+    run_controller(float(sys.argv[1]) if len(sys.argv) > 1 else 3.0)
+    print("All loop timing checks passed")
@@ -35,3 +35,6 @@ report("mz", mz_vals)
 
 print("\nHeading stability:")
 report("heading (deg)", headings)
+
+print("\nFor read rate, latency and Allan deviation over a long run:")
+print("  python3 characterize.py mag --seconds 600")
@@ -0,0 +1,132 @@
+# test_maneuver.py
+"""
+Check the maneuver executor: step timing and ramps on a virtual clock,
+then on the real timer thread that submit() returns at once, preemption
+takes over immediately, an unrenewed maneuver always ends in a stop, and
+halt() keeps the motors stopped until release().
+Usage: python3 test_maneuver.py
+"""
+import time
+import clock
+from maneuver import ManeuverExecutor
+
+
+class FakeMotors:
+    """Records (clock time, command, speed) for every motor call."""
+
+    def __init__(self):
+        self.calls = []
+
+    def _record(self, command, speed):
+        self.calls.append((clock.monotonic(), command, speed))
+
+    def forward(self, speed=1.0):
+        self._record('forward', speed)
+
+    def backward(self, speed=1.0):
+        self._record('backward', speed)
+
+    def turn_left(self, speed=1.0):
+        self._record('turn_left', speed)
+
+    def turn_right(self, speed=1.0):
+        self._record('turn_right', speed)
+
+    def stop(self):
+        self._record('stop', 0)
+
+    def last(self):
+        return self.calls[-1][1:]
+
+
+def check_virtual_steps():
+    virtual = clock.VirtualClock()
+    clock.set_clock(virtual)
+    try:
+        motors = FakeMotors()
+        executor = ManeuverExecutor(motors, ramp=0.1, threaded=False)
+        turn = executor.submit('turn_left', [('turn_left', 1.0, 0.4), ('stop', 0, 0.1)])
+        assert motors.last() == ('turn_left', 0.0), "ramp starts from standstill"
+
+        virtual.sleep(0.05)
+        executor.update()
+        assert motors.last() == ('turn_left', 0.5), motors.last()
+        virtual.sleep(0.1)
+        executor.update()
+        assert motors.last() == ('turn_left', 1.0)
+
+        virtual.sleep(0.3)  # t = 0.45: settle step
+        executor.update()
+        assert motors.last()[0] == 'stop' and executor.busy('turn_left')
+        virtual.sleep(0.1)  # t = 0.55: done
+        assert executor.update() is None
+        assert turn.status == 'done' and not executor.busy()
+        assert executor.stats()['timeouts'] == 0, "ending in a settle stop is no timeout"
+
+        # forward held every tick: ramp continues across renewals, no restarts
+        for _ in range(10):
+            executor.hold('forward', 0.6, 0.5)
+            virtual.sleep(0.02)
+            executor.update()
+        assert motors.last() == ('forward', 0.6)
+        assert executor.stats()['submitted'] == 2
+
+        # loop stalls: forward is not renewed and the motors stop
+        virtual.sleep(0.6)
+        executor.update()
+        assert motors.last()[0] == 'stop' and executor.stats()['timeouts'] == 1
+        print("virtual clock steps, ramps and hold ok")
+    finally:
+        clock.set_clock(None)
+
+
+def check_threaded():
+    motors = FakeMotors()
+    executor = ManeuverExecutor(motors, ramp=0.05, rate=100)
+    assert executor.threaded
+
+    start = time.monotonic()
+    turn = executor.submit('turn_right', [('turn_right', 1.0, 0.3), ('stop', 0, 0.1)])
+    assert time.monotonic() - start < 0.01, "submit must not block"
+
+    time.sleep(0.1)
+    forward = executor.submit('forward', [('forward', 0.8, 0.2)])  # preempt the turn
+    assert turn.status == 'preempted' and turn.done.is_set()
+    assert motors.last()[0] == 'forward', "preempting maneuver takes over at once"
+
+    # Nobody renews forward: guaranteed stop once its duration is up
+    assert forward.wait(timeout=1.0), "maneuver never finished"
+    stopped_at, command, _ = motors.calls[-1]
+    assert command == 'stop'
+    late = stopped_at - (forward.step_start + 0.2)
+    assert late < 0.05, f"stop issued {late * 1000:.0f}ms late"
+    assert max(speed for _, c, speed in motors.calls if c == 'forward') == 0.8
+
+    executor.submit('forward', [('forward', 1.0, 10.0)])
+    executor.close()
+    assert motors.last()[0] == 'stop', "close must stop the motors"
+    print(f"threaded: preemption ok, stop {late * 1000:.1f}ms after the deadline")
+
+
+def check_halt():
+    """halt() stops at once; nothing restarts the motors until release()."""
+    motors = FakeMotors()
+    executor = ManeuverExecutor(motors, ramp=0.0, threaded=True)
+    executor.hold('forward', 0.6, 1.0)
+    executor.halt()
+    assert motors.last()[0] == 'stop'
+    assert executor.hold('forward', 0.6, 1.0) is None
+    assert executor.submit('turn_left', [('turn_left', 1.0, 0.4)]) is None
+    assert motors.last()[0] == 'stop' and executor.stats()['refused'] == 2
+    executor.release()
+    executor.hold('forward', 0.6, 1.0)
+    assert motors.last() == ('forward', 0.6)
+    executor.close()
+    print("halt ok: maneuvers refused until release")
+
+
+if __name__ == "__main__":
+    check_virtual_steps()
+    check_threaded()
+    check_halt()
+    print("All maneuver checks passed")
@@ -0,0 +1,141 @@
+# test_motor_driver.py
+"""
+Check MotorDriver against gpiozero's mock pin factory (no hardware):
+pin levels per wheel match the L298N wiring, repeated commands issue no
+GPIO operations, and the off-before-on order never brakes a wheel.
+Skipped when gpiozero isn't installed.
+Usage: python3 test_motor_driver.py
+"""
+import sys
+
+try:
+    import gpiozero
+    from gpiozero.pins.mock import MockFactory, MockPWMPin
+except ImportError:
+    print("Skipped: gpiozero not installed (pip3 install gpiozero)")
+    sys.exit(0)
+
+import config
+config.HARDWARE_BACKEND = 'real'
+
+import motor_helper
+from motor_helper import MotorDriver, WHEELS
+
+gpiozero.Device.pin_factory = MockFactory(pin_class=MockPWMPin)
+
+
+def pin_writes():
+    """State changes recorded by the mock pins (excluding their initial state)."""
+    factory = gpiozero.Device.pin_factory
+    return sum(len(factory.pin(pin).states) - 1
+               for wheel in WHEELS.values() for pin in wheel[:3])
+
+
+def signed_speed(driver, wheel):
+    """Wheel command as the motor sees it: direction from the pins times PWM."""
+    pwm, in1, in2 = driver.pins[wheel]
+    polarity = driver.wheels[wheel][3]
+    assert not (in1.value and in2.value), f"{wheel}: both inputs high"
+    return (in1.value - in2.value) * polarity * pwm.value
+
+
+def check_levels():
+    driver = motor_helper.driver
+    motor_helper.forward(0.5)
+    assert all(signed_speed(driver, wheel) == 0.5 for wheel in WHEELS)
+    motor_helper.turn_left(1.0)
+    assert signed_speed(driver, 'lf') == signed_speed(driver, 'lb') == -0.3
+    assert signed_speed(driver, 'rf') == signed_speed(driver, 'rb') == 0.3
+    motor_helper.turn_right(1.0)
+    assert signed_speed(driver, 'lf') == 0.3 and signed_speed(driver, 'rf') == -0.4
+    motor_helper.backward(0.7)
+    assert all(signed_speed(driver, wheel) == -0.7 for wheel in WHEELS)
+    motor_helper.steer(0.2, -0.6)
+    assert signed_speed(driver, 'lb') == 0.2 and signed_speed(driver, 'rb') == -0.6
+    motor_helper.stop()
+    assert all(signed_speed(driver, wheel) == 0 for wheel in WHEELS)
+    for wheel in WHEELS:
+        _, in1, in2 = driver.pins[wheel]
+        assert in1.value == in2.value == 0, f"{wheel} should coast"
+    print("pin levels ok")
+
+
+class _Logged:
+    """Digital output that appends (pin, level) to a shared list on every write."""
+
+    def __init__(self, device, events):
+        self.device = device
+        self.events = events
+
+    def on(self):
+        self.device.on()
+        self.events.append((self.device.pin.number, 1))
+
+    def off(self):
+        self.device.off()
+        self.events.append((self.device.pin.number, 0))
+
+
+def check_no_brake_on_reverse():
+    """Reversing a wheel must never drive in1 and in2 high together."""
+    events = []
+
+    def create(kind, pin):
+        device = motor_helper.backends.create(kind, pin)
+        return _Logged(device, events) if kind == 'digital_output' else device
+
+    driver = MotorDriver(create=create)
+    for first, second in (("forward", "backward"), ("backward", "forward")):
+        driver.command({wheel: (first, 1.0) for wheel in WHEELS})
+        driver.command({wheel: (second, 1.0) for wheel in WHEELS})
+    levels = {}
+    for pin, level in events:
+        levels[pin] = level
+        for _, in1, in2, _ in WHEELS.values():
+            assert not (levels.get(in1) and levels.get(in2)), \
+                f"pins {in1}/{in2} both high"
+    print("reverse order ok")
+
+
+def check_diffing():
+    driver = motor_helper.driver
+    motor_helper.stop()
+    before, issued = pin_writes(), dict(driver.stats())
+
+    motor_helper.forward(0.6)
+    first = pin_writes() - before
+    for _ in range(1000):
+        motor_helper.forward(0.6)
+    assert pin_writes() - before == first, "repeated forward() touched pins"
+    assert driver.stats()['skipped'] - issued['skipped'] >= 1000 * 12
+
+    motor_helper.forward(0.8)  # speed change: PWM only
+    assert pin_writes() - before == first + 4
+    issued_now = driver.stats()
+    assert issued_now['digital_writes'] + issued_now['pwm_writes'] \
+        - issued['digital_writes'] - issued['pwm_writes'] == first + 4
+    print(f"diffing ok: stop -> forward {first} writes, 1000 repeats 0, "
+          f"speed change 4")
+
+
+def check_invalidate():
+    driver = MotorDriver()
+    driver.init()
+    driver.command({wheel: ("stop", 0) for wheel in WHEELS})
+    assert driver.stats()['digital_writes'] == 8 and driver.stats()['pwm_writes'] == 4
+    driver.command({wheel: ("stop", 0) for wheel in WHEELS})
+    assert driver.stats()['digital_writes'] == 8
+    driver.invalidate()
+    driver.command({wheel: ("stop", 0) for wheel in WHEELS})
+    assert driver.stats()['digital_writes'] == 16 and driver.stats()['pwm_writes'] == 8
+    print("invalidate ok")
+
+
+if __name__ == "__main__":
+    check_levels()
+    check_diffing()
+    gpiozero.Device.pin_factory.reset()  # release the pins for fresh drivers
+    check_no_brake_on_reverse()
+    gpiozero.Device.pin_factory.reset()
+    check_invalidate()
+    print("All motor driver checks passed")
@@ -0,0 +1,145 @@
+# test_navigation_timing.py
+"""
+Check that the navigator integrates on sample acquisition times (read
+latency, wall-clock jumps and repeated samples don't change the result),
+that a delayed GPS fix is carried forward to the present, and compare
+simulated missions with a lagging GPS receiver with and without the
+state history. A seeded mission must repeat exactly.
+Usage: python3 test_navigation_timing.py [missions]
+"""
+import io
+import sys
+import random
+from contextlib import redirect_stdout
+
+import clock
+import config
+from navigation import Navigator
+
+RATE = 50
+ACCEL = 0.5  # m/s^2 forward (north at heading 0), after bias removal
+
+
+def _accel():
+    return (ACCEL + config.ACCEL_BIAS_X, config.ACCEL_BIAS_Y, 9.81)
+
+
+def _drive(nav, virtual, seconds, delay=None):
+    """
+    Feed samples taken every 1/RATE s; each reaches the navigator delay()
+    seconds after it was taken (I2C transfer, scheduling).
+    """
+    start = virtual.monotonic()
+    for i in range(int(seconds * RATE)):
+        t = start + i / RATE
+        virtual.t = t + (delay() if delay else 0.0)
+        nav.update_position(_accel(), 0.0, t)
+    virtual.t = start + int(seconds * RATE) / RATE
+
+
+def check_sample_times():
+    saved = config.VELOCITY_DECAY_FACTOR
+    config.VELOCITY_DECAY_FACTOR = 1.0  # exact kinematics to compare against
+    try:
+        results = []
+        for case in ('ideal', 'latency', 'clock jump'):
+            virtual = clock.VirtualClock()
+            clock.set_clock(virtual)
+            with redirect_stdout(io.StringIO()):
+                nav = Navigator()
+            rng = random.Random(3)
+            if case == 'ideal':
+                _drive(nav, virtual, 2.0)
+            elif case == 'latency':
+                _drive(nav, virtual, 2.0, delay=lambda: rng.uniform(0.002, 0.015))
+            else:
+                _drive(nav, virtual, 1.0)
+                virtual.epoch -= 3600  # NTP / GPS time set steps the wall clock back
+                _drive(nav, virtual, 1.0)
+            results.append((case, nav.y))
+            clock.set_clock(None)
+        ideal = results[0][1]
+        for case, y in results:
+            assert abs(y - ideal) < 1e-9, (case, y, ideal)
+
+        # The same sample delivered twice adds nothing
+        virtual = clock.VirtualClock()
+        clock.set_clock(virtual)
+        with redirect_stdout(io.StringIO()):
+            nav = Navigator()
+        nav.update_position(_accel(), 0.0, 0.0)
+        nav.update_position(_accel(), 0.0, 0.02)
+        y = nav.y
+        nav.update_position(_accel(), 0.0, 0.02)
+        assert nav.y == y
+        clock.set_clock(None)
+    finally:
+        config.VELOCITY_DECAY_FACTOR = saved
+    print(f"sample times ok: {ideal:.4f} m with read latency, jitter or a clock jump")
+
+
+def check_delayed_fix():
+    saved = config.VELOCITY_DECAY_FACTOR
+    config.VELOCITY_DECAY_FACTOR = 1.0
+    virtual = clock.VirtualClock()
+    clock.set_clock(virtual)
+    try:
+        errors = {}
+        for method in ('reset_position', 'apply_fix'):
+            virtual.t = 0.0
+            with redirect_stdout(io.StringIO()):
+                nav = Navigator()
+            _drive(nav, virtual, 1.0)
+            t_fix = virtual.monotonic()
+            true_y_at_fix = nav.y + 0.7  # dead reckoning is 0.7 m short
+            _drive(nav, virtual, 0.8)  # the fix arrives 0.8 s after it was measured
+            true_y_now = nav.y + 0.7
+            if method == 'apply_fix':
+                nav.apply_fix(0.0, true_y_at_fix, t_fix)
+            else:
+                nav.reset_position(0.0, true_y_at_fix)
+            errors[method] = abs(nav.y - true_y_now)
+    finally:
+        clock.set_clock(None)
+        config.VELOCITY_DECAY_FACTOR = saved
+    assert errors['apply_fix'] < 0.03, errors
+    print(f"delayed fix ok: error {errors['reset_position']:.2f} m applied as current, "
+          f"{errors['apply_fix']:.3f} m carried forward")
+
+
+def check_reproducible():
+    """The same seed gives the same mission, whatever the wall-clock time."""
+    from simulate import run_mission
+    results = [run_mission(5, 10, timeout=120.0, seed=3) for _ in range(2)]
+    keys = ('reached', 'sim_time', 'arrival_error', 'estimate_error')
+    assert [[r[k] for k in keys] for r in results] == [[results[0][k] for k in keys]] * 2, results
+    print(f"reproducible ok: estimate error {results[0]['estimate_error']:.6f} m twice")
+
+
+def compare_missions(missions):
+    """Simulated missions with a 0.5 s GPS receiver lag: estimate error at arrival."""
+    from simulate import run_mission
+    sim_params = {'GPS_DELAY': 0.5, 'GPS_NOISE': 0.2}
+    table = {}
+    for label, history in (('fix as current', 0.0), ('carried forward', config.NAV_HISTORY)):
+        errors = []
+        for seed in range(missions):
+            rng = random.Random(seed)
+            dest = (rng.uniform(-15, 15), rng.uniform(5, 20))
+            result = run_mission(*dest, timeout=300.0, seed=seed, sim_params=sim_params,
+                                 overrides={'NAV_HISTORY': history, 'GPS_UPDATE_INTERVAL': 2})
+            errors.append(result['estimate_error'])
+        errors.sort()
+        table[label] = errors
+        print(f"  {label:<16} estimate error p50 {errors[len(errors) // 2]:.2f} m, "
+              f"mean {sum(errors) / len(errors):.2f} m over {missions} missions")
+    return table
+
+
+if __name__ == "__main__":
+    check_sample_times()
+    check_delayed_fix()
+    check_reproducible()
+    print("GPS lag 0.5 s, resync every 2 s:")
+    compare_missions(int(sys.argv[1]) if len(sys.argv) > 1 else 16)
+    print("All navigation timing checks passed")
@@ -0,0 +1,160 @@
+# test_telemetry.py
+"""
+Round-trip telemetry frames over UDP and a unix socket, scrape the
+metrics endpoint, measure the publishing cost, and run RoverController
+on simulated devices with telemetry on to check frames arrive while it
+navigates.
+Usage: python3 test_telemetry.py [seconds]
+"""
+import io
+import os
+import sys
+import math
+import time
+import socket
+import tempfile
+import threading
+import urllib.request
+from contextlib import redirect_stdout
+
+import telemetry
+from telemetry import TelemetryPublisher, MetricsServer, pack_frame, unpack_frame
+
+STATE = (1.5, -2.25, 0.1, 0.2, 91.5, -4.0, 12.5, 33.6189123, -117.6142456, 'turn_left')
+
+
+def check_frame():
+    frame = pack_frame(7, 1700000000.25, STATE, (49.5, 8.25, 3))
+    assert len(frame) == telemetry.FRAME.size == 72
+    out = unpack_frame(frame)
+    assert out['seq'] == 7 and out['time'] == 1700000000.25
+    assert out['command'] == 'turn_left' and out['log_dropped'] == 3
+    assert out['lat'] == STATE[7] and out['lon'] == STATE[8]  # float64: no GPS precision lost
+    for key, value in zip(('x', 'y', 'vx', 'vy', 'heading', 'heading_error', 'distance'), STATE):
+        assert abs(out[key] - value) < 1e-5, key
+
+    missing = unpack_frame(pack_frame(0, 0.0, STATE[:7] + (None, None, None)))
+    assert math.isnan(missing['lat']) and missing['command'] == ''
+    assert unpack_frame(b'xx' + frame[2:]) is None and unpack_frame(frame[:-1]) is None
+    print("frame ok: 72 bytes, lat/lon exact, missing values as NaN")
+
+
+def _receive(family, address, bind):
+    receiver = socket.socket(family, socket.SOCK_DGRAM)
+    receiver.bind(bind)
+    receiver.settimeout(2.0)
+    publisher = TelemetryPublisher(address, rate=50)
+    with redirect_stdout(io.StringIO()):
+        publisher.start()
+    assert publisher.send_latest() is False  # nothing published yet
+    publisher.publish(*STATE)
+    frames = [unpack_frame(receiver.recv(256)) for _ in range(5)]
+    publisher.close()
+    receiver.close()
+    assert [f['seq'] for f in frames] == sorted(f['seq'] for f in frames)
+    assert frames[-1]['heading'] == STATE[4] and publisher.stale >= 4
+    return frames
+
+
+def check_udp():
+    probe = socket.socket(socket.AF_INET, socket.SOCK_DGRAM)
+    probe.bind(('127.0.0.1', 0))
+    port = probe.getsockname()[1]
+    probe.close()
+    _receive(socket.AF_INET, f"127.0.0.1:{port}", ('127.0.0.1', port))
+    print("udp ok")
+
+
+def check_unix():
+    path = os.path.join(tempfile.mkdtemp(), 'telemetry.sock')
+    _receive(socket.AF_UNIX, f"unix:{path}", path)
+    os.unlink(path)
+    print("unix socket ok")
+
+
+def check_no_receiver():
+    """Nothing listening: sends fail or vanish, publish() never blocks or raises."""
+    path = os.path.join(tempfile.mkdtemp(), 'nobody.sock')
+    publisher = TelemetryPublisher(f"unix:{path}", rate=50)
+    publisher.publish(*STATE)
+    assert publisher.send_latest() is False and publisher.errors == 1
+    publisher.close()
+    print("no receiver ok: send dropped and counted")
+
+
+def check_metrics():
+    server = MetricsServer(port=0, host='127.0.0.1')
+    server.add_source(lambda: [('rover_ticks_total', 'counter', "Ticks", 42),
+                               ('rover_stage_p99_us{stage}', 'gauge', "p99",
+                                {'mag': 120.5, 'imu': 80.0})])
+    server.add_source(lambda: 1 / 0)
+    with redirect_stdout(io.StringIO()):
+        server.start()
+    url = f"http://127.0.0.1:{server.port}"
+    body = urllib.request.urlopen(url + "/metrics", timeout=2).read().decode()
+    server.close()
+    assert "# TYPE rover_ticks_total counter\nrover_ticks_total 42\n" in body
+    assert 'rover_stage_p99_us{stage="mag"} 120.5' in body
+    assert "# source error" in body
+    print("metrics ok")
+
+
+def run_controller(seconds):
+    import sim_devices
+    sim_devices.install()
+    import config
+    config.LOG_ENABLED = False
+    config.WARM_START_ENABLED = False
+    config.TELEMETRY_ENABLED = True
+    config.TELEMETRY_RATE = 20
+    config.TELEMETRY_METRICS_PORT = 0
+    receiver = socket.socket(socket.AF_INET, socket.SOCK_DGRAM)
+    receiver.bind(('127.0.0.1', 0))
+    receiver.settimeout(0.5)
+    config.TELEMETRY_ADDRESS = f"127.0.0.1:{receiver.getsockname()[1]}"
+    directory = tempfile.mkdtemp()
+    config.STATE_FILE = os.path.join(directory, 'state.json')
+    config.TIMING_FILE = os.path.join(directory, 'loop_timing.json')
+    from main import RoverController
+
+    frames = []
+
+    def collect():
+        while True:
+            try:
+                frames.append(unpack_frame(receiver.recv(256)))
+            except OSError:
+                return
+
+    with redirect_stdout(io.StringIO()):
+        rover = RoverController()
+        rover.set_destination_xy(0, 1000)
+        port = rover.metrics_server.port
+        threading.Thread(target=collect, daemon=True).start()
+        scraped = []
+        threading.Timer(seconds / 2, lambda: scraped.append(urllib.request.urlopen(
+            f"http://127.0.0.1:{port}/metrics", timeout=2).read().decode())).start()
+        threading.Timer(seconds, lambda: setattr(rover, 'running', False)).start()
+        rover.run()
+    time.sleep(0.6)
+    receiver.close()
+
+    assert len(frames) >= seconds * 20 * 0.7, len(frames)
+    last = frames[-1]
+    assert last['rate'] > 0 and last['distance'] > 0
+    assert 'rover_ticks_total' in scraped[0] and 'rover_gpio_skipped_total' in scraped[0]
+    print(f"controller ok: {len(frames)} frames in {seconds:.0f}s, last at "
+          f"({last['x']:.1f},{last['y']:.1f}) loop {last['rate']:.1f} Hz "
+          f"p99 {last['tick_p99']:.2f} ms")
+
+
+if __name__ == "__main__":
+    check_frame()
+    check_udp()
+    check_unix()
+    check_no_receiver()
+    check_metrics()
+    publish, send = telemetry.benchmark(20000)
+    print(f"publish() {publish * 1e6:.2f} us, pack + sendto {send * 1e6:.2f} us per frame")
+    run_controller(float(sys.argv[1]) if len(sys.argv) > 1 else 3.0)
+    print("All telemetry checks passed")
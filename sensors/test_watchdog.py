@@ -0,0 +1,119 @@
+# test_watchdog.py
+"""
+Check the deadline watchdog on its own, then run RoverController on
+simulated devices (real time) and hang the IMU, magnetometer and GPS
+reads mid-drive to measure the worst-case time from the hang to every
+motor stopped, and that each miss names the stage that hung.
+Usage: python3 test_watchdog.py [hangs per device]
+"""
+import io
+import os
+import sys
+import time
+import tempfile
+import threading
+from contextlib import redirect_stdout
+
+from watchdog import Watchdog
+
+
+def _hang(seconds):
+    time.sleep(seconds)
+
+
+def check_watchdog():
+    events = []
+    dog = Watchdog(on_expire=lambda: events.append(('expire', time.monotonic())),
+                   on_recover=lambda: events.append(('recover', time.monotonic())),
+                   deadline=0.05, stage=lambda: 'mag').start()
+    for _ in range(20):
+        dog.pet()
+        time.sleep(0.01)
+    assert not events, "no miss while petted"
+
+    with redirect_stdout(io.StringIO()):
+        dog.pet()
+        petted = time.monotonic()
+        _hang(0.2)
+        dog.pet()
+    assert [name for name, _ in events] == ['expire', 'recover'], events
+    miss = dog.misses[-1]
+    late = events[0][1] - (petted + 0.05)
+    assert miss['stage'] == 'mag' and '_hang' in miss['where'], miss
+    assert 0.19 < miss['stall'] < 0.25 and late < 0.01, (miss, late)
+
+    dog.disarm()
+    time.sleep(0.1)
+    dog.close()
+    assert dog.miss_count == 1, "no miss while disarmed"
+    print(f"watchdog ok: stop {late * 1000:.2f} ms after the deadline, "
+          f"miss at {miss['where']}")
+
+
+def run_controller(hangs):
+    import sim_devices
+    sim_devices.install()
+    import config
+    import motor_helper
+    config.LOG_ENABLED = False
+    config.WARM_START_ENABLED = False
+    config.GPS_UPDATE_INTERVAL = 0.5  # read the GPS often enough to hang it
+    directory = tempfile.mkdtemp()
+    config.STATE_FILE = os.path.join(directory, 'state.json')
+    config.TIMING_FILE = os.path.join(directory, 'loop_timing.json')
+    from main import RoverController
+
+    with redirect_stdout(io.StringIO()):
+        rover = RoverController()
+        rover.set_destination_xy(0, 1000)
+        runner = threading.Thread(target=rover.run)
+        runner.start()
+    motor_helper.driver.init()
+    pins = [sim_devices._pins[pwm] for pwm, _, _, _ in motor_helper.WHEELS.values()]
+    deadline = config.WATCHDOG_DEADLINE
+
+    def motors_on():
+        return any(pin.value > 0 for pin in pins)
+
+    def wait(condition, timeout=5.0):
+        end = time.monotonic() + timeout
+        while not condition():
+            assert time.monotonic() < end, "timed out"
+            time.sleep(0.001)
+
+    results = {}
+    try:
+        with redirect_stdout(io.StringIO()):
+            for device in ('imu', 'mag', 'gps'):
+                results[device] = []
+                for _ in range(hangs):
+                    wait(motors_on)
+                    sim_devices.hang(device, deadline + 0.3)
+                    wait(lambda: device in sim_devices.hang_started)
+                    started = sim_devices.hang_started.pop(device)
+                    while motors_on():
+                        pass
+                    results[device].append((time.monotonic() - started,
+                                            rover.watchdog.misses[-1]))
+                    wait(motors_on)  # recovered: driving again
+    finally:
+        rover.running = False
+        with redirect_stdout(io.StringIO()):
+            runner.join()
+
+    print(f"deadline {deadline * 1000:.0f} ms; hang to motors stopped:")
+    for device, runs in results.items():
+        worst, miss = max(runs, key=lambda r: r[0])
+        print(f"  {device:<4} worst {worst * 1000:6.1f} ms "
+              f"({(worst - deadline) * 1000:5.1f} ms past the deadline), "
+              f"stage {miss['stage']!r} in {miss['where']}")
+        assert all('_stall' in m['where'] for _, m in runs)
+        assert all(m['stage'] == device for _, m in runs), (device, [m['stage'] for _, m in runs])
+        assert worst < deadline + 0.05, (device, worst)
+    return results
+
+
+if __name__ == "__main__":
+    check_watchdog()
+    run_controller(int(sys.argv[1]) if len(sys.argv) > 1 else 3)
+    print("All watchdog checks passed")
@@ -0,0 +1,240 @@
+# tune.py
+"""
+Offline parameter tuning over recorded navigation logs.
+Re-runs the Navigator dead-reckoning integration over each log for many
+candidate values of ACCEL_BIAS_X/Y and VELOCITY_DECAY_FACTOR, and scores
+each candidate by how far the integrated position lands from the next
+GPS fix (RMS over every resync). All candidates of a chunk are
+integrated together as NumPy vectors; chunks run in a process pool.
+Logs decimated to LOG_FREQUENCY are integrated per control-loop tick,
+but one sample per row is coarser: prefer logs with every row.
+
+HEADING_TOLERANCE and the motor settings change the path itself, so they
+can't be scored on a fixed recording; compare them in simulation with
+montecarlo.py --vary instead.
+
+Usage:
+    python3 tune.py rover_navigation_log.csv --random 10000
+    python3 tune.py run1.csv run2.csv --grid 20 --range VELOCITY_DECAY_FACTOR=0.9:1.0
+"""
+import os
+import csv
+import math
+import time
+import argparse
+from concurrent.futures import ProcessPoolExecutor
+import numpy as np
+import config
+
+# Tunable parameter -> default search range (low, high)
+PARAMS = {
+    'ACCEL_BIAS_X': (config.ACCEL_BIAS_X - 0.3, config.ACCEL_BIAS_X + 0.3),
+    'ACCEL_BIAS_Y': (config.ACCEL_BIAS_Y - 0.3, config.ACCEL_BIAS_Y + 0.3),
+    'VELOCITY_DECAY_FACTOR': (0.90, 1.00),
+}
+
+_runs = None  # recorded runs, set once per worker process
+
+
+def load_run(filename, recorded_bias=(config.ACCEL_BIAS_X, config.ACCEL_BIAS_Y)):
+    """
+    Load a datalogger CSV into arrays.
+    The log holds body accel with the bias of the time already removed;
+    recorded_bias (the ACCEL_BIAS_X/Y used during the run) adds it back.
+    """
+    t, ax, ay, heading, forward, fix_lat, fix_lon = [], [], [], [], [], [], []
+    with open(filename, newline='') as f:
+        for row in csv.DictReader(f):
+            if not row['ax_body'] or not row['heading']:
+                continue
+            t.append(float(row['timestamp']))
+            ax.append(float(row['ax_body']) + recorded_bias[0])
+            ay.append(float(row['ay_body']) + recorded_bias[1])
+            heading.append(float(row['heading']))
+            forward.append(row['motor_command'] == 'forward')
+            fix_lat.append(float(row['lat']) if row['lat'] else math.nan)
+            fix_lon.append(float(row['lon']) if row['lon'] else math.nan)
+
+    fix_lat, fix_lon = np.array(fix_lat), np.array(fix_lon)
+    has_fix = ~np.isnan(fix_lat)
+    if has_fix.sum() < 2:
+        raise ValueError(f"{filename}: need at least 2 GPS fixes to score against")
+
+    # Local XY around the first fix (same flat-Earth model as coordinate_transform)
+    ref_lat, ref_lon = fix_lat[has_fix][0], fix_lon[has_fix][0]
+    fix_x = (fix_lon - ref_lon) * 111320 * math.cos(math.radians(ref_lat))
+    fix_y = (fix_lat - ref_lat) * 110540
+
+    # Control-loop ticks per row: 1 unless the log was decimated
+    t = np.array(t)
+    row_dt = float(np.median(np.diff(t))) if len(t) > 1 else 0.0
+    ticks_per_row = max(1, round(row_dt * config.IMU_FREQUENCY))
+
+    h = np.radians(heading)
+    return {
+        'name': os.path.basename(filename),
+        't': t, 'ax': np.array(ax), 'ay': np.array(ay),
+        'sin_h': np.sin(h), 'cos_h': np.cos(h),
+        'forward': np.array(forward), 'has_fix': has_fix,
+        'fix_x': fix_x, 'fix_y': fix_y,
+        'ticks_per_row': ticks_per_row,
+    }
+
+
+def integrate(run, bias_x, bias_y, decay):
+    """
+    Replay Navigator.update_position for K candidates at once.
+    Returns (sum of squared resync errors per candidate, number of resyncs).
+    Integrates on 'forward' rows only, with dt measured from the previous
+    forward row, then resets to each GPS fix as update_from_gps does.
+    The decay applies once per control-loop tick, as in Navigator: in a
+    log decimated to LOG_FREQUENCY each row stands for several ticks and
+    is integrated in that many equal steps with its acceleration.
+    """
+    k = len(decay)
+    x, y = np.zeros(k), np.zeros(k)
+    vx, vy = np.zeros(k), np.zeros(k)
+    sq_err = np.zeros(k)
+    resyncs = 0
+    started = False
+    last_t = None
+
+    t, ax, ay = run['t'], run['ax'], run['ay']
+    sin_h, cos_h = run['sin_h'], run['cos_h']
+    forward, has_fix = run['forward'], run['has_fix']
+    fix_x, fix_y = run['fix_x'], run['fix_y']
+    steps = run['ticks_per_row']
+
+    for i in range(len(t)):
+        if forward[i]:
+            if last_t is not None and started:
+                dt = (t[i] - last_t) / steps
+                a_fwd = ax[i] - bias_x
+                a_left = ay[i] - bias_y
+                ax_earth = a_fwd * sin_h[i] + a_left * cos_h[i]
+                ay_earth = a_fwd * cos_h[i] - a_left * sin_h[i]
+                for _ in range(steps):
+                    vx = vx * decay + ax_earth * dt
+                    vy = vy * decay + ay_earth * dt
+                    x += vx * dt
+                    y += vy * dt
+            last_t = t[i]
+
+        if has_fix[i]:
+            if started:
+                sq_err += (x - fix_x[i]) ** 2 + (y - fix_y[i]) ** 2
+                resyncs += 1
+            x[:], y[:] = fix_x[i], fix_y[i]
+            vx[:], vy[:] = 0.0, 0.0
+            started = True
+
+    return sq_err, resyncs
+
+
+def _init_worker(runs):
+    global _runs
+    _runs = runs
+
+
+def _score_chunk(candidates):
+    """Worker: RMS resync error (m) over all runs for a (K, 3) candidate array."""
+    sq_err = np.zeros(len(candidates))
+    resyncs = 0
+    for run in _runs:
+        err, n = integrate(run, candidates[:, 0], candidates[:, 1], candidates[:, 2])
+        sq_err += err
+        resyncs += n
+    return np.sqrt(sq_err / resyncs)
+
+
+def score(runs, candidates, workers=None):
+    """Score every candidate row of [ACCEL_BIAS_X, ACCEL_BIAS_Y, VELOCITY_DECAY_FACTOR]."""
+    workers = workers or os.cpu_count()
+    chunks = np.array_split(candidates, max(1, workers * 4))
+    with ProcessPoolExecutor(max_workers=workers, initializer=_init_worker,
+                             initargs=(runs,)) as pool:
+        return np.concatenate(list(pool.map(_score_chunk, chunks)))
+
+
+def grid_candidates(ranges, points):
+    axes = [np.linspace(lo, hi, points) for lo, hi in ranges.values()]
+    mesh = np.meshgrid(*axes, indexing='ij')
+    return np.stack([m.ravel() for m in mesh], axis=1)
+
+
+def random_candidates(ranges, count, seed=0):
+    rng = np.random.default_rng(seed)
+    lows = np.array([lo for lo, _ in ranges.values()])
+    highs = np.array([hi for _, hi in ranges.values()])
+    return lows + rng.random((count, len(ranges))) * (highs - lows)
+
+
+def sensitivity(candidates, scores, bins=8):
+    """
+    Per parameter: best score within each bin of its range. A flat row
+    means the parameter barely matters; a steep one means it does.
+    """
+    report = {}
+    for j, name in enumerate(PARAMS):
+        edges = np.linspace(candidates[:, j].min(), candidates[:, j].max(), bins + 1)
+        which = np.clip(np.digitize(candidates[:, j], edges) - 1, 0, bins - 1)
+        best = [scores[which == b].min() if np.any(which == b) else math.nan
+                for b in range(bins)]
+        report[name] = (edges, best)
+    return report
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Tune navigation parameters on recorded logs")
+    parser.add_argument('logs', nargs='+', help="datalogger CSV files")
+    search = parser.add_mutually_exclusive_group()
+    search.add_argument('--random', type=int, default=10000, metavar='N',
+                        help="random search with N candidates (default)")
+    search.add_argument('--grid', type=int, metavar='N', help="grid with N points per parameter")
+    parser.add_argument('--range', action='append', default=[], metavar='NAME=LOW:HIGH',
+                        help="override a parameter's search range")
+    parser.add_argument('--recorded-bias', default=f"{config.ACCEL_BIAS_X},{config.ACCEL_BIAS_Y}",
+                        metavar='BX,BY', help="ACCEL_BIAS_X,Y in effect when the logs were recorded")
+    parser.add_argument('--workers', type=int, default=None)
+    parser.add_argument('--seed', type=int, default=0)
+    args = parser.parse_args()
+
+    ranges = dict(PARAMS)
+    for text in args.range:
+        name, _, span = text.partition('=')
+        if name not in ranges:
+            parser.error(f"unknown parameter {name}; tunable: {', '.join(PARAMS)}")
+        lo, hi = span.split(':')
+        ranges[name] = (float(lo), float(hi))
+
+    recorded_bias = tuple(float(v) for v in args.recorded_bias.split(','))
+    runs = [load_run(f, recorded_bias) for f in args.logs]
+    rows = sum(len(r['t']) for r in runs)
+    resyncs = sum(int(r['has_fix'].sum()) - 1 for r in runs)
+    print(f"Loaded {len(runs)} log(s): {rows} rows, {resyncs} GPS resyncs to score against")
+
+    if args.grid:
+        candidates = grid_candidates(ranges, args.grid)
+    else:
+        candidates = random_candidates(ranges, args.random, args.seed)
+
+    current = np.array([[getattr(config, name) for name in PARAMS]])
+    start = time.perf_counter()
+    scores = score(runs, np.vstack([current, candidates]), args.workers)
+    elapsed = time.perf_counter() - start
+    current_score, scores = scores[0], scores[1:]
+    print(f"Scored {len(candidates)} candidates in {elapsed:.1f}s "
+          f"({len(candidates) / elapsed:.0f}/s)")
+
+    best = int(np.argmin(scores))
+    print(f"\nResync RMS error: current config {current_score:.3f}m -> best {scores[best]:.3f}m")
+    print("Best config:")
+    for j, name in enumerate(PARAMS):
+        print(f"    {name} = {candidates[best, j]:.4f}  # was {getattr(config, name)}")
+
+    print("\nSensitivity (best RMS error per bin, low -> high):")
+    for name, (edges, best_per_bin) in sensitivity(candidates, scores).items():
+        spread = np.nanmax(best_per_bin) - np.nanmin(best_per_bin)
+        print(f"    {name:<22} [{edges[0]:.3f}..{edges[-1]:.3f}] "
+              + ' '.join(f"{b:6.2f}" for b in best_per_bin)
+              + f"  spread {spread:.2f}m")
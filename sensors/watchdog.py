@@ -0,0 +1,125 @@
+# watchdog.py
+"""
+Control-loop deadline watchdog.
+The loop calls pet() every tick. If no pet arrives within the deadline -
+a hung I2C read in mpu6050.read_i2c_words, a blocked gpsd.get_current() -
+the watchdog thread calls on_expire (the controller halts the motors)
+without waiting for the loop. Each miss records the stage the loop was
+running (the loop timer's enter() before each blocking read) and where
+the loop thread is stuck (innermost frame). The next pet after a miss
+calls on_recover and closes the record with the stall length.
+"""
+import sys
+import time
+import threading
+import collections
+import config
+
+MAX_MISSES = 100  # miss records kept
+
+
+class Watchdog:
+    def __init__(self, on_expire, on_recover=None, deadline=None, stage=None):
+        self.deadline = config.WATCHDOG_DEADLINE if deadline is None else deadline
+        self.on_expire = on_expire
+        self.on_recover = on_recover
+        self.stage = stage  # callable -> name of the running stage, or None
+
+        self.misses = collections.deque(maxlen=MAX_MISSES)
+        self.miss_count = 0
+        self.tripped = False
+        self.worst_stop_latency = 0.0  # seconds from the deadline to on_expire returning
+
+        self._last_pet = None  # None = disarmed
+        self._due = None  # deadline that was missed
+        self._loop_thread = None
+        self._wake = threading.Event()
+        self._closed = False
+        self._thread = None
+
+    def start(self):
+        self._thread = threading.Thread(target=self._run, daemon=True, name='watchdog')
+        self._thread.start()
+        return self
+
+    def pet(self):
+        """Called by the loop every tick; the first call arms the watchdog."""
+        if self._last_pet is None:
+            self._loop_thread = threading.get_ident()
+            self._last_pet = time.monotonic()
+            self._wake.set()
+            return
+        self._last_pet = time.monotonic()
+        if self.tripped:
+            self._recover()
+
+    def disarm(self):
+        """Stop watching (e.g. the loop has ended); the next pet re-arms."""
+        self._last_pet = None
+        if self.tripped:
+            self._recover()
+
+    def close(self):
+        self.disarm()
+        self._closed = True
+        self._wake.set()
+        if self._thread is not None:
+            self._thread.join(timeout=1.0)
+            self._thread = None
+
+    def _run(self):
+        while not self._closed:
+            last = self._last_pet
+            if last is None or self.tripped:
+                self._wake.wait(self.deadline)  # disarmed or stopped: wait for a pet
+                self._wake.clear()
+                continue
+            due = last + self.deadline
+            delay = due - time.monotonic()
+            if delay > 0:
+                time.sleep(delay)  # a pet meanwhile just moves the next due time
+                continue
+            if self._last_pet == last:
+                self._expire(due)
+
+    def _expire(self, due):
+        miss = {
+            'time': time.time(),
+            'stage': self.stage() if self.stage else None,
+            'where': self._where(),
+            'stop_latency': None,
+            'stall': None,  # filled in by the next pet
+        }
+        self.misses.append(miss)
+        self.miss_count += 1
+        self._due = due
+        self.tripped = True
+        try:
+            self.on_expire()
+        except Exception as e:
+            print(f"Watchdog: stop failed: {e}")
+        miss['stop_latency'] = time.monotonic() - due
+        self.worst_stop_latency = max(self.worst_stop_latency, miss['stop_latency'])
+        print(f"Watchdog: no tick for {self.deadline * 1000:.0f} ms "
+              f"(in stage {miss['stage']!r}, in {miss['where']}); motors stopped")
+
+    def _where(self):
+        """'file:line function' of the innermost frame of the loop thread."""
+        frame = sys._current_frames().get(self._loop_thread)
+        if frame is None:
+            return None
+        code = frame.f_code
+        return f"{code.co_filename.rsplit('/', 1)[-1]}:{frame.f_lineno} {code.co_name}"
+
+    def _recover(self):
+        miss = self.misses[-1] if self.misses else None
+        if miss is not None and miss['stall'] is None:
+            miss['stall'] = time.monotonic() - self._due + self.deadline
+        self.tripped = False
+        self._wake.set()
+        if self.on_recover is not None:
+            self.on_recover()
+
+    def stats(self):
+        return {'misses': self.miss_count, 'worst_stop_latency': self.worst_stop_latency,
+                'worst_stall': max((m['stall'] or 0.0 for m in self.misses), default=0.0)}